@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+AUTH_USER_VERSION_CACHE_KEY = "authentication:user:version:{user_id}"
+
+# Columns never needed to authorize a request, loaded lazily if something does touch them
+AUTH_USER_DEFERRED_FIELDS = (
+    "last_login_uagent",
+    "last_location",
+    "created_location",
+    "last_login_ip",
+    "last_logout_ip",
+    "last_login_medium",
+    "token",
+)
+
+
+def _version_key(user_id) -> str:
+    return AUTH_USER_VERSION_CACHE_KEY.format(user_id=user_id)
+
+
+def auth_user_invalidate(*, user_id) -> None:
+    """Make every process reload the user on its next request, once the transaction commits."""
+
+    def bump():
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), time.time_ns() // 1000, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+class _UserCache:
+    """Per-process TTL + LRU map of user id to (version, expires at, user)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Optional[int], float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, version: Optional[int]):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            cached_version, expires_at, user = entry
+            if cached_version != version or expires_at < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return user
+
+    def set(self, user_id: str, version: Optional[int], user) -> None:
+        with self._lock:
+            self._data[user_id] = (version, time.monotonic() + self.ttl, user)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_user_cache = _UserCache(maxsize=getattr(settings, "AUTH_USER_CACHE_SIZE", 10000),
+                         ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 30))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that keeps recently seen users in a short-TTL per-process cache.
+
+    A hit costs one shared-cache read for the user's version and no database query. Saving
+    or deleting the user bumps that version, so deactivation or a password change is seen
+    by every process on its next request. Misses load the user with its heavy, unused
+    columns deferred. Each request gets its own copy of the cached instance.
+    """
+
+    def get_user(self, validated_token: Token):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = cache.get(_version_key(user_id))
+        user = _user_cache.get(user_id, version)
+
+        if user is None:
+            try:
+                user = self.user_model.objects.defer(*AUTH_USER_DEFERRED_FIELDS).get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            _user_cache.set(user_id, version, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if getattr(api_settings, "CHECK_REVOKE_TOKEN", False):
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return copy.copy(user)
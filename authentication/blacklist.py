@@ -0,0 +1,138 @@
+import hashlib
+import math
+import threading
+import time
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from common.utils import cache_is_shared
+
+RECENT_BLACKLIST_CACHE_KEY = "authentication:blacklist:jti:{jti}"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, sized for `capacity` items at `error_rate` false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> Iterable[int]:
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        for index in range(self.hash_count):
+            yield (first + index * second) % self.size
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistIndex:
+    """
+    Per-process view of the token blacklist answering "definitely not blacklisted" without a query.
+
+    A Bloom filter over the jti of every unexpired blacklisted token is rebuilt every
+    `rebuild_interval` seconds. Tokens blacklisted since then are found in an exact set
+    (this process) or under a short-lived cache key (other processes). Only a possible
+    hit is confirmed against the database.
+    """
+
+    def __init__(self, rebuild_interval: float = 300, error_rate: float = 0.001):
+        self.rebuild_interval = rebuild_interval
+        self.error_rate = error_rate
+        self._bloom: Optional[BloomFilter] = None
+        self._built_at = 0.0
+        self._recent = {}
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    def rebuild(self) -> None:
+        started = time.monotonic()
+        tokens = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+
+        bloom = BloomFilter(capacity=int(tokens.count() * 1.2) + 1000, error_rate=self.error_rate)
+        for jti in tokens.values_list("token__jti", flat=True).iterator(chunk_size=5000):
+            bloom.add(jti)
+
+        with self._lock:
+            self._bloom = bloom
+            self._built_at = started
+            # Additions made while the filter was being read may be missing from it, keep those
+            self._recent = {jti: added for jti, added in self._recent.items() if added >= started}
+
+    def _ensure_fresh(self) -> None:
+        if self._bloom is not None and time.monotonic() - self._built_at < self.rebuild_interval:
+            return
+        # One thread rebuilds, the others keep answering from the previous filter
+        if self._rebuild_lock.acquire(blocking=self._bloom is None):
+            try:
+                if self._bloom is None or time.monotonic() - self._built_at >= self.rebuild_interval:
+                    self.rebuild()
+            finally:
+                self._rebuild_lock.release()
+
+    def add(self, jti: str) -> None:
+        with self._lock:
+            self._recent[jti] = time.monotonic()
+        # Visible to other processes until each of them has rebuilt its filter at least once
+        cache.set(RECENT_BLACKLIST_CACHE_KEY.format(jti=jti), True, timeout=int(self.rebuild_interval * 2) + 1)
+
+    def might_contain(self, jti: str) -> bool:
+        self._ensure_fresh()
+        if jti in self._recent or jti in self._bloom:
+            return True
+        return bool(cache.get(RECENT_BLACKLIST_CACHE_KEY.format(jti=jti)))
+
+
+_config = getattr(settings, "TOKEN_BLACKLIST_BLOOM", {})
+blacklist_index = BlacklistIndex(rebuild_interval=_config.get("REBUILD_INTERVAL", 300),
+                                 error_rate=_config.get("ERROR_RATE", 0.001))
+
+
+def token_is_blacklisted(*, jti: str) -> bool:
+    """
+    Whether `jti` is blacklisted; a filter miss is only trusted with a shared cache.
+
+    Tokens blacklisted by other processes since the last rebuild are known only through
+    the shared cache, so without one every check goes to the database.
+    """
+    if cache_is_shared() and not blacklist_index.might_contain(jti):
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def token_blacklist_record(*, jti: str) -> None:
+    """Register a freshly blacklisted jti with the index once the blacklist row is committed."""
+    transaction.on_commit(lambda: blacklist_index.add(jti))
+
+
+def outstanding_tokens_purge_expired(*, batch_size: int = 5000) -> int:
+    """Delete expired outstanding tokens (and their blacklist rows) `batch_size` at a time."""
+    deleted = 0
+    now = timezone.now()
+
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lte=now).values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+        if len(ids) < batch_size:
+            break
+
+    return deleted
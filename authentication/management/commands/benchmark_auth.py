@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.authentication import CachedJWTAuthentication
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Compare per-request authentication overhead of JWTAuthentication and CachedJWTAuthentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+
+    def handle(self, *args, requests, **options):
+        with transaction.atomic():
+            user = User.objects.create(username="benchmark-auth", email="benchmark-auth@example.com",
+                                       last_login_uagent="x" * 2000)
+            token = AccessToken.for_user(user)
+            request = Request(RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+
+            self.stdout.write(f"{'authentication':<26} {'queries/req':>11} {'us/req':>9}")
+            for authentication in (JWTAuthentication(), CachedJWTAuthentication()):
+                # Warm up, so the cached class is measured on its steady state
+                authentication.authenticate(request)
+
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        authentication.authenticate(request)
+                    elapsed = time.perf_counter() - started
+
+                self.stdout.write(f"{type(authentication).__name__:<26} {len(captured) / requests:>11.2f} "
+                                  f"{elapsed / requests * 1_000_000:>9.1f}")
+
+            transaction.set_rollback(True)
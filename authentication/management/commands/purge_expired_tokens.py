@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from authentication.blacklist import outstanding_tokens_purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding refresh tokens and their blacklist entries in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, batch_size, **options):
+        deleted = outstanding_tokens_purge_expired(batch_size=batch_size)
+        self.stdout.write(f"Deleted {deleted} expired outstanding token(s).")
@@ -1,9 +1,17 @@
 from django.contrib.auth.models import Group
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer, \
+    TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from authentication.blacklist import token_is_blacklisted
+from authentication.tokens import RefreshToken
 
 from users.models import User
+from users.roles import user_roles_claims
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -68,6 +76,18 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+
+        # Signed role claims let permission checks skip the group lookup while the version holds
+        for claim, value in user_roles_claims(user=user).items():
+            token[claim] = value
+
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -94,6 +114,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 
 class CustomerTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -101,3 +123,17 @@ class CustomerTokenObtainPairSerializer(TokenObtainPairSerializer):
         data["token"] = data.pop("access")
 
         return data
+
+
+class BlacklistAwareTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class BlacklistAwareTokenVerifySerializer(TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs["token"])
+
+        if token_is_blacklisted(jti=token.get(api_settings.JTI_CLAIM)):
+            raise ValidationError("Token is blacklisted")
+
+        return {}
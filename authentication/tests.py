@@ -1,3 +1,90 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.authentication import CachedJWTAuthentication, _user_cache
+from authentication.blacklist import blacklist_index, outstanding_tokens_purge_expired
+from authentication.tokens import RefreshToken
+from users.models import User
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _user_cache.clear()
+        self.user = User.objects.create(username="reader", email="reader@example.com")
+        token = AccessToken.for_user(self.user)
+        self.request = Request(RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+        self.authentication = CachedJWTAuthentication()
+
+    def test_repeated_requests_skip_the_database(self):
+        with self.assertNumQueries(1):
+            user, _ = self.authentication.authenticate(self.request)
+        with self.assertNumQueries(0):
+            cached, _ = self.authentication.authenticate(self.request)
+
+        self.assertEqual(cached.pk, self.user.pk)
+        self.assertIsNot(cached, user)
+
+    def test_deactivated_user_is_rejected(self):
+        self.authentication.authenticate(self.request)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate(self.request)
+
+
+class TokenBlacklistIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_index.rebuild()
+        self.user = User.objects.create(username="holder", email="holder@example.com")
+
+    @mock.patch("authentication.blacklist.cache_is_shared", return_value=True)
+    def test_unblacklisted_token_is_checked_without_a_query(self, cache_is_shared):
+        token = RefreshToken.for_user(self.user)
+
+        with self.assertNumQueries(0):
+            RefreshToken(str(token))
+
+    def test_blacklisting_elsewhere_is_seen_without_a_shared_cache(self):
+        token = RefreshToken.for_user(self.user)
+        # Blacklisted by another worker: the row exists but this process's index never heard of it
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token["jti"]))
+
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+
+    def test_blacklisted_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+
+        # Still rejected once the filter is rebuilt from the database
+        blacklist_index.rebuild()
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+
+    def test_purge_deletes_only_expired_tokens(self):
+        live = RefreshToken.for_user(self.user)
+        expired = RefreshToken.for_user(self.user)
+        live.blacklist()
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired["jti"]).update(expires_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(outstanding_tokens_purge_expired(batch_size=1), 1)
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), [live["jti"]])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
@@ -0,0 +1,19 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from authentication.blacklist import token_blacklist_record, token_is_blacklisted
+
+
+class RefreshToken(BaseRefreshToken):
+    """`RefreshToken` whose blacklist check is answered by the per-process Bloom filter index."""
+
+    def check_blacklist(self) -> None:
+        if token_is_blacklisted(jti=self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        token_blacklist_record(jti=self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
@@ -6,11 +6,11 @@ from rest_framework import serializers, status, generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from authentication.serializers import CustomTokenObtainPairSerializer, CustomerTokenObtainPairSerializer, \
     UserRegistrationSerializer
+from authentication.tokens import RefreshToken
 from users.models import User
 from users.services.user_services import user_create
 
@@ -0,0 +1,37 @@
+import contextlib
+from contextvars import ContextVar
+from typing import Optional
+
+from crum import get_current_user
+
+_UNRESOLVED = object()
+_pinned_actor_id: ContextVar = ContextVar("audit_actor_id", default=_UNRESOLVED)
+
+
+def _user_id(user) -> Optional[object]:
+    return None if user is None or user.is_anonymous else user.pk
+
+
+def current_actor_id() -> Optional[object]:
+    """Id of the user writes are attributed to, or None for anonymous and system writes."""
+    actor_id = _pinned_actor_id.get()
+    if actor_id is _UNRESOLVED:
+        return _user_id(get_current_user())
+    return actor_id
+
+
+@contextlib.contextmanager
+def audit_actor(user=_UNRESOLVED):
+    """
+    Resolve the acting user once and attribute every write in the block to them.
+
+    Without `user` the current crum user is pinned. Jobs saving many rows use this so each
+    save reads a context variable instead of asking crum again; `impersonate` inside the
+    block has no effect on audit columns.
+    """
+    actor_id = current_actor_id() if user is _UNRESOLVED else _user_id(user)
+    token = _pinned_actor_id.set(actor_id)
+    try:
+        yield actor_id
+    finally:
+        _pinned_actor_id.reset(token)
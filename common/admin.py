@@ -2,6 +2,7 @@ from django.contrib import admin
 from import_export.admin import ImportExportModelAdmin
 
 from common.models import ErrorLog, AuditLog, APIActivityLog
+from common.pagination import CountStrategyPaginator
 
 
 # Register your models here.
@@ -10,8 +11,15 @@ class AuditLog(ImportExportModelAdmin):
     pass
 
 
+class EstimatedCountPaginator(CountStrategyPaginator):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, count_strategy="estimate", **kwargs)
+
+
 @admin.register(APIActivityLog)
 class APIActivityLogAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ["token_identifier", "path", "method", "response_code", "ip_address", "created_at"]
     search_fields = ["path", "token_identifier", "method"]
     list_filter = ["method", "response_code"]
@@ -0,0 +1,169 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseAuditBackend:
+    """Write buffered entries to `AuditLog` with one INSERT per flush."""
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        from common.models import AuditLog
+
+        AuditLog.objects.bulk_create([
+            AuditLog(user_id=entry["user_id"],
+                     action=entry["action"],
+                     content_type_id=entry["content_type_id"],
+                     object_id=entry["object_id"],
+                     changes=entry["changes"],
+                     timestamp=entry["timestamp"])
+            for entry in entries
+        ])
+
+
+class JSONLinesAuditBackend:
+    """Append buffered entries to a JSON Lines file, one object per line."""
+
+    def __init__(self, path: str = None):
+        self.path = path or getattr(settings, "AUDIT_LOG_PATH", None) or os.path.join(settings.BASE_DIR, "audit.jsonl")
+        self._lock = threading.Lock()
+
+    def write(self, entries: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(entry, cls=DjangoJSONEncoder) + "\n" for entry in entries)
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+
+AUDIT_BACKENDS = {
+    "db": DatabaseAuditBackend,
+    "jsonl": JSONLinesAuditBackend,
+}
+
+
+class AuditSink:
+    """
+    In-process buffer in front of an audit backend.
+
+    Entries are queued only once the surrounding transaction commits (entries of rolled
+    back work are dropped, as the old synchronous rows were). The buffer is flushed with
+    a single backend write when it reaches `max_entries`, every `flush_interval` seconds
+    from a background thread, and at interpreter exit. With `flush_interval=None` there
+    is no thread and full buffers are flushed inline on commit.
+    """
+
+    def __init__(self, backend, max_entries: int = 100, flush_interval: Optional[float] = 2.0):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._reset()
+
+    def _reset(self):
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, *, action: str, user, instance, changes: Dict[str, Any]) -> None:
+        entry = {
+            "user_id": user.pk if user is not None and user.is_authenticated else None,
+            "action": action,
+            "content_type_id": ContentType.objects.get_for_model(instance.__class__).pk,
+            "object_id": str(instance.pk),
+            "changes": changes,
+            "timestamp": timezone.now(),
+        }
+        transaction.on_commit(lambda: self._enqueue(entry))
+
+    def _enqueue(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.max_entries
+
+        if self.flush_interval is None:
+            if full:
+                self.flush()
+            return
+
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+
+        if entries:
+            try:
+                self.backend.write(entries)
+            except Exception:
+                # Auditing must never break the request that produced the entry
+                logger.exception("Failed to write %d audit log entries", len(entries))
+        return len(entries)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            started = time.monotonic()
+            self.flush()
+            # The thread owns its own connection, don't leave it open between flushes
+            close_old_connections()
+            logger.debug("Audit log flush took %.1fms", (time.monotonic() - started) * 1000)
+
+
+_sink: Optional[AuditSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink() -> AuditSink:
+    global _sink
+
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                backend = getattr(settings, "AUDIT_LOG_BACKEND", "db")
+                backend_class = AUDIT_BACKENDS.get(backend) or import_string(backend)
+                _sink = AuditSink(backend=backend_class(),
+                                  max_entries=getattr(settings, "AUDIT_LOG_BUFFER_SIZE", 100),
+                                  flush_interval=getattr(settings, "AUDIT_LOG_FLUSH_INTERVAL", 2.0))
+    return _sink
+
+
+def audit_log(*, action: str, user, instance, changes: Dict[str, Any]) -> None:
+    """Record an audit entry for `instance` through the process-wide buffered sink."""
+    get_audit_sink().record(action=action, user=user, instance=instance, changes=changes)
+
+
+def _flush_at_exit() -> None:
+    if _sink is not None:
+        _sink.flush()
+
+
+def _reset_after_fork() -> None:
+    # A forked worker inherits the parent's buffer and a lock/thread that are not usable there
+    if _sink is not None:
+        _sink._reset()
+
+
+atexit.register(_flush_at_exit)
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Tags, Warning, register
+
+from common.utils import cache_is_shared
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Invalidations are broadcast through cache version keys, which a per-process cache keeps to itself."""
+    if cache_is_shared():
+        return []
+    return [
+        Warning(
+            f"The default cache ({type(caches['default']).__name__}) is local to each process.",
+            hint="Set REDIS_URL so settings, roles, search, category tree and token blacklist changes "
+                 f"reach every worker; until then they are only picked up after LOCAL_CACHE_MAX_AGE "
+                 f"({settings.LOCAL_CACHE_MAX_AGE}s).",
+            id="common.W001",
+        )
+    ]
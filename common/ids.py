@@ -0,0 +1,39 @@
+import secrets
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+_COUNTER_MAX = 0xFFF
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7) for primary keys.
+
+    The first 48 bits are the Unix time in milliseconds, so new rows land at the right-hand
+    edge of the primary key index instead of on a random page. Within one millisecond the
+    12-bit `rand_a` field is a counter, keeping ids from one process strictly increasing;
+    the remaining 62 bits are random.
+    """
+    global _last_ms, _counter
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            # Start low in the counter range, leaving room for ids generated in the same millisecond
+            _counter = secrets.randbits(10)
+            _last_ms = ms
+        else:
+            # Same millisecond, or the clock stepped back: continue from the previous id
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                _counter = 0
+                _last_ms += 1
+        ms, counter = _last_ms, _counter
+
+    value = ((ms & 0xFFFF_FFFF_FFFF) << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | secrets.randbits(62)
+    return uuid.UUID(int=value)
@@ -0,0 +1,190 @@
+import contextvars
+import heapq
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+_current_metrics: contextvars.ContextVar[Optional["RequestMetrics"]] = contextvars.ContextVar(
+    "request_metrics", default=None
+)
+
+
+_IN_LIST_RE = re.compile(r"\bIN \((?:\s*%s\s*,)*\s*%s\s*\)", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_DJANGO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__import__("django").__file__)))
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def sql_fingerprint(sql: str) -> str:
+    """Reduce a statement to its shape: literals and `IN (...)` lists of any length compare equal."""
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    sql = _STRING_RE.sub("?", sql)
+    return _NUMBER_RE.sub("?", sql)
+
+
+def _query_origin() -> Dict[str, Optional[str]]:
+    """Find the serializer field and the project code that triggered the current query."""
+    serializer_field = None
+    code = None
+
+    frame = sys._getframe(2)
+    while frame is not None and (serializer_field is None or code is None):
+        filename = frame.f_code.co_filename
+        if serializer_field is None and frame.f_code.co_name == "to_representation" and "field" in frame.f_locals:
+            field = frame.f_locals["field"]
+            serializer = frame.f_locals.get("self")
+            serializer_field = f"{type(serializer).__name__}.{getattr(field, 'field_name', field)}"
+        if (code is None and filename.startswith(_PROJECT_ROOT) and not filename.startswith(_DJANGO_ROOT)
+                and filename != __file__ and "site-packages" not in filename):
+            code = f"{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+
+    return {"serializer_field": serializer_field, "code": code}
+
+
+class RequestMetrics:
+    """Query count, DB time and named timers collected while serving one request."""
+
+    def __init__(self, slow_query_top_n: int = 5, n_plus_one_threshold: Optional[int] = None):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.timers: Dict[str, float] = {}
+        self.slow_query_top_n = slow_query_top_n
+        # Min-heap of (duration, sequence, sql), so only the N slowest statements are kept
+        self._slowest: List[Tuple[float, int, str]] = []
+        # Same-shape SELECTs seen `n_plus_one_threshold` times are reported as N+1 candidates
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._fingerprints: Dict[str, int] = {}
+        self.n_plus_one: List[Dict[str, object]] = []
+
+    @property
+    def duration(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record_query(self, sql: str, duration: float) -> None:
+        self.queries += 1
+        self.db_time += duration
+
+        if self.slow_query_top_n:
+            item = (duration, self.queries, sql)
+            if len(self._slowest) < self.slow_query_top_n:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+        if self.n_plus_one_threshold and sql.lstrip()[:6].upper() == "SELECT":
+            fingerprint = sql_fingerprint(sql)
+            count = self._fingerprints.get(fingerprint, 0) + 1
+            self._fingerprints[fingerprint] = count
+            if count == self.n_plus_one_threshold:
+                # The stack is only walked once per offending shape
+                self.n_plus_one.append({"sql": fingerprint, **_query_origin()})
+
+    def n_plus_one_report(self) -> List[Dict[str, object]]:
+        return [{**detection, "count": self._fingerprints[detection["sql"]]} for detection in self.n_plus_one]
+
+    def add_time(self, name: str, duration: float) -> None:
+        self.timers[name] = self.timers.get(name, 0.0) + duration
+
+    def slowest_queries(self) -> List[Dict[str, object]]:
+        return [
+            {"duration_ms": round(duration * 1000, 2), "sql": sql}
+            for duration, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+    def server_timing(self) -> str:
+        entries = [f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"']
+        entries += [f"{name};dur={duration * 1000:.1f}" for name, duration in self.timers.items()]
+        entries.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(entries)
+
+    def as_log_fields(self) -> Dict[str, object]:
+        fields = {"db_queries": self.queries, "db_time_ms": round(self.db_time * 1000, 2)}
+        fields.update({f"{name}_ms": round(duration * 1000, 2) for name, duration in self.timers.items()})
+        return fields
+
+
+class _QueryTimer:
+    """`connection.execute_wrapper` that reports every statement to the current request's metrics."""
+
+    def __init__(self, metrics: RequestMetrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.record_query(sql, time.perf_counter() - started)
+
+
+def get_request_metrics() -> Optional[RequestMetrics]:
+    return _current_metrics.get()
+
+
+@contextmanager
+def collect_request_metrics(*, slow_query_top_n: int = 5, n_plus_one_threshold: Optional[int] = None):
+    """Collect `RequestMetrics` for the enclosed block on every configured database."""
+    metrics = RequestMetrics(slow_query_top_n=slow_query_top_n, n_plus_one_threshold=n_plus_one_threshold)
+    token = _current_metrics.set(metrics)
+    wrapper = _QueryTimer(metrics)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+@contextmanager
+def timer(name: str):
+    """Add the enclosed block's duration to the current request under `name`, if one is being measured."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(name, time.perf_counter() - started)
+
+
+def n_plus_one_threshold() -> Optional[int]:
+    """The configured detection threshold, or None when `N_PLUS_ONE_DETECTION` is "off"."""
+    if getattr(settings, "N_PLUS_ONE_DETECTION", "off") == "off":
+        return None
+    return getattr(settings, "N_PLUS_ONE_THRESHOLD", 5)
+
+
+def raise_for_n_plus_one(metrics: RequestMetrics) -> None:
+    detections = metrics.n_plus_one_report()
+    if detections:
+        lines = [
+            f"{detection['count']}x {detection['sql']} (field: {detection['serializer_field']}, code: {detection['code']})"
+            for detection in detections
+        ]
+        raise NPlusOneError("N+1 queries detected:\n" + "\n".join(lines))
+
+
+@contextmanager
+def assert_no_n_plus_one(*, threshold: int = None):
+    """Raise `NPlusOneError` if the enclosed block repeats a same-shape SELECT `threshold` times."""
+    threshold = threshold or getattr(settings, "N_PLUS_ONE_THRESHOLD", 5)
+    with collect_request_metrics(slow_query_top_n=0, n_plus_one_threshold=threshold) as metrics:
+        yield metrics
+    raise_for_n_plus_one(metrics)
@@ -0,0 +1,55 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from common.ids import uuid7
+from common.models import APIActivityLog
+
+GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+class Command(BaseCommand):
+    help = "Compare insert throughput into api_activity_logs with random (uuid4) and time-ordered (uuid7) primary keys."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, rows, batch_size, **options):
+        self.stdout.write(f"{'ids':<6} {'rows/s':>9} {'last batch rows/s':>18} {'pk index':>10}")
+
+        for name, generator in GENERATORS.items():
+            with transaction.atomic():
+                inserted, elapsed, last_rate = 0, 0.0, 0.0
+                while inserted < rows:
+                    size = min(batch_size, rows - inserted)
+                    logs = [APIActivityLog(id=generator(), token_identifier="benchmark", path="/api/benchmark/",
+                                           method="GET", response_code=200)
+                            for _ in range(size)]
+
+                    started = time.perf_counter()
+                    APIActivityLog.objects.bulk_create(logs)
+                    batch_elapsed = time.perf_counter() - started
+
+                    inserted += size
+                    elapsed += batch_elapsed
+                    # The last batches show the cost once the index no longer fits in cache
+                    last_rate = size / batch_elapsed
+
+                index_size = self._primary_key_index_size()
+
+                # Nothing inserted by the benchmark is kept
+                transaction.set_rollback(True)
+
+            self.stdout.write(f"{name:<6} {inserted / elapsed:>9.0f} {last_rate:>18.0f} {index_size:>10}")
+
+    @staticmethod
+    def _primary_key_index_size() -> str:
+        if connection.vendor != "postgresql":
+            return "n/a"
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_size_pretty(pg_relation_size(i.indexrelid)) FROM pg_index i "
+                           "WHERE i.indrelid = %s::regclass AND i.indisprimary", [APIActivityLog._meta.db_table])
+            return cursor.fetchone()[0]
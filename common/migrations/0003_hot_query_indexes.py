@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apiactivitylog',
+            index=models.Index(fields=['-created_at'], name='api_activity_log_created_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-18 00:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0005_audit_log_event_timestamp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apiactivitylog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Created At'),
+        ),
+    ]
@@ -1,5 +1,3 @@
-import uuid
-
 from crum import get_current_user
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -7,6 +5,9 @@ from django.db import models
 from django.db.models import F, Q
 from django.utils import timezone
 
+from common.actor import current_actor_id
+from common.ids import uuid7
+
 
 # from accounts.models import User
 class TimeAuditModel(models.Model):
@@ -41,6 +42,14 @@ class UserAuditModel(models.Model):
         abstract = True
 
 
+# Condition of partial indexes covering only the rows `SoftDeletionManager` returns
+NOT_DELETED = Q(deleted_at__isnull=True)
+
+
+def _has_user_audit(model) -> bool:
+    return issubclass(model, UserAuditModel)
+
+
 class SoftDeletionQuerySet(models.QuerySet):
     def delete(self, soft=True):
         if soft:
@@ -48,6 +57,26 @@ class SoftDeletionQuerySet(models.QuerySet):
         else:
             return super().delete()
 
+    def bulk_create(self, objs, *args, **kwargs):
+        """`bulk_create` that fills `created_by` of rows without one from the current actor."""
+        objs = list(objs)
+        actor_id = current_actor_id() if _has_user_audit(self.model) else None
+        if actor_id is not None:
+            for obj in objs:
+                if obj.created_by_id is None:
+                    obj.created_by_id = actor_id
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """`bulk_update` that also records the current actor in `updated_by`."""
+        objs = list(objs)
+        actor_id = current_actor_id() if _has_user_audit(self.model) else None
+        if actor_id is not None:
+            for obj in objs:
+                obj.updated_by_id = actor_id
+            fields = [*fields, "updated_by"] if "updated_by" not in fields else fields
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
 
 class SoftDeletionManager(models.Manager):
     def get_queryset(self):
@@ -68,8 +97,9 @@ class SoftDeleteModel(models.Model):
         abstract = True
 
     def delete(self, using=None, soft=True, *args, **kwargs):
+        from common.audit import audit_log
+
         user = get_current_user()
-        content_type = ContentType.objects.get_for_model(self.__class__)
 
         if soft:
             # Soft delete the current instance
@@ -81,21 +111,19 @@ class SoftDeleteModel(models.Model):
             # )
 
             # 🔐 Log soft delete
-            AuditLog.objects.create(
-                user=user if user and not user.is_anonymous else None,
+            audit_log(
+                user=user,
                 action='delete',
-                content_type=content_type,
-                object_id=str(self.pk),
+                instance=self,
                 changes={"type": "soft", "deleted_at": self.deleted_at.isoformat()},
             )
 
         else:
             # 🔐 Log hard delete BEFORE the actual delete
-            AuditLog.objects.create(
-                user=user if user and not user.is_anonymous else None,
+            audit_log(
+                user=user,
                 action='delete',
-                content_type=content_type,
-                object_id=str(self.pk),
+                instance=self,
                 changes={"type": "hard"},
             )
 
@@ -111,9 +139,8 @@ class AuditModel(TimeAuditModel, UserAuditModel, SoftDeleteModel):
 
 
 class BaseModel(AuditModel):
-    id = models.UUIDField(
-        default=uuid.uuid4, unique=True, editable=False, db_index=True, primary_key=True
-    )
+    # Time-ordered, so inserts append to the primary key index; the primary key is already unique and indexed
+    id = models.UUIDField(default=uuid7, editable=False, primary_key=True)
 
     class Meta:
         abstract = True
@@ -124,23 +151,28 @@ class BaseModel(AuditModel):
             if created_by_id:
                 self.created_by_id = created_by_id
             else:
-                user = get_current_user()
-
-                if user is None or user.is_anonymous:
-                    self.created_by = None
-                    self.updated_by = None
-                else:
-                    # Check if the model is being created or updated
-                    if self._state.adding:
-                        # If creating, set created_by and leave updated_by as None
-                        self.created_by = user
-                        self.updated_by = None
-                    else:
-                        # If updating, set updated_by only
-                        self.updated_by = user
+                kwargs["update_fields"] = self._audit_fields_set(current_actor_id(), kwargs.get("update_fields"))
 
         super(BaseModel, self).save(*args, **kwargs)
 
+    def _audit_fields_set(self, actor_id, update_fields):
+        """Attribute this save to `actor_id`, returning `update_fields` with `updated_by` added if it changed."""
+        if self._state.adding:
+            # If creating, set created_by and leave updated_by as None
+            if actor_id is not None:
+                self.created_by_id = actor_id
+            self.updated_by_id = None
+            return update_fields
+
+        # Anonymous and system saves keep the last known editor; an unchanged editor is not rewritten
+        if actor_id is None or self.updated_by_id == actor_id:
+            return update_fields
+
+        self.updated_by_id = actor_id
+        if update_fields:
+            update_fields = [*update_fields, "updated_by"] if "updated_by" not in update_fields else update_fields
+        return update_fields
+
     def __str__(self):
         return str(self.id)
 
@@ -187,7 +219,8 @@ class AuditLog(models.Model):
         'users.User', null=True, blank=True, on_delete=models.SET_NULL
     )
     action = models.CharField(max_length=10, choices=ACTION_CHOICES)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Time of the change, not of the buffered write (see common.audit.AuditSink)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     # Generic relation to any model
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
@@ -202,6 +235,9 @@ class AuditLog(models.Model):
 
 
 class APIActivityLog(BaseModel):
+    # Time of the request, not of the queued write (see middleware.logger.APIActivityLogWriter)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name="Created At")
+
     token_identifier = models.CharField(max_length=255)
 
     # Request Info
@@ -224,6 +260,10 @@ class APIActivityLog(BaseModel):
         verbose_name_plural = "API Activity Logs"
         db_table = "api_activity_logs"
         ordering = ("-created_at",)
+        indexes = [
+            # Listing newest first and pruning by age; log rows are never soft-deleted
+            models.Index(fields=['-created_at'], name='api_activity_log_created_idx'),
+        ]
 
     def __str__(self):
         return str(self.token_identifier)
@@ -1,8 +1,26 @@
+import datetime
+import hashlib
+import json
+import logging
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from collections import OrderedDict
+from decimal import Decimal
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections, models
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ParseError
 from rest_framework.pagination import LimitOffsetPagination as _LimitOffsetPagination
 from rest_framework.response import Response
 
+logger = logging.getLogger(__name__)
+
 
 def get_paginated_response(*, pagination_class, serializer_class, queryset, request, view):
     paginator = pagination_class()
@@ -51,3 +69,278 @@ class LimitOffsetPagination(_LimitOffsetPagination):
                 ]
             )
         )
+
+
+class KeysetPaginator:
+    """
+    Seek ("keyset") pagination over `(order_field, created_at, id)`.
+
+    Instead of `OFFSET n`, every page is fetched with a `WHERE (key) > (last key)` clause
+    built from an opaque cursor, so the cost of page N does not grow with N.
+    The cursor also carries the page number, so callers can keep reporting `currentPage`.
+    """
+
+    # `pk` rather than `id`, so models keyed by a one-to-one (e.g. ProductCard) page the same way
+    tie_breakers = ("created_at", "pk")
+
+    def __init__(self, *, queryset, order_by="id", descending=False, limit=10):
+        self.queryset = queryset
+        self.descending = descending
+        self.limit = limit
+        self.keys = [order_by] + [key for key in self.tie_breakers if key != order_by
+                                  and {key, order_by} != {"pk", "id"}]
+        self.nullable = self._is_nullable(order_by)
+
+    def _is_nullable(self, key):
+        model = self.queryset.model
+        try:
+            *path, name = key.split("__")
+            for part in path:
+                model = model._meta.get_field(part).related_model
+            return model._meta.get_field(name).null or bool(path)
+        except (FieldDoesNotExist, AttributeError):
+            return True
+
+    @staticmethod
+    def encode_cursor(*, values, page, forward):
+        payload = {
+            "v": [_encode_cursor_value(value) for value in values],
+            "p": page,
+            "f": forward,
+        }
+        return urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode()))
+            return payload["v"], int(payload["p"]), bool(payload["f"])
+        except (ValueError, TypeError, KeyError):
+            raise ParseError(detail="Invalid cursor parameter.")
+
+    def _ordering(self, *, forward):
+        descending = self.descending if forward else not self.descending
+        ordering = []
+        for index, key in enumerate(self.keys):
+            expression = F(key)
+            if index == 0 and self.nullable:
+                # NULLs always sort after every value when walking forward
+                expression = (expression.desc if descending else expression.asc)(
+                    **({"nulls_last": True} if forward else {"nulls_first": True})
+                )
+            else:
+                expression = expression.desc() if descending else expression.asc()
+            ordering.append(expression)
+        return ordering
+
+    def _beyond(self, key, value, *, index, forward):
+        lookup = "gt" if forward != self.descending else "lt"
+        if index == 0 and self.nullable:
+            is_null = Q(**{f"{key}__isnull": True})
+            if forward:
+                # Walking towards the NULLs at the end of the ordering
+                return Q(pk__in=[]) if value is None else Q(**{f"{key}__{lookup}": value}) | is_null
+            return ~is_null if value is None else Q(**{f"{key}__{lookup}": value})
+        return Q(**{f"{key}__{lookup}": value})
+
+    def _seek_filter(self, values, *, forward):
+        condition = Q()
+        for index, (key, value) in enumerate(zip(self.keys, values)):
+            clause = self._beyond(key, value, index=index, forward=forward)
+            for previous_key, previous_value in zip(self.keys[:index], values[:index]):
+                if previous_value is None:
+                    clause &= Q(**{f"{previous_key}__isnull": True})
+                else:
+                    clause &= Q(**{previous_key: previous_value})
+            condition |= clause
+        return condition
+
+    def _key_values(self, obj):
+        values = []
+        for key in self.keys:
+            value = obj
+            for part in key.split("__"):
+                value = getattr(value, part, None) if value is not None else None
+            values.append(value)
+        return values
+
+    def get_page(self, cursor=None):
+        """Return `(objects, page, next_cursor, prev_cursor)` for the given cursor."""
+        page, forward, values = 1, True, None
+        if cursor:
+            values, page, forward = self.decode_cursor(cursor)
+            if len(values) != len(self.keys):
+                raise ParseError(detail="Invalid cursor parameter.")
+
+        queryset = self.queryset.order_by(*self._ordering(forward=forward))
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, forward=forward))
+
+        objects = list(queryset[:self.limit + 1])
+        has_more = len(objects) > self.limit
+        objects = objects[:self.limit]
+
+        if not forward:
+            objects.reverse()
+
+        has_next = has_more if forward else values is not None
+        has_prev = page > 1 if forward else has_more
+
+        next_cursor = prev_cursor = None
+        if objects and has_next:
+            next_cursor = self.encode_cursor(values=self._key_values(objects[-1]), page=page + 1, forward=True)
+        if objects and has_prev:
+            prev_cursor = self.encode_cursor(values=self._key_values(objects[0]), page=page - 1, forward=False)
+
+        return objects, page, next_cursor, prev_cursor
+
+
+def _encode_cursor_value(value):
+    # Keep full precision: `DjangoJSONEncoder` would truncate datetimes to milliseconds
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    if isinstance(value, models.Model):
+        return str(value.pk)
+    return value
+
+
+class ExactCount:
+    """Plain `COUNT(*)`."""
+
+    def count(self, queryset):
+        """Return `(total, is_approximate)`."""
+        return queryset.count(), False
+
+
+class CachedCount:
+    """
+    Exact count, cached for `PAGINATION_COUNT_CACHE_TIMEOUT` seconds.
+
+    The cache key is derived from the compiled SQL of the unordered queryset, so every
+    request with the same (normalized) filter set shares one entry regardless of
+    ordering or page. A cached total may lag behind writes by up to the TTL, so it is
+    reported as approximate.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout if timeout is not None else getattr(settings, "PAGINATION_COUNT_CACHE_TIMEOUT", 60)
+
+    @staticmethod
+    def cache_key(queryset):
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(f"{queryset.db}|{sql}|{params!r}".encode()).hexdigest()
+        return f"pagination:count:{queryset.model._meta.label_lower}:{digest}"
+
+    def count(self, queryset):
+        key = self.cache_key(queryset)
+        total = cache.get(key)
+        if total is not None:
+            return total, True
+
+        total = queryset.count()
+        cache.set(key, total, self.timeout)
+        return total, False
+
+
+class EstimatedCount:
+    """
+    Planner row estimate on PostgreSQL, for large tables where exactness is not needed.
+
+    Querysets without a WHERE clause read `pg_class.reltuples`; every other one reads the
+    row estimate of `EXPLAIN`. Soft-deletable models always filter on `deleted_at`, so the
+    `reltuples` shortcut only applies to models with a plain manager (e.g. activity logs).
+    Estimates below `PAGINATION_COUNT_ESTIMATE_THRESHOLD` (and every other database
+    vendor) fall back to an exact count, since small counts are cheap.
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = (
+            threshold if threshold is not None else getattr(settings, "PAGINATION_COUNT_ESTIMATE_THRESHOLD", 10000)
+        )
+
+    def estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        query = queryset.order_by().query
+        try:
+            with connection.cursor() as cursor:
+                # Whole-table estimate, which would include soft-deleted rows if there were any
+                if not query.where and not query.distinct and not query.combinator:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [queryset.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                    return row[0] if row and row[0] >= 0 else None
+
+                sql, params = query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception:
+            logger.exception("Could not estimate row count for %s", queryset.model._meta.label)
+            return None
+
+    def count(self, queryset):
+        estimate = self.estimate(queryset)
+        if estimate is None or estimate < self.threshold:
+            return queryset.count(), False
+        return estimate, True
+
+
+COUNT_STRATEGIES = {
+    "exact": ExactCount,
+    "cached": CachedCount,
+    "estimate": EstimatedCount,
+}
+
+
+def get_count_strategy(strategy=None):
+    """
+    Resolve a count strategy from an instance, a registered name ("exact", "cached",
+    "estimate") or a dotted path. Defaults to `PAGINATION_COUNT_STRATEGY`.
+    """
+    if strategy is None:
+        strategy = getattr(settings, "PAGINATION_COUNT_STRATEGY", "exact")
+
+    if not isinstance(strategy, str):
+        return strategy
+
+    strategy_class = COUNT_STRATEGIES.get(strategy) or import_string(strategy)
+    return strategy_class()
+
+
+class CountStrategyPaginator(Paginator):
+    """Django `Paginator` whose total comes from a pluggable count strategy."""
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, count_strategy=None):
+        super().__init__(object_list, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page)
+        self.count_strategy = get_count_strategy(count_strategy)
+        self.count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        total, self.count_is_approximate = self.count_strategy.count(self.object_list)
+        return total
+
+    def page(self, number):
+        self.count  # resolve the total (and whether it is approximate) first
+        if not self.count_is_approximate:
+            return super().page(number)
+
+        # An approximate total must not clamp the slice or reject trailing pages
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
@@ -1,3 +1,363 @@
-from django.test import TestCase
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from crum import impersonate
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from common.actor import audit_actor
+from common.audit import AuditSink, DatabaseAuditBackend
+from common.ids import uuid7
+from common.instrumentation import NPlusOneError, assert_no_n_plus_one, sql_fingerprint
+from common.models import APIActivityLog, AuditLog
+from common.pagination import (CachedCount, CountStrategyPaginator, EstimatedCount, ExactCount, KeysetPaginator,
+                               get_count_strategy)
+from orders.models import Order
+from products.apis.category_apis import CategoryListApi
+from products.models import Batch, Category, Product, Tag, Type
+from promotions.models import Coupon
+from users.models import User
+from products.selectors import category_list
+
+
+class AuditSinkTests(TestCase):
+    def setUp(self):
+        self.sink = AuditSink(backend=DatabaseAuditBackend(), max_entries=3, flush_interval=None)
+        self.tags = [Tag.objects.create(name=f"tag-{index}", slug=f"tag-{index}") for index in range(4)]
+
+    def _record(self, tag):
+        self.sink.record(action="delete", user=None, instance=tag, changes={"type": "hard"})
+
+    def test_entries_are_written_in_bulk_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            for tag in self.tags[:3]:
+                self._record(tag)
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(set(AuditLog.objects.values_list("object_id", flat=True)),
+                         {str(tag.pk) for tag in self.tags[:3]})
+
+    def test_partial_buffer_waits_for_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._record(self.tags[3])
+        recorded_at = timezone.now()
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+        self.assertEqual(self.sink.flush(), 1)
+        entry = AuditLog.objects.get()
+        self.assertEqual(entry.object_id, str(self.tags[3].pk))
+        # Stamped when the change was recorded, not when the buffer was flushed
+        self.assertLessEqual(entry.timestamp, recorded_at)
+
+    def test_rolled_back_entries_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self._record(self.tags[0])
+        # on_commit callbacks of a rolled back transaction never run
+        del callbacks[:]
+
+        self.assertEqual(self.sink.flush(), 0)
+
+
+class NPlusOneDetectorTests(TestCase):
+    def setUp(self):
+        for index in range(6):
+            type_ = Type.objects.create(name=f"type-{index}", slug=f"type-{index}")
+            Category.objects.create(name=f"category-{index}", slug=f"category-{index}", type=type_)
+
+    def test_fingerprint_ignores_parameters(self):
+        self.assertEqual(sql_fingerprint("SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21"),
+                         sql_fingerprint("SELECT * FROM t WHERE id IN (%s) LIMIT 1"))
+
+    def test_lazy_relation_is_reported_with_serializer_field(self):
+        with self.assertRaises(NPlusOneError) as raised:
+            with assert_no_n_plus_one():
+                CategoryListApi.OutputSerializer(Category.objects.all(), many=True).data
+
+        self.assertIn("OutputSerializer.type_name", str(raised.exception))
+
+    def test_category_list_loads_types_up_front(self):
+        with assert_no_n_plus_one():
+            data = CategoryListApi.OutputSerializer(category_list(), many=True).data
+
+        self.assertEqual(len(data), 6)
+
+
+class Uuid7Tests(TestCase):
+    def test_ids_are_increasing_and_carry_their_time(self):
+        before = time.time_ns() // 1_000_000
+        ids = [uuid7() for _ in range(10_000)]
+        after = time.time_ns() // 1_000_000
+
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual({(value.version, value.variant) for value in ids}, {(7, uuid.RFC_4122)})
+        self.assertLessEqual(before, ids[0].int >> 80)
+        # The counter may borrow a few milliseconds from the future under a burst
+        self.assertLessEqual(ids[-1].int >> 80, after + 10)
+
+    def test_base_models_get_time_ordered_ids(self):
+        self.assertEqual(Tag.objects.create(name="new", slug="new").id.version, 7)
+
+
+class AuditFieldsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username="alice", email="alice@example.com")
+        self.bob = User.objects.create(username="bob", email="bob@example.com")
+        with impersonate(self.alice):
+            self.tag = Tag.objects.create(name="tag", slug="tag")
+
+    def test_update_fields_get_updated_by_only_when_it_changes(self):
+        self.tag.name = "renamed"
+        with impersonate(self.bob), CaptureQueriesContext(connection) as captured:
+            self.tag.save(update_fields=["name"])
+            self.tag.save(update_fields=["name"])
+        self.assertIn('"updated_by_id"', captured[0]["sql"])
+        self.assertNotIn('"updated_by_id"', captured[1]["sql"])
+
+        self.tag.refresh_from_db()
+        self.assertEqual((self.tag.created_by_id, self.tag.updated_by_id), (self.alice.id, self.bob.id))
+
+    def test_anonymous_save_keeps_audit_columns(self):
+        self.tag.save()
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.created_by_id, self.alice.id)
+
+    def test_pinned_actor_is_used_for_every_write(self):
+        with audit_actor(self.bob), impersonate(self.alice):
+            tags = Tag.objects.bulk_create([Tag(name=f"bulk-{index}", slug=f"bulk-{index}") for index in range(3)])
+            for tag in tags:
+                tag.name = tag.name.upper()
+            Tag.objects.bulk_update(tags, ["name"])
+
+        self.assertEqual(set(Tag.objects.filter(slug__startswith="bulk-").values_list("created_by_id", "updated_by_id")),
+                         {(self.bob.id, self.bob.id)})
+
+
+class HotQueryPlanTests(TestCase):
+    """The hot list queries are answered from their indexes rather than a full scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        today = timezone.localdate()
+        cls.types = Type.objects.bulk_create([Type(name=f"type-{index}", slug=f"type-{index}") for index in range(10)])
+
+        Product.objects.bulk_create([
+            Product(name=f"product-{index}", slug=f"product-{index}", product_type="simple",
+                    type=cls.types[index % 10], status="publish" if index % 4 else "draft",
+                    is_active=index % 7 != 0, deleted_at=now if index % 9 == 0 else None)
+            for index in range(2000)
+        ])
+        cls.product = Product.objects.filter(status="publish").first()
+        Batch.objects.bulk_create([
+            Batch(product=product, batch_number=f"B{index}", quantity=Decimal(5),
+                  expiry_date=today + timedelta(days=index))
+            for product in Product.objects.all()[:400] for index in range(5)
+        ])
+
+        statuses = [status for status, _ in Order.ORDER_STATUSES]
+        Order.objects.bulk_create([
+            Order(tracking_number=f"T{index}", customer_id=index % 500, customer_contact="0",
+                  amount=Decimal(10), sales_tax=Decimal(0), paid_total=Decimal(10), total=Decimal(10),
+                  order_status=statuses[index % 4], deleted_at=now if index % 20 == 0 else None)
+            for index in range(4000)
+        ])
+
+        Coupon.objects.bulk_create([
+            Coupon(code=f"C{index}", type="fixed", active_from=now + timedelta(days=index - 1990),
+                   expire_at=now + timedelta(days=index - 1980))
+            for index in range(2000)
+        ])
+        APIActivityLog.objects.bulk_create([
+            APIActivityLog(token_identifier="t", path="/api/products/", method="GET", response_code=200)
+            for _ in range(2000)
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} not used:\n{plan}")
+
+    def test_product_listing(self):
+        self.assertUsesIndex(Product.objects.filter(status="publish", is_active=True).order_by("-created_at")[:20],
+                             "product_live_idx")
+        self.assertUsesIndex(Product.objects.filter(type=self.types[3], status="publish", is_active=True),
+                             "product_type_live_idx")
+
+    def test_batches_in_expiry_order(self):
+        self.assertUsesIndex(Batch.objects.filter(product=self.product).order_by("expiry_date"),
+                             "batch_product_expiry_idx")
+
+    def test_order_listing(self):
+        self.assertUsesIndex(Order.objects.filter(customer_id=42).order_by("-created_at"),
+                             "order_customer_created_idx")
+        self.assertUsesIndex(Order.objects.filter(order_status="order-pending").order_by("-created_at")[:20],
+                             "order_status_created_idx")
+        since = timezone.now() - timedelta(hours=1)
+        self.assertUsesIndex(Order.objects.filter(created_at__gte=since).order_by("created_at", "id")[:100],
+                             "order_created_idx")
+
+    def test_active_coupons(self):
+        now = timezone.now()
+        self.assertUsesIndex(Coupon.objects.filter(active_from__lte=now, expire_at__gte=now),
+                             "coupon_active_window_idx")
+
+    def test_activity_log_newest_first(self):
+        self.assertUsesIndex(APIActivityLog.objects.all()[:50], "api_activity_log_created_idx")
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        prices = [Decimal(2), None, Decimal(1), Decimal(2), None, Decimal(1), Decimal(3)]
+        for index, price in enumerate(prices):
+            Product.objects.create(name=f"p{index}", slug=f"p{index}", product_type="simple", sale_price=price)
+
+    def _walk_forward(self, paginator):
+        pages, cursor = [], None
+        while True:
+            objects, page, next_cursor, prev_cursor = paginator.get_page(cursor)
+            pages.append((page, [product.slug for product in objects], prev_cursor))
+            if next_cursor is None:
+                return pages
+            cursor = next_cursor
+
+    def test_nullable_non_unique_key_is_walked_both_ways(self):
+        # Ties fall back to creation order, NULLs come last in either direction
+        orders = {
+            False: ["p2", "p5", "p0", "p3", "p6", "p1", "p4"],
+            True: ["p6", "p3", "p0", "p5", "p2", "p4", "p1"],
+        }
+        for descending, expected in orders.items():
+            with self.subTest(descending=descending):
+                paginator = KeysetPaginator(queryset=Product.objects.all(), order_by="sale_price",
+                                            descending=descending, limit=3)
+                pages = self._walk_forward(paginator)
+
+                self.assertEqual([page for page, _, _ in pages], [1, 2, 3])
+                self.assertEqual([slug for _, slugs, _ in pages for slug in slugs], expected)
+                self.assertIsNone(pages[0][2])
+
+                # Following the previous cursors from the last page revisits the same pages
+                cursor = pages[-1][2]
+                for page, slugs, _ in reversed(pages[:-1]):
+                    objects, current_page, _, cursor = paginator.get_page(cursor)
+                    self.assertEqual((current_page, [product.slug for product in objects]), (page, slugs))
+                self.assertIsNone(cursor)
+
+    def test_invalid_cursors_are_rejected(self):
+        paginator = KeysetPaginator(queryset=Product.objects.all(), order_by="sale_price", limit=3)
+        wrong_keys = KeysetPaginator.encode_cursor(values=["1"], page=2, forward=True)
+
+        for cursor in ("not-a-cursor", "eyJ2IjpbXX0=", wrong_keys):
+            with self.subTest(cursor=cursor), self.assertRaises(ParseError):
+                paginator.get_page(cursor)
+
+
+class KeysetPaginationApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username="admin", email="admin@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.groups.add(Group.objects.create(name="super_admin"))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+        for index, total in enumerate((30, 10, 20, 10, 40)):
+            Order.objects.create(tracking_number=f"T{index}", customer_id=1, customer_contact="0", amount=total,
+                                 sales_tax=0, paid_total=total, total=total)
+
+    def test_cursor_walks_every_page(self):
+        params = {"cursor": "", "limit": 2, "orderBy": "total"}
+        totals, pages = [], []
+        while True:
+            response = self.client.get("/api/orders/", params)
+            self.assertEqual(response.status_code, 200)
+            totals += [Decimal(order["total"]) for order in response.data["data"]]
+            pages.append(response.data["currentPage"])
+            if response.data["nextCursor"] is None:
+                break
+            params["cursor"] = response.data["nextCursor"]
+
+        self.assertEqual(totals, [10, 10, 20, 30, 40])
+        self.assertEqual(pages, [1, 2, 3])
+        self.assertEqual((response.data["total"], response.data["lastPage"]), (5, 3))
+
+    def test_tampered_cursor_is_a_bad_request(self):
+        response = self.client.get("/api/orders/", {"cursor": "tampered", "limit": 2})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CountStrategyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for index in range(5):
+            Tag.objects.create(name=f"tag-{index}", slug=f"tag-{index}")
+        self.tags = Tag.objects.all()
+
+    def test_exact_count(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(ExactCount().count(self.tags), (5, False))
+
+    def test_cached_count_is_shared_by_orderings_of_the_same_filter(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(CachedCount().count(self.tags.order_by("name")), (5, False))
+        Tag.objects.create(name="tag-5", slug="tag-5")
+
+        # A hit may lag behind writes, so it is approximate
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedCount().count(self.tags.order_by("-created_at")), (5, True))
+        with self.assertNumQueries(1):
+            self.assertEqual(CachedCount().count(self.tags.filter(name="tag-5")), (1, False))
+        # An expired entry is counted again
+        with self.assertNumQueries(2):
+            self.assertEqual(CachedCount(timeout=0).count(Tag.objects.exclude(name="tag-0")), (5, False))
+            self.assertEqual(CachedCount().count(Tag.objects.exclude(name="tag-0")), (5, False))
+
+    def test_estimate_falls_back_to_an_exact_count(self):
+        # Not PostgreSQL here, so there is no estimate
+        self.assertEqual(EstimatedCount().count(self.tags), (5, False))
+
+        strategy = EstimatedCount(threshold=100)
+        with mock.patch.object(strategy, "estimate", return_value=99):
+            self.assertEqual(strategy.count(self.tags), (5, False))
+        with mock.patch.object(strategy, "estimate", return_value=12000):
+            self.assertEqual(strategy.count(self.tags), (12000, True))
+
+    def test_strategy_selection(self):
+        self.assertIsInstance(get_count_strategy(), ExactCount)
+        with override_settings(PAGINATION_COUNT_STRATEGY="cached"):
+            self.assertIsInstance(get_count_strategy(), CachedCount)
+        self.assertIsInstance(get_count_strategy("estimate"), EstimatedCount)
+        self.assertIsInstance(get_count_strategy("common.pagination.CachedCount"), CachedCount)
+
+        strategy = EstimatedCount(threshold=1)
+        self.assertIs(get_count_strategy(strategy), strategy)
+
+    def test_approximate_total_does_not_clamp_pages(self):
+        strategy = EstimatedCount(threshold=1)
+        with mock.patch.object(strategy, "estimate", return_value=50):
+            paginator = CountStrategyPaginator(self.tags.order_by("name"), 2, count_strategy=strategy)
+            page = paginator.page(5)
+
+        self.assertEqual((paginator.count, paginator.count_is_approximate, paginator.num_pages), (50, True, 25))
+        self.assertEqual(list(page.object_list), [])
+
+        exact = CountStrategyPaginator(self.tags.order_by("name"), 2)
+        self.assertEqual([tag.name for tag in exact.page(3).object_list], ["tag-4"])
+        self.assertFalse(exact.count_is_approximate)
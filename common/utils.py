@@ -1,11 +1,18 @@
+import math
+
 from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
-from django.core.paginator import Paginator
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.response import Response
 
+from common.instrumentation import timer
+from common.pagination import CountStrategyPaginator, KeysetPaginator, get_count_strategy
+
 
 def make_mock_object(**kwargs):
     return type("", (object,), kwargs)
@@ -47,13 +54,26 @@ def assert_settings(required_settings, error_message_prefix=""):
     return values
 
 
-def get_paginated_response(*, serializer_class, queryset, request):
+def get_paginated_response(*, serializer_class, queryset, request, count_strategy=None, default_order_by="id"):
+    """`default_order_by=None` keeps the queryset's own ordering unless the client sends `orderBy`."""
     query_params = request.query_params
     limit = int(query_params.get("limit", 10))
     page = int(query_params.get("page", 1))
-    order_by = query_params.get("orderBy", "id")
+    order_by = query_params.get("orderBy", default_order_by)
     sorted_by = query_params.get("sortedBy", "asc")
 
+    # Keyset mode is opt-in: clients send `cursor` (empty for the first page)
+    if "cursor" in query_params:
+        return get_keyset_paginated_response(
+            serializer_class=serializer_class,
+            queryset=queryset,
+            limit=limit,
+            order_by=order_by or "id",
+            descending=sorted_by != "asc",
+            cursor=query_params.get("cursor"),
+            count_strategy=count_strategy,
+        )
+
     # Apply order_by and sorted_by
     if order_by is not None:
         if sorted_by == "asc":
@@ -63,7 +83,7 @@ def get_paginated_response(*, serializer_class, queryset, request):
         queryset = queryset.order_by(order_by)
 
     # Paginate the results
-    paginator = Paginator(queryset, limit)
+    paginator = CountStrategyPaginator(queryset, limit, count_strategy=count_strategy)
     current_page = paginator.page(page)
 
     # Serialize the data
@@ -75,16 +95,53 @@ def get_paginated_response(*, serializer_class, queryset, request):
         'perPage': limit,
         'currentPage': int(page),
         'lastPage': paginator.num_pages,
+        'totalIsApproximate': paginator.count_is_approximate,
+    }
+
+    with timer("serialize"):
+        data = serializer.data
+
+    return Response({
+        'data': data, **pagination_info}, status=status.HTTP_200_OK)
+
+
+def get_keyset_paginated_response(*, serializer_class, queryset, limit, order_by, descending, cursor,
+                                  count_strategy=None):
+    """
+    Same response shape as `get_paginated_response`, plus `nextCursor` / `prevCursor`.
+
+    Pages are located with a seek predicate instead of an OFFSET, so fetching page N
+    costs the same as fetching page 1.
+    """
+    paginator = KeysetPaginator(queryset=queryset, order_by=order_by, descending=descending, limit=limit)
+    objects, page, next_cursor, prev_cursor = paginator.get_page(cursor)
+
+    serializer = serializer_class(objects, many=True)
+
+    total, total_is_approximate = get_count_strategy(count_strategy).count(queryset)
+    pagination_info = {
+        'total': total,
+        'perPage': limit,
+        'currentPage': page,
+        'lastPage': max(math.ceil(total / limit), 1),
+        'totalIsApproximate': total_is_approximate,
+        'nextCursor': next_cursor,
+        'prevCursor': prev_cursor,
     }
 
+    with timer("serialize"):
+        data = serializer.data
+
     return Response({
-        'data': serializer.data, **pagination_info}, status=status.HTTP_200_OK)
+        'data': data, **pagination_info}, status=status.HTTP_200_OK)
 
 
 def parse_search_query(search_query: str) -> dict:
     """
     Parse a `search` query string in the format `key1:value1;key2:value2`.
 
+    Parts without a `key:` prefix are joined into a free-text `q` filter.
+
     Args:
         search_query (str): The `search` query string.
 
@@ -92,6 +149,7 @@ def parse_search_query(search_query: str) -> dict:
         dict: A dictionary of parsed filters.
     """
     filters = {}
+    terms = []
     if search_query:
         search_filters = search_query.split(';')
         for filter_item in search_filters:
@@ -99,8 +157,10 @@ def parse_search_query(search_query: str) -> dict:
                 field, value = filter_item.split(':', 1)
                 filters[field] = value
             except ValueError:
-                # Skip malformed filters
-                continue
+                if filter_item.strip():
+                    terms.append(filter_item.strip())
+    if terms:
+        filters.setdefault("q", " ".join(terms))
     return filters
 
 
@@ -128,3 +188,8 @@ def resolve_foreign_keys(data: dict, foreign_key_fields: dict) -> dict:
                 # Assign None to clear the relationship
                 data[fk_field[:-3]] = None
     return data
+
+
+def cache_is_shared(alias: str = "default") -> bool:
+    """Whether every process sees the same cache, which version-key invalidation relies on."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
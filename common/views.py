@@ -4,7 +4,6 @@ import traceback
 import zoneinfo
 
 from django.conf import settings
-from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import IntegrityError
 # Django imports
@@ -21,7 +20,8 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from common.models import AuditLog, ErrorLog
+from common.audit import audit_log
+from common.models import ErrorLog
 from utils.exception_logger import log_exception
 from utils.ip_address import get_client_ip
 from utils.paginator import BasePaginator
@@ -114,28 +114,16 @@ class BaseViewSet(ModelViewSet, BasePaginator):
 
     def dispatch(self, request, *args, **kwargs):
         try:
+            # Query counts and timings are reported by middleware.logger.RequestLoggerMiddleware
             response = super().dispatch(request, *args, **kwargs)
 
-            if settings.DEBUG:
-                from django.db import connection
-
-                print(
-                    f"{request.method} - {request.get_full_path()} of Queries: {len(connection.queries)}"
-                )
-
             return response
         except Exception as exc:
             response = self.handle_exception(exc)
             return exc
 
     def log_audit(self, action, user, instance, changes):
-        AuditLog.objects.create(
-            user=user if user and user.is_authenticated else None,
-            action=action,
-            content_type=ContentType.objects.get_for_model(instance),
-            object_id=str(instance.pk),
-            changes=changes,
-        )
+        audit_log(action=action, user=user, instance=instance, changes=changes)
 
     @property
     def workspace_slug(self):
@@ -238,14 +226,8 @@ class BaseAPIView(APIView):
                 request._cached_body = b""
 
         try:
+            # Query counts and timings are reported by middleware.logger.RequestLoggerMiddleware
             response = super().dispatch(request, *args, **kwargs)
-
-            if settings.DEBUG:
-                from django.db import connection
-
-                print(
-                    f"{request.method} - {request.get_full_path()} of Queries: {len(connection.queries)}"
-                )
             return response
 
         except Exception as exc:
@@ -76,11 +76,94 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',  # Require authentication by default
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     # 'EXCEPTION_HANDLER': 'core.exceptions.drf_default_with_modifications_exception_handler',
 }
 
+# Total counts on list endpoints: "exact", "cached" (TTL, keyed by filter set) or "estimate" (Postgres planner)
+PAGINATION_COUNT_STRATEGY = config("PAGINATION_COUNT_STRATEGY", cast=str, default="exact")
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 10000
+
+# How long checkout stock reservations hold a batch's quantity before they are released
+STOCK_RESERVATION_TTL = timedelta(minutes=15)
+
+# Audit log sink: "db", "jsonl" or a dotted path to a backend class with a `write(entries)` method.
+# Entries are buffered and written in bulk after commit, on a full buffer or every AUDIT_LOG_FLUSH_INTERVAL seconds.
+AUDIT_LOG_BACKEND = config("AUDIT_LOG_BACKEND", cast=str, default="db")
+AUDIT_LOG_PATH = config("AUDIT_LOG_PATH", cast=str, default=str(BASE_DIR / "audit.jsonl"))
+AUDIT_LOG_BUFFER_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 2.0
+
+# Per-request query count, DB time and serialize/render timers (middleware.logger.RequestLoggerMiddleware).
+# Requests slower than SLOW_REQUEST_MS are logged again with their SLOW_QUERY_TOP_N slowest statements.
+REQUEST_METRICS = {
+    "SERVER_TIMING": config("REQUEST_METRICS_SERVER_TIMING", cast=bool, default=True),
+    "SLOW_REQUEST_MS": config("REQUEST_METRICS_SLOW_REQUEST_MS", cast=int, default=1000),
+    "SLOW_QUERY_TOP_N": 5,
+}
+
+# N+1 detection: "off", "log" (structured warning per request) or "raise" (NPlusOneError).
+# A SELECT of the same shape repeated N_PLUS_ONE_THRESHOLD times within a request counts as N+1.
+# The test runner raises unless N_PLUS_ONE_DETECTION is set in the environment.
+N_PLUS_ONE_DETECTION = config("N_PLUS_ONE_DETECTION", cast=str, default="off")
+N_PLUS_ONE_THRESHOLD = 5
+TEST_RUNNER = "core.test_runner.TestRunner"
+
+# Invalidations (settings, roles, search, facets, category tree, token blacklist) are broadcast through
+# version keys in the default cache, which must be shared by every worker: set REDIS_URL in production.
+# Without it each process has its own local-memory cache (fine for development and tests), and per-process
+# snapshots are still rebuilt at least every LOCAL_CACHE_MAX_AGE seconds.
+REDIS_URL = config("REDIS_URL", cast=str, default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+LOCAL_CACHE_MAX_AGE = 30
+
+# Per-process cache of authenticated users (authentication.authentication.CachedJWTAuthentication)
+AUTH_USER_CACHE_TTL = 30
+AUTH_USER_CACHE_SIZE = 10000
+
+# Per-process LRU of user group names used by users.permissions (see users.roles)
+USER_ROLE_CACHE_SIZE = 10000
+
+# X-Api-Key activity log (middleware.logger.APITokenLogMiddleware). Rows are written off the request path
+# by a background thread; entries beyond QUEUE_SIZE are dropped and counted. SAMPLE_RULES are
+# (path prefix or None, status class like "5xx" or None, rate) tuples, first match wins over SAMPLE_RATE.
+API_ACTIVITY_LOG = {
+    "QUEUE_SIZE": 10000,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_BODY_BYTES": 4096,
+    "SAMPLE_RATE": 1.0,
+    "SAMPLE_RULES": [
+        (None, "5xx", 1.0),
+        (None, "4xx", 1.0),
+    ],
+}
+
+# Product search (products.search): "postgres" (full-text + trigram), "memory" (per-process inverted index)
+# or "auto" to pick by database vendor. MAX_RESULTS caps the hits a listing is narrowed to.
+PRODUCT_SEARCH = {
+    "BACKEND": "auto",
+    "MAX_RESULTS": 500,
+}
+
+# Product listing facets (products.facets): price bucket lower edges and how long counts are cached.
+# Counts are also dropped whenever a product or facet value is saved.
+PRODUCT_FACETS = {
+    "PRICE_BUCKETS": [0, 10, 25, 50, 100, 250, 500],
+    "CACHE_TTL": 60,
+}
+
+# Batch picking for order lines without an explicit batch: "fefo", "fifo" or None to disable
+ORDER_BATCH_ALLOCATION_STRATEGY = "fefo"
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=120),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -88,9 +171,20 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,  # This enables blacklisting
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_BLACKLIST_ENABLED": True,
+    "TOKEN_REFRESH_SERIALIZER": "authentication.serializers.BlacklistAwareTokenRefreshSerializer",
+    "TOKEN_VERIFY_SERIALIZER": "authentication.serializers.BlacklistAwareTokenVerifySerializer",
+}
+
+# Per-process Bloom filter over blacklisted refresh token ids (authentication.blacklist), rebuilt every
+# REBUILD_INTERVAL seconds; tokens blacklisted in between are shared through the cache. Without a shared
+# cache (REDIS_URL) the filter is bypassed and every refresh checks the database.
+TOKEN_BLACKLIST_BLOOM = {
+    "REBUILD_INTERVAL": 300,
+    "ERROR_RATE": 0.001,
 }
 
 MIDDLEWARE = [
+    'middleware.logger.RequestLoggerMiddleware',
     'crum.CurrentRequestUserMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
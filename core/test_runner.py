@@ -0,0 +1,23 @@
+import os
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    `DiscoverRunner` that fails tests on N+1 queries.
+
+    `N_PLUS_ONE_DETECTION` is forced to "raise" for the run unless the environment sets it.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._n_plus_one_detection = override_settings(
+            N_PLUS_ONE_DETECTION=os.environ.get("N_PLUS_ONE_DETECTION", "raise")
+        )
+        self._n_plus_one_detection.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._n_plus_one_detection.disable()
+        super().teardown_test_environment(**kwargs)
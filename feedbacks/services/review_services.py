@@ -0,0 +1,21 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from feedbacks.models import Review
+from products.models import Product
+from products.services.card_services import product_cards_refresh
+
+
+@transaction.atomic
+def product_ratings_refresh(*, product_id) -> None:
+    """Recompute a product's average rating and review count, then its storefront card."""
+    if not product_id:
+        return
+
+    totals = Review.objects.filter(product_id=product_id).aggregate(average=Avg("rating"), count=Count("id"))
+    ratings = Decimal(totals["average"] or 0).quantize(Decimal("0.01"))
+
+    Product.all_objects.filter(id=product_id).update(ratings=ratings, total_reviews=totals["count"])
+    product_cards_refresh(product_ids=[product_id])
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from feedbacks.models import Review
+from feedbacks.services.review_services import product_ratings_refresh
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # Soft deletes arrive as saves and are left out of the recount by the default manager
+    product_ratings_refresh(product_id=instance.product_id)
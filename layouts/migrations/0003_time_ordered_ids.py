@@ -0,0 +1,24 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:27
+
+import common.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('layouts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='faq',
+            name='id',
+            field=models.UUIDField(default=common.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='termsandconditions',
+            name='id',
+            field=models.UUIDField(default=common.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
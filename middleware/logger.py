@@ -1,19 +1,55 @@
+import atexit
 import logging
+import os
+import queue
+import random
+import threading
 import time
-from typing import Union
+from typing import Any, Dict, Optional, Union
 
+from django.conf import settings
+from django.db import close_old_connections
 from django.http import HttpRequest
+from django.utils import timezone
 from rest_framework.request import Request
 
+from common.instrumentation import collect_request_metrics, get_request_metrics, n_plus_one_threshold, \
+    raise_for_n_plus_one
 from common.models import APIActivityLog
 from utils.ip_address import get_client_ip
 
 api_logger = logging.getLogger("chandula.api.request")
 
+REQUEST_METRICS_DEFAULTS = {
+    "SERVER_TIMING": True,
+    "SLOW_REQUEST_MS": None,
+    "SLOW_QUERY_TOP_N": 5,
+}
+
+API_ACTIVITY_LOG_DEFAULTS = {
+    "QUEUE_SIZE": 10000,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_BODY_BYTES": 4096,
+    "SAMPLE_RATE": 1.0,
+    "SAMPLE_RULES": [],
+}
+
 
 class RequestLoggerMiddleware:
+    """
+    Log every request on `chandula.api.request` with its DB and timing metrics.
+
+    Queries are counted and timed by a connection `execute_wrapper`, so this works with
+    DEBUG off. Settings live in `REQUEST_METRICS`: `SERVER_TIMING` adds a `Server-Timing`
+    header, requests slower than `SLOW_REQUEST_MS` are logged again as warnings with
+    their `SLOW_QUERY_TOP_N` slowest statements. Repeated same-shape queries are logged
+    or raised according to `N_PLUS_ONE_DETECTION`.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.config = {**REQUEST_METRICS_DEFAULTS, **getattr(settings, "REQUEST_METRICS", {})}
 
     def _should_log_route(self, request: Union[Request, HttpRequest]) -> bool:
         """
@@ -25,14 +61,24 @@ class RequestLoggerMiddleware:
         return True
 
     def __call__(self, request):
-        # get the start time
-        start_time = time.time()
+        with collect_request_metrics(slow_query_top_n=self.config["SLOW_QUERY_TOP_N"],
+                                     n_plus_one_threshold=n_plus_one_threshold()) as metrics:
+            # Get the response
+            response = self.get_response(request)
 
-        # Get the response
-        response = self.get_response(request)
+        if metrics.n_plus_one:
+            if settings.N_PLUS_ONE_DETECTION == "raise":
+                raise_for_n_plus_one(metrics)
+            api_logger.warning(
+                f"N+1 queries in {request.method} {request.path}",
+                extra={"path": request.path, "method": request.method, "n_plus_one": metrics.n_plus_one_report()},
+            )
 
         # calculate the duration
-        duration = time.time() - start_time
+        duration = metrics.duration
+
+        if self.config["SERVER_TIMING"]:
+            response["Server-Timing"] = metrics.server_timing()
 
         # Check if logging is required
         log_true = self._should_log_route(request=request)
@@ -43,64 +89,228 @@ class RequestLoggerMiddleware:
 
         user_id = (
             request.user.id
-            if getattr(request, "user")
+            if getattr(request, "user", None)
                and getattr(request.user, "is_authenticated", False)
             else None
         )
 
         user_agent = request.META.get("HTTP_USER_AGENT", "")
 
+        fields = {
+            "path": request.path,
+            "method": request.method,
+            "status_code": response.status_code,
+            "duration_ms": int(duration * 1000),
+            "remote_addr": get_client_ip(request),
+            "user_agent": user_agent,
+            "user_id": user_id,
+            **metrics.as_log_fields(),
+        }
+
         # Log the request information
-        api_logger.info(
-            f"{request.method} {request.get_full_path()} {response.status_code}",
-            extra={
-                "path": request.path,
-                "method": request.method,
-                "status_code": response.status_code,
-                "duration_ms": int(duration * 1000),
-                "remote_addr": get_client_ip(request),
-                "user_agent": user_agent,
-                "user_id": user_id,
-            },
-        )
+        api_logger.info(f"{request.method} {request.get_full_path()} {response.status_code}", extra=fields)
+
+        slow_request_ms = self.config["SLOW_REQUEST_MS"]
+        if slow_request_ms is not None and duration * 1000 >= slow_request_ms:
+            api_logger.warning(
+                f"Slow request {request.method} {request.get_full_path()} took {int(duration * 1000)}ms",
+                extra={**fields, "slow_queries": metrics.slowest_queries()},
+            )
 
         # return the response
         return response
 
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, time that separately
+        metrics = get_request_metrics()
+        if metrics is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: metrics.add_time("render", time.perf_counter() - started)
+            )
+        return response
+
+
+def _truncate(value: bytes, limit: int) -> Optional[str]:
+    if not value:
+        return None
+    if len(value) <= limit:
+        return value.decode("utf-8", errors="replace")
+    return value[:limit].decode("utf-8", errors="ignore") + f"...[truncated {len(value) - limit} bytes]"
+
+
+class APIActivityLogWriter:
+    """
+    Bounded queue of `APIActivityLog` rows drained by a background thread.
+
+    Requests only do a non-blocking `put`; the thread inserts up to `batch_size` rows per
+    `bulk_create`, at least every `flush_interval` seconds. When the queue is full new
+    entries are dropped and counted instead of slowing the request down.
+    """
+
+    def __init__(self, queue_size: int = 10000, batch_size: int = 200, flush_interval: float = 1.0):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.dropped = 0
+        self.written = 0
+
+    def submit(self, entry: Dict[str, Any]) -> bool:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            # Don't flood the log under sustained back-pressure
+            if dropped & (dropped - 1) == 0:
+                api_logger.warning("API activity log queue is full, %d entries dropped so far", dropped)
+            return False
+
+    def drain(self, block: bool = False) -> int:
+        """
+        Insert one batch of queued entries.
+
+        With `block` the call waits for a first entry and then keeps collecting until the
+        batch is full or `flush_interval` has passed; otherwise it only takes what is queued.
+        """
+        entries = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while len(entries) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if block and timeout > 0:
+                    entries.append(self._queue.get(timeout=timeout))
+                else:
+                    entries.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if entries:
+            try:
+                APIActivityLog.objects.bulk_create([APIActivityLog(**entry) for entry in entries])
+                self.written += len(entries)
+            except Exception as e:
+                api_logger.exception(e)
+        return len(entries)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="api-activity-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if self.drain(block=True) < self.batch_size:
+                # The queue ran dry, don't keep the writer's connection open while idle
+                close_old_connections()
+
+    def flush(self):
+        while self.drain():
+            pass
+
+
+_activity_log_writer: Optional[APIActivityLogWriter] = None
+_activity_log_writer_lock = threading.Lock()
+
+
+def get_activity_log_writer() -> APIActivityLogWriter:
+    global _activity_log_writer
+
+    if _activity_log_writer is None:
+        with _activity_log_writer_lock:
+            if _activity_log_writer is None:
+                config = _activity_log_settings()
+                _activity_log_writer = APIActivityLogWriter(queue_size=config["QUEUE_SIZE"],
+                                                            batch_size=config["BATCH_SIZE"],
+                                                            flush_interval=config["FLUSH_INTERVAL"])
+    return _activity_log_writer
+
+
+def _activity_log_settings() -> Dict[str, Any]:
+    return {**API_ACTIVITY_LOG_DEFAULTS, **getattr(settings, "API_ACTIVITY_LOG", {})}
+
+
+def _flush_activity_log_at_exit():
+    if _activity_log_writer is not None:
+        _activity_log_writer.flush()
+
+
+def _reset_activity_log_after_fork():
+    if _activity_log_writer is not None:
+        _activity_log_writer._reset()
+
+
+atexit.register(_flush_activity_log_at_exit)
+os.register_at_fork(after_in_child=_reset_activity_log_after_fork)
+
 
 class APITokenLogMiddleware:
+    api_key_header = "X-Api-Key"
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.config = _activity_log_settings()
 
     def __call__(self, request):
+        # Only partner calls are logged, everything else skips reading the body
+        if not request.headers.get(self.api_key_header):
+            return self.get_response(request)
+
         request_body = request.body
         response = self.get_response(request)
         self.process_request(request, response, request_body)
         return response
 
+    def _sample_rate(self, request, response) -> float:
+        status_class = f"{response.status_code // 100}xx"
+        for path_prefix, status, rate in self.config["SAMPLE_RULES"]:
+            if path_prefix and not request.path.startswith(path_prefix):
+                continue
+            if status and status != status_class:
+                continue
+            return rate
+        return self.config["SAMPLE_RATE"]
+
     def process_request(self, request, response, request_body):
-        api_key_header = "X-Api-Key"
-        api_key = request.headers.get(api_key_header)
+        api_key = request.headers.get(self.api_key_header)
         # If the API key is present, log the request
         if api_key:
+            rate = self._sample_rate(request, response)
+            if rate <= 0 or (rate < 1 and random.random() >= rate):
+                return None
+
+            limit = self.config["MAX_BODY_BYTES"]
+            # Streaming responses are never buffered just to be logged
+            response_body = None if getattr(response, "streaming", False) else response.content
+
             try:
-                APIActivityLog.objects.create(
+                get_activity_log_writer().submit(dict(
+                    created_at=timezone.now(),
                     token_identifier=api_key,
-                    path=request.path,
+                    path=request.path[:255],
                     method=request.method,
                     query_params=request.META.get("QUERY_STRING", ""),
-                    headers=str(request.headers),
-                    body=(request_body.decode("utf-8") if request_body else None),
-                    response_body=(
-                        response.content.decode("utf-8") if response.content else None
-                    ),
+                    headers=_truncate(str(request.headers).encode("utf-8"), limit),
+                    body=_truncate(request_body, limit),
+                    response_body=_truncate(response_body, limit),
                     response_code=response.status_code,
                     ip_address=get_client_ip(request=request),
-                    user_agent=request.META.get("HTTP_USER_AGENT", None),
-                )
+                    user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:512] or None,
+                ))
 
             except Exception as e:
                 api_logger.exception(e)
-                # If the token does not exist, you can decide whether to log this as an invalid attempt
 
         return None
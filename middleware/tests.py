@@ -0,0 +1,156 @@
+import re
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from common.models import APIActivityLog
+from middleware import logger
+from middleware.logger import APIActivityLogWriter, APITokenLogMiddleware
+from orders.models import Order
+from users.models import User
+
+
+def _entry(**fields):
+    return {"token_identifier": "partner", "path": "/api/products/", "method": "GET", "response_code": 200, **fields}
+
+
+class APIActivityLogWriterTests(TestCase):
+    def setUp(self):
+        self.writer = APIActivityLogWriter(queue_size=3, batch_size=2, flush_interval=0.01)
+        # The background thread has its own connection, which cannot see the test transaction
+        patcher = mock.patch.object(self.writer, "_ensure_thread")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_queue_drops_and_counts(self):
+        accepted = [self.writer.submit(_entry()) for _ in range(5)]
+
+        self.assertEqual(accepted, [True, True, True, False, False])
+        self.assertEqual(self.writer.dropped, 2)
+
+    def test_entries_are_written_in_batches(self):
+        for _ in range(3):
+            self.writer.submit(_entry())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.writer.drain(), 2)
+        self.writer.flush()
+
+        self.assertEqual((self.writer.written, APIActivityLog.objects.count()), (3, 3))
+
+    def test_rows_keep_the_time_they_were_submitted(self):
+        submitted = timezone.now() - timedelta(seconds=30)
+        self.writer.submit(_entry(created_at=submitted))
+        self.writer.flush()
+
+        self.assertEqual(APIActivityLog.objects.get().created_at, submitted)
+
+    def test_exit_flushes_and_fork_starts_empty(self):
+        with mock.patch.object(logger, "_activity_log_writer", self.writer):
+            self.writer.submit(_entry())
+            logger._flush_activity_log_at_exit()
+            self.assertEqual(APIActivityLog.objects.count(), 1)
+
+            self.writer.submit(_entry())
+            self.writer.submit(_entry())
+            self.writer.dropped = 4
+            # The parent's queue and thread are not usable in the child
+            logger._reset_activity_log_after_fork()
+
+        self.assertEqual((self.writer._queue.qsize(), self.writer.dropped, self.writer._thread), (0, 0, None))
+
+
+@override_settings(API_ACTIVITY_LOG={
+    "SAMPLE_RATE": 0.5,
+    "SAMPLE_RULES": [("/api/orders", "5xx", 1.0), ("/api/orders", None, 0.0), (None, "4xx", 0.25)],
+})
+class APITokenLogMiddlewareTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.writer = mock.Mock()
+        patcher = mock.patch.object(logger, "get_activity_log_writer", return_value=self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call(self, path, status, **headers):
+        middleware = APITokenLogMiddleware(lambda request: HttpResponse(b"ok", status=status))
+        request = self.factory.post(path, data=b"{}", content_type="application/json", **headers)
+        return middleware, request, middleware(request)
+
+    def test_first_matching_rule_sets_the_sample_rate(self):
+        cases = [("/api/orders/1", 500, 1.0), ("/api/orders/1", 200, 0.0), ("/api/orders/1", 404, 0.0),
+                 ("/api/products/", 404, 0.25), ("/api/products/", 200, 0.5)]
+        for path, status, rate in cases:
+            with self.subTest(path=path, status=status):
+                middleware, request, response = self._call(path, status)
+                self.assertEqual(middleware._sample_rate(request, response), rate)
+
+    def test_sampled_requests_are_submitted_with_their_time(self):
+        started = timezone.now()
+        with mock.patch.object(logger.random, "random", side_effect=[0.1, 0.9]):
+            self._call("/api/products/", 200, HTTP_X_API_KEY="partner")
+            self._call("/api/products/", 200, HTTP_X_API_KEY="partner")
+
+        self.writer.submit.assert_called_once()
+        entry = self.writer.submit.call_args.args[0]
+        self.assertEqual((entry["token_identifier"], entry["body"], entry["response_body"]), ("partner", "{}", "ok"))
+        self.assertTrue(started <= entry["created_at"] <= timezone.now())
+
+    def test_requests_without_a_key_or_with_a_zero_rate_are_not_logged(self):
+        self._call("/api/products/", 200)
+        self._call("/api/orders/1", 200, HTTP_X_API_KEY="partner")
+
+        self.writer.submit.assert_not_called()
+
+
+class RequestLoggerMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username="admin", email="admin@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.groups.add(Group.objects.create(name="super_admin"))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+        for index in range(3):
+            Order.objects.create(tracking_number=f"T{index}", customer_id=1, customer_contact="0", amount=10,
+                                 sales_tax=0, paid_total=10, total=10)
+
+    def _get(self):
+        with self.assertLogs("chandula.api.request", level="INFO") as logs, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/orders/")
+        self.assertEqual(response.status_code, 200)
+        return response, logs.records, len(queries)
+
+    def test_request_is_logged_with_its_queries_and_timers(self):
+        response, records, queries = self._get()
+
+        timing = dict(re.findall(r"(\w+);dur=([\d.]+)", response["Server-Timing"]))
+        self.assertEqual(set(timing), {"db", "serialize", "render", "total"})
+        self.assertIn(f'desc="{queries} queries"', response["Server-Timing"])
+
+        [record] = records
+        self.assertEqual((record.path, record.status_code, record.db_queries), ("/api/orders/", 200, queries))
+        # The header rounds to 0.1ms
+        self.assertAlmostEqual(record.db_time_ms, float(timing["db"]), delta=0.05)
+        self.assertGreaterEqual(record.render_ms, 0)
+
+    @override_settings(REQUEST_METRICS={"SLOW_REQUEST_MS": 0, "SLOW_QUERY_TOP_N": 2, "SERVER_TIMING": False})
+    def test_slow_requests_report_their_slowest_queries(self):
+        response, records, queries = self._get()
+
+        self.assertNotIn("Server-Timing", response)
+        info, slow = records
+        self.assertEqual(slow.levelname, "WARNING")
+        self.assertEqual(len(slow.slow_queries), min(queries, 2))
+        durations = [query["duration_ms"] for query in slow.slow_queries]
+        self.assertEqual(durations, sorted(durations, reverse=True))
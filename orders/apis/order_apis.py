@@ -1,11 +1,14 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
 from django.http import Http404
-from rest_framework import serializers, status
+from rest_framework import exceptions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from common.export import get_streaming_export_response
 from common.utils import parse_search_query, get_paginated_response
-from orders.selectors import order_list, order_get
+from orders.models import Order
+from orders.selectors import order_list, order_get, order_item_list
 from orders.serializers import OrderItemSerializer
 from orders.services.order_services import order_create_process, order_update, shop_order_create_process
 from products.selectors import tag_get_by_slug, tag_get
@@ -19,6 +22,10 @@ class OrderListApi(APIView):
     class FilterSerializer(serializers.Serializer):
         id = serializers.IntegerField(required=False)
         name = serializers.CharField(required=False)
+        customer_id = serializers.IntegerField(required=False)
+        order_status = serializers.ChoiceField(choices=Order.ORDER_STATUSES, required=False)
+        created_from = serializers.DateTimeField(required=False)
+        created_to = serializers.DateTimeField(required=False)
 
     class OutputSerializer(serializers.Serializer):
         id = serializers.UUIDField()
@@ -36,19 +43,58 @@ class OrderListApi(APIView):
         filters = parse_search_query(search_query)
 
         # Make sure the filters are valid, if passed
-        filters_serializer = self.FilterSerializer(data={**request.query_params, **filters})
+        filters_serializer = self.FilterSerializer(data={**request.query_params.dict(), **filters})
         filters_serializer.is_valid(raise_exception=True)
 
         orders = order_list(filters=filters_serializer.validated_data)
 
-        # Apply pagination
+        # Apply pagination, the orders table is large enough for a planner estimate of the total
         return get_paginated_response(
             serializer_class=self.OutputSerializer,
             queryset=orders,
             request=request,
+            count_strategy="estimate",
         )
 
 
+class OrderExportApi(APIView):
+    """Stream orders, or their items with `rows=items`, as CSV or NDJSON."""
+    permission_classes = [IsSuperAdminOrStoreOwner]
+
+    class FilterSerializer(OrderListApi.FilterSerializer):
+        export_format = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+        rows = serializers.ChoiceField(choices=["orders", "items"], default="orders")
+
+    ORDER_FIELDS = ["id", "tracking_number", "order_status", "payment_status", "payment_gateway", "customer_id",
+                    "customer_contact", "customer_name", "amount", "sales_tax", "discount", "delivery_fee",
+                    "paid_total", "total", "created_at"]
+    ORDER_ITEM_FIELDS = ["order__tracking_number", "order__created_at", "id", "product_id", "product_variant_id",
+                         "item_name", "batch_number", "quantity", "return_quantity", "price", "sale_price",
+                         "total_discount", "item_value", "item_total"]
+
+    def get(self, request):
+        filters = parse_search_query(request.query_params.get("search", None))
+
+        filters_serializer = self.FilterSerializer(data={**request.query_params.dict(), **filters})
+        filters_serializer.is_valid(raise_exception=True)
+        filters = filters_serializer.validated_data
+        export_format = filters.pop("export_format")
+        rows = filters.pop("rows")
+
+        if rows == "items":
+            queryset = order_item_list(filters=filters).order_by("order__created_at", "order_id", "id")
+            fields = self.ORDER_ITEM_FIELDS
+        else:
+            queryset = order_list(filters=filters).order_by("created_at", "id")
+            fields = self.ORDER_FIELDS
+
+        return get_streaming_export_response(queryset=queryset,
+                                             fields=fields,
+                                             headers=[field.replace("__", "_") for field in fields],
+                                             export_format=export_format,
+                                             filename="orders" if rows == "orders" else "order-items")
+
+
 class OrderDetailApi(APIView):
     class OutputSerializer(serializers.Serializer):
         id = serializers.CharField(required=True)
@@ -72,8 +118,10 @@ class OrderDetailApi(APIView):
 
 
 class ProductInputSerializer(serializers.Serializer):
-    order_quantity = serializers.IntegerField(required=False)  # Include if updating an existing address
+    order_quantity = serializers.IntegerField(required=True, min_value=1)
     product_id = serializers.UUIDField(required=True)
+    variation_id = serializers.UUIDField(required=False, allow_null=True)
+    batch_id = serializers.UUIDField(required=False, allow_null=True)
     subtotal = serializers.IntegerField(required=True)
     unit_price = serializers.IntegerField(default=False)
 
@@ -105,9 +153,13 @@ class OrderCreateApi(APIView):
         serializer = self.InputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        order = order_create_process(
-            **serializer.validated_data
-        )
+        try:
+            order = order_create_process(
+                **serializer.validated_data
+            )
+        except DjangoValidationError as e:
+            # Stock reservation refused a line, e.g. the batch ran out
+            raise exceptions.ValidationError(e.messages)
 
         data = self.OutputSerializer(order).data
 
@@ -143,10 +195,13 @@ class ShopOrderCreateApi(APIView):
 
         customer = request.user
 
-        order = shop_order_create_process(
-            customer=customer,
-            **serializer.validated_data
-        )
+        try:
+            order = shop_order_create_process(
+                customer=customer,
+                **serializer.validated_data
+            )
+        except DjangoValidationError as e:
+            raise exceptions.ValidationError(e.messages)
 
         data = self.OutputSerializer(order).data
 
@@ -0,0 +1,14 @@
+import django_filters
+
+from orders.models import Order
+
+
+class BaseOrderFilter(django_filters.FilterSet):
+    customer_id = django_filters.NumberFilter(field_name='customer_id', label="Customer")
+    order_status = django_filters.CharFilter(field_name='order_status', label="Order status")
+    created_from = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte', label="Created from")
+    created_to = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt', label="Created before")
+
+    class Meta:
+        model = Order
+        fields = ('customer_id', 'order_status')
@@ -0,0 +1,76 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from orders.services.order_services import order_create_process
+from products.models import Batch, Product
+
+
+class Command(BaseCommand):
+    help = "Measure checkout latency and query count against the number of order lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 50, 100, 250])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, lines, repeat, **options):
+        self.stdout.write(f"{'lines':>6} {'queries':>8} {'avg ms':>9} {'ms/line':>8}")
+
+        for line_count in lines:
+            with transaction.atomic():
+                cart = self._seed_cart(line_count)
+
+                timings = []
+                queries = 0
+                for _ in range(repeat):
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        order_create_process(amount=0,
+                                             customer_id=1,
+                                             customer_contact="benchmark",
+                                             delivery_fee=0,
+                                             discount=0,
+                                             paid_total=0,
+                                             payment_gateway="CASH_ON_DELIVERY",
+                                             products=cart,
+                                             sales_tax=0,
+                                             total=0,
+                                             use_wallet_points=False,
+                                             )
+                        timings.append(time.perf_counter() - started)
+                    queries = len(captured)
+
+                # Nothing seeded or created by the benchmark is kept
+                transaction.set_rollback(True)
+
+            average_ms = sum(timings) / len(timings) * 1000
+            self.stdout.write(f"{line_count:>6} {queries:>8} {average_ms:>9.2f} {average_ms / line_count:>8.3f}")
+
+    @staticmethod
+    def _seed_cart(line_count):
+        products = Product.objects.bulk_create(
+            Product(name=f"benchmark-{index}",
+                    slug=f"benchmark-checkout-{index}",
+                    product_type="simple",
+                    price=Decimal("9.99"),
+                    )
+            for index in range(line_count)
+        )
+        batches = Batch.objects.bulk_create(
+            Batch(product=product, batch_number="BENCH", quantity=Decimal(1000), price=Decimal("9.99"))
+            for product in products
+        )
+
+        return [
+            {
+                "product_id": product.id,
+                "batch_id": batch.id,
+                "order_quantity": 2,
+                "unit_price": 10,
+                "subtotal": 20,
+            }
+            for product, batch in zip(products, batches)
+        ]
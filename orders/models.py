@@ -2,7 +2,7 @@ import uuid
 
 from django.db import models
 
-from common.models import BaseModel
+from common.models import BaseModel, NOT_DELETED
 from products.models import Product, ProductVariation, Batch
 
 
@@ -58,6 +58,15 @@ class Order(BaseModel):
     updated_at = models.DateTimeField(auto_now=True)
     wallet_point = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # A customer's orders and the status queues, newest first
+            models.Index(fields=['customer_id', '-created_at'], name='order_customer_created_idx', condition=NOT_DELETED),
+            models.Index(fields=['order_status', '-created_at'], name='order_status_created_idx', condition=NOT_DELETED),
+            # Date-range reports and exports, ordered by (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='order_created_idx', condition=NOT_DELETED),
+        ]
+
     def __str__(self):
         return f"Order {self.tracking_number} - {self.customer_name}"
 
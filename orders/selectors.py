@@ -3,7 +3,8 @@ from typing import Optional
 from django.db.models import QuerySet
 
 from common.utils import get_object
-from orders.models import Order
+from orders.filters import BaseOrderFilter
+from orders.models import Order, OrderItem
 
 
 def order_list(*, filters=None) -> QuerySet[Order]:
@@ -11,6 +12,14 @@ def order_list(*, filters=None) -> QuerySet[Order]:
 
     qs = Order.objects.all()
 
+    return BaseOrderFilter(filters, qs).qs
+
+
+def order_item_list(*, filters=None) -> QuerySet[OrderItem]:
+    orders = order_list(filters=filters)
+
+    qs = OrderItem.objects.filter(order__in=orders.values('id'))
+
     return qs
 
 
@@ -1,10 +1,13 @@
 import uuid
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 
+from django.core.exceptions import ValidationError
 from django.db import transaction
 
 from orders.models import OrderItem
+from products.models import Batch
+from products.selectors import batch_in_bulk
 
 
 @transaction.atomic
@@ -45,6 +48,57 @@ def order_item_create(*, item_name: str = None,
         raise Exception(f"Failed to create Order Item. Error: {e}")
 
 
+def _batch_belongs_to_line(*, batch: Optional[Batch], line: dict) -> bool:
+    if batch is None:
+        return False
+    if line.get('variation_id'):
+        return str(batch.product_variation_id) == str(line['variation_id'])
+    return str(batch.product_id) == str(line.get('product_id'))
+
+
+@transaction.atomic
+def order_items_bulk_create(*, order_id: uuid,
+                            products: List[dict],
+                            ) -> List[OrderItem]:
+    """
+    Create every line of an order with a single INSERT.
+
+    Lines are the validated `products` payload of the order APIs. Referenced batches are
+    fetched with one query to fill in `batch_number`, and must exist and belong to the
+    line's variation (or product, for lines without one).
+    """
+    batches = batch_in_bulk(product.get('batch_id') for product in products if product.get('batch_id'))
+
+    order_items = []
+    for product in products:
+        batch = batches.get(product.get('batch_id'))
+        if product.get('batch_id') and not _batch_belongs_to_line(batch=batch, line=product):
+            raise ValidationError(f"Batch {product['batch_id']} does not exist "
+                                  f"for product {product.get('product_id')}.")
+
+        item_value = Decimal(0)
+        order_items.append(
+            OrderItem(batch=batch,
+                      batch_number=batch.batch_number if batch else None,
+                      quantity=product.get('order_quantity'),
+                      price=product.get('unit_price'),
+                      cost=product.get('unit_price'),
+                      sale_price=product.get('unit_price'),
+                      item_value=item_value,
+                      item_total=item_value * product.get('order_quantity'),
+
+                      order_id=order_id,
+                      product_id=product.get('product_id'),
+                      product_variant_id=product.get('variation_id'),
+                      )
+        )
+
+    try:
+        return OrderItem.objects.bulk_create(order_items)
+    except Exception as e:
+        raise Exception(f"Failed to create Order Item. Error: {e}")
+
+
 @transaction.atomic
 def order_item_return(*, order_item: OrderItem,
                       return_quantity: int) -> OrderItem:
@@ -1,13 +1,19 @@
 import uuid
 from typing import List
 
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Q
 from django.utils.timezone import now
+from rest_framework import exceptions
 
 from common.services import model_update
 from orders.models import Order
-from orders.services.order_item_services import order_item_create
+from orders.services.order_item_services import order_items_bulk_create
 from orders.utils import calculate_order_amount
+from products.models import Batch
+from products.services.allocation_services import AllocationLine, batch_allocation_plan
+from products.services.reservation_services import stock_reserve_many, stock_reservation_commit
 from users.models import User
 
 
@@ -40,24 +46,9 @@ def order_create_process(*, amount: int,
                          # use_wallet_points=use_wallet_points,
                          )
 
-    for product in products:
-        # batch = batch_get(batch_id=product.get('batch_id'))
-        # product = product_get(product_id=product.get('product_id'))
-        order_item_create(
-            # item_name=product.get('item_name'),
-            # batch_number=batch.batch_number,
-            quantity=product.get('order_quantity'),
-            price=product.get('unit_price'),
-            cost=product.get('unit_price'),
-            sale_price=product.get('unit_price'),
-            # percentage_discount=order_item.percentage_discount,
-            # percentage_discount_amount=order_item.percentage_discount_amount,
-            # flat_discount_amount=order_item.flat_discount_amount,
-            # sale_price_discount_amount=order_item.sale_price_discount_amount,
-            # item_value=product.get('item_value'),
-            order_id=order.id,
-            product_id=product.get('product_id'),
-        )
+    products = order_lines_allocate(products=products)
+    order_items_bulk_create(order_id=order.id, products=products)
+    order_stock_commit(order=order, products=products)
 
     return order
 
@@ -81,28 +72,76 @@ def shop_order_create_process(*, products: list = None,
                          # use_wallet_points=use_wallet_points,
                          )
 
-    for product in products:
-        # batch = batch_get(batch_id=product.get('batch_id'))
-        # product = product_get(product_id=product.get('product_id'))
-        order_item_create(
-            # item_name=product.get('item_name'),
-            # batch_number=batch.batch_number,
-            quantity=product.get('order_quantity'),
-            price=product.get('unit_price'),
-            cost=product.get('unit_price'),
-            sale_price=product.get('unit_price'),
-            # percentage_discount=order_item.percentage_discount,
-            # percentage_discount_amount=order_item.percentage_discount_amount,
-            # flat_discount_amount=order_item.flat_discount_amount,
-            # sale_price_discount_amount=order_item.sale_price_discount_amount,
-            # item_value=product.get('item_value'),
-            order_id=order.id,
-            product_id=product.get('product_id'),
-        )
+    products = order_lines_allocate(products=products)
+    order_items_bulk_create(order_id=order.id, products=products)
+    order_stock_commit(order=order, products=products)
 
     return order
 
 
+def order_lines_allocate(*, products: list) -> list:
+    """
+    Pick batches for lines that do not name one, splitting a line across batches if needed.
+
+    Uses the `ORDER_BATCH_ALLOCATION_STRATEGY` planner ("fefo" / "fifo"); `None` keeps the
+    lines as they are, and so do lines for products (or variations) that have no batches.
+    """
+    strategy = getattr(settings, 'ORDER_BATCH_ALLOCATION_STRATEGY', None)
+    unallocated = [product for product in products if not product.get('batch_id')]
+    if not strategy or not unallocated:
+        return products
+
+    # Products sold without batch tracking are ordered as before
+    batched = set(
+        Batch.objects.filter(Q(product_id__in=[product.get('product_id') for product in unallocated],
+                               product_variation__isnull=True)
+                             | Q(product_variation_id__in=[product.get('variation_id') for product in unallocated
+                                                           if product.get('variation_id')]))
+        .values_list('product_variation_id', 'product_id')
+    )
+    batched_keys = {variation_id or product_id for variation_id, product_id in batched}
+    unallocated = [product for product in unallocated
+                   if (product.get('variation_id') or product.get('product_id')) in batched_keys]
+    if not unallocated:
+        return products
+
+    plan = batch_allocation_plan(
+        lines=[AllocationLine(product_id=product.get('product_id'),
+                              variation_id=product.get('variation_id'),
+                              quantity=product.get('order_quantity'))
+               for product in unallocated],
+        strategy=strategy,
+    )
+    allocations = {id(product): allocation for product, allocation in zip(unallocated, plan)}
+
+    lines = []
+    for product in products:
+        allocation = allocations.get(id(product))
+        if allocation is None:
+            lines.append(product)
+            continue
+
+        if not allocation.is_complete:
+            raise exceptions.ValidationError(f"Insufficient stock for product {product.get('product_id')}.")
+
+        for batch in allocation.batches:
+            lines.append({**product, 'batch_id': batch.batch_id, 'order_quantity': batch.quantity})
+
+    return lines
+
+
+@transaction.atomic
+def order_stock_commit(*, order: Order, products: list) -> None:
+    """Reserve and commit the stock of every line that names a batch."""
+    lines = [(product.get('batch_id'), product.get('order_quantity'))
+             for product in products if product.get('batch_id')]
+    if not lines:
+        return
+
+    reservations = stock_reserve_many(lines=lines, reference=str(order.id))
+    stock_reservation_commit(reservations=reservations)
+
+
 @transaction.atomic
 def order_create(*, amount: int,
                  coupon_id: uuid = None,
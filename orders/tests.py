@@ -1,3 +1,177 @@
+import csv
+import json
+import math
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.query import QuerySet
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from orders.management.commands.benchmark_checkout import Command as BenchmarkCheckoutCommand
+from orders.models import Order, OrderItem
+from orders.services.order_services import order_create_process
+from products.models import Batch, Product, StockReservation
+from users.models import User
+
+
+class OrderCreateApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="buyer", email="buyer@example.com"))
+        self.product = Product.objects.create(name="Tea", slug="tea", product_type="simple")
+
+    def _create(self, **line):
+        payload = {"amount": 10, "coupon_id": None, "customer_contact": "0", "customer_id": "1", "delivery_fee": 0,
+                   "delivery_time": None, "discount": 0, "paid_total": 10, "payment_gateway": "CASH_ON_DELIVERY",
+                   "sales_tax": 0, "total": 10, "use_wallet_points": False,
+                   "products": [{"product_id": str(self.product.id), "subtotal": 10, "unit_price": 5, **line}]}
+        return self.client.post("/api/orders/create", payload, format="json")
+
+    def test_product_without_batches_is_ordered_as_is(self):
+        response = self._create(order_quantity=2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(OrderItem.objects.get().batch_id, None)
+
+    def test_lines_without_a_batch_are_allocated(self):
+        batch = Batch.objects.create(product=self.product, batch_number="T1", quantity=Decimal(5))
+
+        self.assertEqual(self._create(order_quantity=2).status_code, 200)
+
+        batch.refresh_from_db()
+        self.assertEqual((OrderItem.objects.get().batch_id, batch.quantity), (batch.id, Decimal(3)))
+
+    def test_insufficient_stock_is_a_bad_request(self):
+        Batch.objects.create(product=self.product, batch_number="T1", quantity=Decimal(1))
+
+        response = self._create(order_quantity=2)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_reserving_more_than_the_named_batch_holds_is_a_bad_request(self):
+        batch = Batch.objects.create(product=self.product, batch_number="T1", quantity=Decimal(1))
+
+        response = self._create(order_quantity=2, batch_id=str(batch.id))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Insufficient stock", response.data[0])
+
+    def test_unknown_batch_is_a_bad_request(self):
+        batch = Batch.objects.create(product=self.product, batch_number="T1", quantity=Decimal(5))
+        batch_id = batch.id
+        batch.delete()
+
+        response = self._create(order_quantity=1, batch_id=str(batch_id))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_batch_of_another_product_is_a_bad_request(self):
+        other = Product.objects.create(name="Coffee", slug="coffee", product_type="simple")
+        batch = Batch.objects.create(product=other, batch_number="C1", quantity=Decimal(5))
+
+        response = self._create(order_quantity=1, batch_id=str(batch.id))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("does not exist for product", response.data[0])
+        batch.refresh_from_db()
+        self.assertEqual(batch.quantity, Decimal(5))
+
+    def test_order_quantity_is_required(self):
+        self.assertEqual(self._create().status_code, 400)
+
+
+class CheckoutQueryCountTests(TestCase):
+    # Order insert, batch lookup, stock lock + take, product lookup, product + card UPDATE,
+    # reservation commit and the savepoints around them
+    QUERIES = 20
+
+    @staticmethod
+    def _insert_statements(model, count):
+        """INSERTs a `bulk_create` of `count` rows needs, backends cap the parameters per statement."""
+        fields = model._meta.concrete_fields
+        return math.ceil(count / connection.ops.bulk_batch_size(fields, [None] * count))
+
+    def _assert_checkout_queries(self, line_count):
+        cart = BenchmarkCheckoutCommand._seed_cart(line_count)
+        expected = (self.QUERIES
+                    + self._insert_statements(OrderItem, line_count)
+                    + self._insert_statements(StockReservation, line_count))
+
+        with self.assertNumQueries(expected):
+            order_create_process(amount=0, customer_id=1, customer_contact="0", delivery_fee=0,
+                                 discount=0, paid_total=0, payment_gateway="CASH_ON_DELIVERY",
+                                 products=cart, sales_tax=0, total=0, use_wallet_points=False)
+
+        batch_ids = [line["batch_id"] for line in cart]
+        self.assertEqual(set(Batch.objects.filter(id__in=batch_ids).values_list("quantity", flat=True)),
+                         {Decimal(998)})
+        # The seeded products start at 0 (bulk_create skips the batch bookkeeping), so each moved by -2
+        self.assertEqual(set(Product.objects.filter(batches__id__in=batch_ids).values_list("quantity", flat=True)),
+                         {Decimal(-2)})
+
+    def test_one_line(self):
+        self._assert_checkout_queries(1)
+
+    def test_hundred_lines(self):
+        self._assert_checkout_queries(100)
+
+
+class OrderExportApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username="admin", email="admin@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            user.groups.add(Group.objects.create(name="super_admin"))
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+        for index, status in enumerate(["order-pending", "order-completed", "order-pending"]):
+            Order.objects.create(tracking_number=f"T{index}", customer_id=index, customer_contact="0",
+                                 amount=10, sales_tax=0, paid_total=10, total=10 + index, order_status=status)
+
+    def _export(self, **params):
+        response = self.client.get("/api/orders/export", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self._export()
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="orders.csv"')
+        rows = list(csv.DictReader(body.splitlines()))
+        self.assertEqual([(row["tracking_number"], row["total"]) for row in rows],
+                         [("T0", "10.00"), ("T1", "11.00"), ("T2", "12.00")])
+
+    def test_ndjson_applies_the_filters(self):
+        response, body = self._export(export_format="ndjson", order_status="order-pending")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row["tracking_number"], row["order_status"]) for row in rows],
+                         [("T0", "order-pending"), ("T2", "order-pending")])
+
+    def test_unknown_format_is_a_bad_request(self):
+        response = self.client.get("/api/orders/export", {"export_format": "xml"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("export_format", response.data)
+
+    def test_rows_are_streamed_rather_than_loaded(self):
+        self._export()  # caches the roles of the user
+
+        # Nothing is queried until the body is consumed, and the queryset cache is never filled
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/orders/export", {"export_format": "ndjson"})
+
+        with mock.patch.object(QuerySet, "_fetch_all", side_effect=AssertionError("queryset loaded")):
+            lines = list(response.streaming_content)
 
-# Create your tests here.
+        self.assertEqual(len(lines), 3)
@@ -4,6 +4,7 @@ from orders.apis import order_apis
 
 urlpatterns = [
     path('orders/', order_apis.OrderListApi.as_view()),
+    path('orders/export', order_apis.OrderExportApi.as_view()),
     path('orders/create', order_apis.OrderCreateApi.as_view()),
     path('shop/orders/create', order_apis.ShopOrderCreateApi.as_view()),
     path('orders/<str:order_id>', order_apis.OrderDetailApi.as_view()),
@@ -1,9 +1,10 @@
 import decimal
 import uuid
 from dataclasses import dataclass
+from decimal import Decimal
 from typing import List
 
-from products.selectors import product_get
+from products.selectors import product_in_bulk
 
 
 @dataclass
@@ -12,13 +13,15 @@ class OrderItem:
     order_quantity: int
 
 
-def calculate_order_amount(order_items: List[OrderItem]) -> decimal:
-    total_amount = 0.0
+def calculate_order_amount(order_items: List[dict]) -> decimal:
+    """Sum `price * order_quantity` over the order lines, pricing all products with one query."""
+    products = product_in_bulk(item.get('product_id') for item in order_items)
+
+    total_amount = Decimal(0)
 
     for item in order_items:
-        # Fetch product by ID
-        product = product_get(item.product_id)
+        product = products.get(item.get('product_id'))
         if product:
-            total_amount += product.price * item.order_quantity
+            total_amount += product.price * item.get('order_quantity')
 
     return total_amount
@@ -1,5 +1,6 @@
 from django.db import transaction
-from django.http import Http404
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import serializers, status
 from rest_framework.permissions import AllowAny
@@ -8,7 +9,8 @@ from rest_framework.views import APIView
 
 from common.utils import parse_search_query, get_paginated_response
 from common.views import BaseAPIView
-from products.selectors import category_list, category_get_by_slug, category_get
+from products.category_tree import category_tree_snapshot_get
+from products.selectors import category_list, category_get_by_slug, category_get, category_breadcrumbs
 from products.serializers import TypeSerializer
 from products.services.category_services import category_create, category_update, category_delete
 
@@ -51,6 +53,23 @@ class CategoryListApi(BaseAPIView):
         )
 
 
+class CategoryTreeApi(BaseAPIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        # Served from a per-process pre-rendered snapshot, see products.category_tree
+        snapshot = category_tree_snapshot_get()
+
+        if snapshot.etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot.body, content_type="application/json")
+
+        response["ETag"] = snapshot.etag
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        return response
+
+
 class CategoryDetailApi(BaseAPIView):
     class OutputSerializer(serializers.Serializer):
         id = serializers.CharField()
@@ -62,8 +81,14 @@ class CategoryDetailApi(BaseAPIView):
         language = serializers.CharField()
         translated_languages = serializers.JSONField()
         type = TypeSerializer(required=False)
+        depth = serializers.IntegerField()
+        breadcrumbs = serializers.SerializerMethodField()
         # parent = CategorySerializer(required=False)
 
+        def get_breadcrumbs(self, obj):
+            return [{"id": str(category.id), "name": category.name, "slug": category.slug}
+                    for category in category_breadcrumbs(category=obj)]
+
     def get(self, request, slug):
         category = category_get_by_slug(slug)
 
@@ -5,13 +5,15 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from common.export import get_streaming_export_response
 from common.utils import parse_search_query, get_paginated_response
-from products.models import AttributeValue
-from products.selectors import product_list, product_get_by_slug
+from products.facets import product_facet_counts
+from products.selectors import product_card_list, product_list, product_get_by_slug, product_detail_get_by_slug
 from products.serializers import TypeSerializer, CategorySerializer, TagSerializer, ManufacturerSerializer, \
     AuthorSerializer, BatchSerializer, AttributeValueSerializer, AttributeValueWithAttributeSerializer, \
     ProductVariationSerializer
 from products.services.product_services import product_create, product_delete, product_update, product_create_process
+from users.permissions import IsSuperAdminOrStoreOwner
 
 
 class ProductListApi(APIView):
@@ -20,6 +22,16 @@ class ProductListApi(APIView):
     class FilterSerializer(serializers.Serializer):
         id = serializers.IntegerField(required=False)
         name = serializers.CharField(required=False)
+        q = serializers.CharField(required=False)
+        type = serializers.CharField(required=False)
+        categories = serializers.CharField(required=False)
+        category = serializers.CharField(required=False)
+        tags = serializers.CharField(required=False)
+        manufacturer = serializers.CharField(required=False)
+        author = serializers.CharField(required=False)
+        min_price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+        max_price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+        in_stock = serializers.BooleanField(required=False)
 
     class OutputSerializer(serializers.Serializer):
         id = serializers.UUIDField()
@@ -39,19 +51,113 @@ class ProductListApi(APIView):
         filters = parse_search_query(search_query)
 
         # Make sure the filters are valid, if passed
-        filters_serializer = self.FilterSerializer(data={**request.query_params, **filters})
+        filters_serializer = self.FilterSerializer(data={**request.query_params.dict(), **filters})
         filters_serializer.is_valid(raise_exception=True)
 
-        products = product_list(filters=filters_serializer.validated_data)
+        filters = filters_serializer.validated_data
+        products = product_list(filters=filters)
 
-        # Apply pagination
+        # Apply pagination, search results keep their relevance order
         return get_paginated_response(
             serializer_class=self.OutputSerializer,
             queryset=products,
             request=request,
+            default_order_by=None if filters.get("q") else "id",
         )
 
 
+class ProductCardListApi(APIView):
+    """Storefront listing read from the denormalized `ProductCard` table, newest first by default."""
+    permission_classes = [AllowAny]
+
+    class FilterSerializer(serializers.Serializer):
+        type = serializers.CharField(required=False)
+        min_price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+        max_price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+        in_stock = serializers.BooleanField(required=False)
+
+    class OutputSerializer(serializers.Serializer):
+        id = serializers.UUIDField(source="product_id")
+        name = serializers.CharField()
+        slug = serializers.CharField()
+        product_type = serializers.CharField()
+        unit = serializers.CharField()
+        image = serializers.JSONField()
+        type = serializers.CharField(source="type_slug")
+        category = serializers.SerializerMethodField()
+        manufacturer = serializers.CharField(source="manufacturer_name")
+        price = serializers.DecimalField(max_digits=10, decimal_places=2)
+        sale_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+        min_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+        max_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+        in_stock = serializers.BooleanField()
+        ratings = serializers.DecimalField(max_digits=3, decimal_places=2)
+        total_reviews = serializers.IntegerField()
+
+        def get_category(self, obj):
+            return {"slug": obj.category_slug, "name": obj.category_name} if obj.category_slug else None
+
+    def get(self, request):
+        filters = parse_search_query(request.query_params.get("search", None))
+
+        filters_serializer = self.FilterSerializer(data={**request.query_params.dict(), **filters})
+        filters_serializer.is_valid(raise_exception=True)
+
+        cards = product_card_list(filters=filters_serializer.validated_data)
+
+        return get_paginated_response(
+            serializer_class=self.OutputSerializer,
+            queryset=cards,
+            request=request,
+            default_order_by="created_at",
+        )
+
+
+class ProductFacetApi(APIView):
+    """Counts per type, category, tag, manufacturer, author, stock state and price range."""
+    permission_classes = [AllowAny]
+
+    class FilterSerializer(ProductListApi.FilterSerializer):
+        pass
+
+    def get(self, request):
+        filters = parse_search_query(request.query_params.get("search", None))
+
+        filters_serializer = self.FilterSerializer(data={**request.query_params.dict(), **filters})
+        filters_serializer.is_valid(raise_exception=True)
+
+        facets = product_facet_counts(filters=filters_serializer.validated_data)
+
+        return Response({"data": facets}, status=status.HTTP_200_OK)
+
+
+class ProductExportApi(APIView):
+    """Stream the product catalog as CSV or NDJSON."""
+    permission_classes = [IsSuperAdminOrStoreOwner]
+
+    class FilterSerializer(ProductListApi.FilterSerializer):
+        export_format = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+
+    FIELDS = ["id", "name", "slug", "sku", "status", "product_type", "type__slug", "price", "sale_price",
+              "min_price", "max_price", "quantity", "in_stock", "unit", "is_active", "created_at"]
+
+    def get(self, request):
+        filters = parse_search_query(request.query_params.get("search", None))
+
+        filters_serializer = self.FilterSerializer(data={**request.query_params.dict(), **filters})
+        filters_serializer.is_valid(raise_exception=True)
+        filters = filters_serializer.validated_data
+        export_format = filters.pop("export_format")
+
+        products = product_list(filters=filters).order_by("created_at", "id")
+
+        return get_streaming_export_response(queryset=products,
+                                             fields=self.FIELDS,
+                                             headers=[field.replace("__", "_") for field in self.FIELDS],
+                                             export_format=export_format,
+                                             filename="products")
+
+
 class ProductDetailApi(APIView):
     class OutputSerializer(serializers.Serializer):
         id = serializers.CharField()
@@ -81,11 +187,12 @@ class ProductDetailApi(APIView):
         variation_options = serializers.SerializerMethodField()
 
         def get_variations(self, obj):
-            # Get all related ProductVariation instances
-            variations = obj.variations.all()
-            # Collect all AttributeValue objects from each variation
-            attribute_values = AttributeValue.objects.filter(productvariation__in=variations).distinct()
-            return AttributeValueWithAttributeSerializer(attribute_values, many=True).data
+            # Collect the distinct AttributeValue objects used by the (prefetched) variations
+            attribute_values = {}
+            for variation in obj.variations.all():
+                for attribute_value in variation.value.all():
+                    attribute_values.setdefault(attribute_value.pk, attribute_value)
+            return AttributeValueWithAttributeSerializer(attribute_values.values(), many=True).data
 
         def get_variation_options(self, obj):
             # Get all related ProductVariation instances
@@ -93,7 +200,7 @@ class ProductDetailApi(APIView):
             return ProductVariationSerializer(variations, many=True).data
 
     def get(self, request, slug):
-        product = product_get_by_slug(slug)
+        product = product_detail_get_by_slug(slug)
 
         if product is None:
             raise Http404
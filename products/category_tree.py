@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from products.models import Category
+
+CATEGORY_TREE_VERSION_CACHE_KEY = "products:category_tree:version"
+
+
+@dataclass(frozen=True)
+class CategoryTreeSnapshot:
+    version: int
+    body: bytes
+    etag: str
+    built_at: float
+
+
+_snapshot: Optional[CategoryTreeSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def category_tree_version_get() -> int:
+    version = cache.get(CATEGORY_TREE_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(CATEGORY_TREE_VERSION_CACHE_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CATEGORY_TREE_VERSION_CACHE_KEY)
+    return version
+
+
+def category_tree_invalidate() -> None:
+    """Bump the shared version once the current transaction commits; every process rebuilds lazily."""
+
+    def bump():
+        try:
+            cache.incr(CATEGORY_TREE_VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(CATEGORY_TREE_VERSION_CACHE_KEY, category_tree_version_get() + 1, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def category_tree_build() -> List[Dict[str, Any]]:
+    """
+    Nested list of every category, built from one query ordered by path.
+
+    Parents sort before their children, so each node can be attached as it is read.
+    Categories whose parent was deleted become roots.
+    """
+    nodes: Dict[Any, Dict[str, Any]] = {}
+    roots = []
+
+    categories = Category.objects.select_related('type').only(
+        'id', 'name', 'slug', 'icon', 'image', 'depth', 'path', 'parent_id', 'type__slug',
+    ).order_by('path')
+    for category in categories:
+        node = {
+            "id": str(category.id),
+            "name": category.name,
+            "slug": category.slug,
+            "icon": category.icon,
+            "image": category.image,
+            "type": category.type.slug if category.type else None,
+            "depth": category.depth,
+            "children": [],
+        }
+        nodes[category.id] = node
+        parent = nodes.get(category.parent_id)
+        (parent["children"] if parent is not None else roots).append(node)
+
+    return roots
+
+
+def _is_current(snapshot: Optional[CategoryTreeSnapshot], version: int) -> bool:
+    # The age bound covers caches that are not shared, where another process's bump is never seen
+    return (snapshot is not None and snapshot.version == version
+            and time.monotonic() - snapshot.built_at < settings.LOCAL_CACHE_MAX_AGE)
+
+
+def category_tree_snapshot_get() -> CategoryTreeSnapshot:
+    """Pre-rendered JSON of the whole category tree, rebuilt when the shared version moves or it ages out."""
+    global _snapshot
+
+    version = category_tree_version_get()
+    snapshot = _snapshot
+    if _is_current(snapshot, version):
+        return snapshot
+
+    with _snapshot_lock:
+        if _is_current(_snapshot, version):
+            return _snapshot
+
+        body = JSONRenderer().render({"data": category_tree_build()})
+        etag = f'"{version}-{hashlib.md5(body).hexdigest()}"'
+        _snapshot = CategoryTreeSnapshot(version=version, body=body, etag=etag, built_at=time.monotonic())
+        return _snapshot
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import time
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet
+
+from products.filters import BaseProductFilter
+from products.models import Product
+from products.search import product_search
+
+FACETS_VERSION_CACHE_KEY = "products:facets:version"
+FACETS_CACHE_KEY = "products:facets:{version}:{digest}"
+
+# Facets over a related model, each named after the `Product` relation and the filter it counts against
+RELATION_FACETS = ("type", "manufacturer", "author", "categories", "tags")
+
+MULTI_VALUE_FILTERS = ("categories", "tags", "manufacturer", "author")
+
+
+def _config() -> Dict[str, Any]:
+    return getattr(settings, "PRODUCT_FACETS", {})
+
+
+def product_facets_version_get() -> int:
+    version = cache.get(FACETS_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(FACETS_VERSION_CACHE_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(FACETS_VERSION_CACHE_KEY)
+    return version
+
+
+def product_facets_invalidate() -> None:
+    """Drop every cached facet count once the current transaction commits."""
+
+    def bump():
+        try:
+            cache.incr(FACETS_VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(FACETS_VERSION_CACHE_KEY, product_facets_version_get() + 1, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def _normalize(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical form of a filter state, so equivalent requests share a cache entry."""
+    normalized = {}
+    for key, value in filters.items():
+        if value is None or value == "":
+            continue
+        if key in MULTI_VALUE_FILTERS:
+            values = value.split(",") if isinstance(value, str) else list(value)
+            value = ",".join(sorted({str(item).strip() for item in values if str(item).strip()}))
+        elif isinstance(value, Decimal):
+            value = str(value.normalize())
+        normalized[key] = value
+    return normalized
+
+
+def _filtered(base: QuerySet, filters: Dict[str, Any], exclude=()) -> QuerySet:
+    data = {key: value for key, value in filters.items() if key not in exclude}
+    return Product.objects.filter(id__in=BaseProductFilter(data, base).qs.values("id"))
+
+
+def _relation_counts(products: QuerySet, relation: str) -> List[Dict[str, Any]]:
+    value_field, label_field = f"{relation}__slug", f"{relation}__name"
+    # One filter() call, so the join is shared with the grouping below and soft-deleted values are skipped
+    rows = (products.filter(**{f"{relation}__isnull": False, f"{relation}__deleted_at__isnull": True})
+            .values(value_field, label_field)
+            .annotate(count=Count("id", distinct=True))
+            .order_by("-count", value_field))
+    return [{"value": row[value_field], "label": row[label_field], "count": row["count"]} for row in rows]
+
+
+def _price_counts(products: QuerySet, edges: List[Decimal]) -> List[Dict[str, Any]]:
+    buckets = [(low, high) for low, high in zip(edges, edges[1:] + [None])]
+    aggregates = {
+        # Bucketed by the lowest price a product sells at
+        f"bucket_{index}": Count("id", filter=Q(min_price__gte=low) & (Q(min_price__lt=high) if high is not None else Q()))
+        for index, (low, high) in enumerate(buckets)
+    }
+    counts = products.aggregate(**aggregates)
+    return [{"from": low, "to": high, "count": counts[f"bucket_{index}"]} for index, (low, high) in enumerate(buckets)]
+
+
+def product_facet_counts(*, filters=None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Counts per facet value for the products matching `filters`.
+
+    Each facet is counted against the set filtered by every other facet, so picking a
+    category still shows how many products the sibling categories would give. The cost is
+    one grouped query per facet whatever the catalog size, and results are cached by
+    normalized filter state until a product changes or `PRODUCT_FACETS["CACHE_TTL"]` passes.
+    """
+    filters = _normalize(dict(filters or {}))
+    digest = hashlib.md5(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()
+    key = FACETS_CACHE_KEY.format(version=product_facets_version_get(), digest=digest)
+
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    query = filters.pop("q", None)
+    base = Product.objects.all()
+    if query:
+        base = base.filter(id__in=[product_id for product_id, _ in product_search(query=query)])
+
+    facets = {}
+    for relation in RELATION_FACETS:
+        facets[relation] = _relation_counts(_filtered(base, filters, (relation,)), relation)
+
+    in_stock = _filtered(base, filters, ("in_stock",)).values("in_stock").annotate(count=Count("id"))
+    facets["in_stock"] = [{"value": row["in_stock"], "count": row["count"]}
+                          for row in in_stock.order_by("-in_stock")]
+
+    edges = [Decimal(str(edge)) for edge in _config().get("PRICE_BUCKETS", [0, 10, 25, 50, 100, 250, 500])]
+    facets["price"] = _price_counts(_filtered(base, filters, ("min_price", "max_price")), edges)
+
+    cache.set(key, facets, timeout=_config().get("CACHE_TTL", 60))
+    return facets
@@ -1,6 +1,11 @@
 import django_filters
+from django.db.models import Subquery
 
-from products.models import Category, Product
+from products.models import Category, Product, ProductCard
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Comma-separated list of values, e.g. `categories=fruits,vegetables`."""
 
 
 class BaseCategoryFilter(django_filters.FilterSet):
@@ -13,7 +18,33 @@ class BaseCategoryFilter(django_filters.FilterSet):
 
 class BaseProductFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(field_name='name', lookup_expr='icontains', label="Name")
+    type = django_filters.CharFilter(field_name='type__slug', label="Type")
+    categories = CharInFilter(field_name='categories__slug', distinct=True, label="Categories")
+    tags = CharInFilter(field_name='tags__slug', distinct=True, label="Tags")
+    category = django_filters.CharFilter(method='filter_category_subtree', label="Category and its descendants")
+    manufacturer = CharInFilter(field_name='manufacturer__slug', label="Manufacturer")
+    author = CharInFilter(field_name='author__slug', label="Author")
+    # Products whose price range overlaps [min_price, max_price], both served by an index
+    min_price = django_filters.NumberFilter(field_name='max_price', lookup_expr='gte', label="Min price")
+    max_price = django_filters.NumberFilter(field_name='min_price', lookup_expr='lte', label="Max price")
+    in_stock = django_filters.BooleanFilter(field_name='in_stock', label="In stock")
 
     class Meta:
         model = Product
         fields = ("id", "name")
+
+    def filter_category_subtree(self, queryset, name, value):
+        # A category without a path (only possible for rows written around save) matches nothing
+        path = Category.objects.filter(slug=value).exclude(path='').values('path')[:1]
+        return queryset.filter(categories__path__startswith=Subquery(path)).distinct()
+
+
+class ProductCardFilter(django_filters.FilterSet):
+    type = django_filters.CharFilter(field_name='type_slug', label="Type")
+    min_price = django_filters.NumberFilter(field_name='min_price', lookup_expr='gte', label="Min price")
+    max_price = django_filters.NumberFilter(field_name='min_price', lookup_expr='lte', label="Max price")
+    in_stock = django_filters.BooleanFilter(field_name='in_stock', label="In stock")
+
+    class Meta:
+        model = ProductCard
+        fields = ("type", "in_stock")
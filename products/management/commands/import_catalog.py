@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services.import_services import CATALOG_IMPORT_FORMATS, catalog_import, catalog_rows_read
+
+
+class Command(BaseCommand):
+    help = "Bulk import products, batches and variations from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=CATALOG_IMPORT_FORMATS,
+                            help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, path, format, chunk_size, **options):
+        format = format or os.path.splitext(path)[1].lstrip(".").lower()
+        if format == "json":
+            format = "jsonl"
+        if format not in CATALOG_IMPORT_FORMATS:
+            raise CommandError(f"Cannot tell the format of '{path}', pass --format.")
+
+        with open(path, newline="", encoding="utf-8") as file:
+            result = catalog_import(rows=catalog_rows_read(file=file, format=format), chunk_size=chunk_size)
+
+        for error in result.errors:
+            self.stderr.write(f"line {error.line} ({error.slug or '-'}): {error.message}")
+
+        self.stdout.write(
+            f"Imported {result.products} product(s), {result.batches} batch(es), "
+            f"{result.variations} variation(s); {len(result.errors)} row(s) rejected."
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.services.search_services import product_search_documents_refresh
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search document of every product."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, chunk_size, **options):
+        refreshed = product_search_documents_refresh(chunk_size=chunk_size)
+        self.stdout.write(f"Rebuilt {refreshed} product search document(s).")
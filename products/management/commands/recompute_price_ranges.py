@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.services.batch_services import products_price_range_refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute min_price/max_price of every product from its batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, chunk_size, **options):
+        product_ids = Product.all_objects.order_by("id").values_list("id", flat=True)
+
+        total = 0
+        chunk = []
+        for product_id in product_ids.iterator(chunk_size=chunk_size):
+            chunk.append(product_id)
+            if len(chunk) >= chunk_size:
+                products_price_range_refresh(product_ids=chunk)
+                total += len(chunk)
+                chunk = []
+
+        if chunk:
+            products_price_range_refresh(product_ids=chunk)
+            total += len(chunk)
+
+        self.stdout.write(f"Recomputed the price range of {total} product(s).")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from products.services.product_services import product_quantities_reconcile
+
+
+class Command(BaseCommand):
+    help = "Verify Product.quantity/in_stock against the sum of batch quantities, optionally repairing drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Repair the products that drifted.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, fix, chunk_size, **options):
+        drift = product_quantities_reconcile(fix=fix, chunk_size=chunk_size)
+
+        for row in drift:
+            self.stdout.write(
+                f"{row['id']}: quantity {row['quantity']} (in_stock={row['in_stock']}), batches {row['actual_quantity']}"
+            )
+
+        action = "Repaired" if fix else "Found"
+        self.stdout.write(f"{action} {len(drift)} drifted product(s).")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from products.services.reservation_services import stock_reservations_release_expired
+
+
+class Command(BaseCommand):
+    help = "Return the stock of expired pending reservations to their batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        total = 0
+        while True:
+            released = stock_reservations_release_expired(limit=batch_size)
+            total += released
+            if released < batch_size:
+                break
+
+        self.stdout.write(f"Released {total} expired reservation(s).")
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE products_productsearchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX product_search_vector_idx ON products_productsearchdocument USING GIN (search_vector)",
+    "CREATE INDEX product_search_name_trgm_idx ON products_productsearchdocument USING GIN (name gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS product_search_name_trgm_idx",
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "ALTER TABLE products_productsearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run_on_postgres(statements):
+    def run(apps, schema_editor):
+        # The full-text column and indexes only exist on PostgreSQL, other backends use the in-memory index
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+def backfill_documents(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductSearchDocument = apps.get_model("products", "ProductSearchDocument")
+
+    products = (Product.objects.filter(deleted_at__isnull=True)
+                .select_related("author", "manufacturer").prefetch_related("tags", "categories"))
+    documents = []
+    for product in products.iterator(chunk_size=1000):
+        parts = [product.description, product.sku]
+        parts += [tag.name for tag in product.tags.all()]
+        parts += [category.name for category in product.categories.all()]
+        parts += [related.name for related in (product.author, product.manufacturer) if related is not None]
+        documents.append(ProductSearchDocument(product_id=product.id, name=product.name,
+                                               body=" ".join(part for part in parts if part)))
+        if len(documents) >= 1000:
+            ProductSearchDocument.objects.bulk_create(documents)
+            documents = []
+    ProductSearchDocument.objects.bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='products.product')),
+                ('name', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(_run_on_postgres(POSTGRES_FORWARD), _run_on_postgres(POSTGRES_BACKWARD)),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
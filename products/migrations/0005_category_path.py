@@ -0,0 +1,51 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:19
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    paths = {}
+
+    def path_of(category_id, seen=()):
+        if category_id not in paths:
+            parent_id = parents.get(category_id)
+            # A parent cycle in old data is cut at the category met twice
+            if parent_id is None or parent_id not in parents or parent_id in seen:
+                paths[category_id] = f"{category_id.hex}/"
+            else:
+                paths[category_id] = path_of(parent_id, seen + (category_id,)) + f"{category_id.hex}/"
+        return paths[category_id]
+
+    categories = list(Category.objects.only("id"))
+    for category in categories:
+        category.path = path_of(category.id)
+        category.depth = category.path.count("/") - 1
+    Category.objects.bulk_update(categories, ["path", "depth"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
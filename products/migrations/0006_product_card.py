@@ -0,0 +1,44 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_category_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='products.product')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.SlugField(max_length=255)),
+                ('status', models.CharField(max_length=50)),
+                ('product_type', models.CharField(max_length=50)),
+                ('is_active', models.BooleanField(default=True)),
+                ('unit', models.CharField(blank=True, max_length=50, null=True)),
+                ('image', models.JSONField(blank=True, default=dict, null=True)),
+                ('type_slug', models.CharField(blank=True, max_length=20, null=True)),
+                ('category_slug', models.CharField(blank=True, max_length=255, null=True)),
+                ('category_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('manufacturer_name', models.CharField(blank=True, max_length=50, null=True)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('sale_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('in_stock', models.BooleanField(default=True)),
+                ('ratings', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'is_active', 'created_at'], name='product_card_listing_idx'), models.Index(fields=['type_slug', 'status', 'is_active', 'created_at'], name='product_card_type_idx')],
+            },
+        ),
+    ]
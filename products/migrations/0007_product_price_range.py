@@ -0,0 +1,45 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:23
+
+from django.db import migrations, models
+from django.db.models import Case, F, Max, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+
+def backfill_price_ranges(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    Batch = apps.get_model("products", "Batch")
+
+    def batch_range(aggregate):
+        effective_price = Case(When(sale_price__gt=0, then=F("sale_price")), default=F("price"))
+        priced = (Batch.objects
+                  .filter(Q(product=OuterRef("pk")) | Q(product_variation__product=OuterRef("pk")),
+                          is_active=True, deleted_at__isnull=True)
+                  .filter(Q(price__gt=0) | Q(sale_price__gt=0))
+                  .order_by()
+                  .values(owner=Value(1))
+                  .annotate(value=aggregate(effective_price))
+                  .values("value"))
+        return Subquery(priced[:1])
+
+    own_price = Coalesce(F("sale_price"), F("price"))
+    Product.objects.update(min_price=Coalesce(batch_range(Min), own_price),
+                           max_price=Coalesce(batch_range(Max), own_price))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_card'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_price'], name='product_min_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['max_price'], name='product_max_price_idx'),
+        ),
+        migrations.RunPython(backfill_price_ranges, migrations.RunPython.noop),
+    ]
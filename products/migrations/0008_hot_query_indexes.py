@@ -0,0 +1,25 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_price_range'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['product', 'expiry_date'], name='batch_product_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['status', 'is_active', '-created_at'], name='product_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['type', 'status', 'is_active'], name='product_type_live_idx'),
+        ),
+    ]
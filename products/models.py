@@ -2,7 +2,7 @@ import uuid
 
 from django.db import models
 
-from common.models import BaseModel
+from common.models import BaseModel, NOT_DELETED
 
 
 def default_translated_languages():
@@ -35,6 +35,24 @@ class Category(BaseModel):
     image = models.JSONField(default=list, blank=True, null=True)  # Assuming it's a JSON field
     icon = models.CharField(max_length=255, null=True, blank=True)
     type = models.ForeignKey(Type, on_delete=models.SET_NULL, blank=True, null=True)
+    # Materialized path: hex ids of the ancestors and the category itself, each followed by "/".
+    # Set on first save and moved with the subtree by category_update; subtrees are a `path__startswith` away.
+    path = models.CharField(max_length=1024, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Also covers categories created outside category_create, e.g. the admin and its imports
+        if not self.path:
+            self.path = f"{self.parent.path if self.parent else ''}{self.pk.hex}/"
+            self.depth = self.path.count("/") - 1
+            if kwargs.get("update_fields"):
+                kwargs["update_fields"] = [*kwargs["update_fields"], "path", "depth"]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -139,6 +157,16 @@ class Product(BaseModel):
     author = models.ForeignKey(Author, blank=True, null=True, on_delete=models.SET_NULL, default=None)
     manufacturer = models.ForeignKey(Manufacturer, blank=True, null=True, on_delete=models.SET_NULL, default=None)
 
+    class Meta:
+        indexes = [
+            # Price-range filters and sorting; kept current by batch_services.products_price_range_refresh
+            models.Index(fields=['min_price'], name='product_min_price_idx'),
+            models.Index(fields=['max_price'], name='product_max_price_idx'),
+            # Storefront listings, newest first, with and without a type
+            models.Index(fields=['status', 'is_active', '-created_at'], name='product_live_idx', condition=NOT_DELETED),
+            models.Index(fields=['type', 'status', 'is_active'], name='product_type_live_idx', condition=NOT_DELETED),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -192,6 +220,92 @@ class Batch(BaseModel):
     class Meta:
         unique_together = ('product', 'batch_number')
         ordering = ['-created_at']
+        indexes = [
+            # FEFO allocation reads a product's batches in expiry order
+            models.Index(fields=['product', 'expiry_date'], name='batch_product_expiry_idx', condition=NOT_DELETED),
+        ]
 
     def __str__(self):
         return f"Batch {self.batch_number} - {self.product.name if self.product else self.variation.product.name}"
+
+
+class StockReservation(BaseModel):
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    expires_at = models.DateTimeField()
+    reference = models.CharField(max_length=100, blank=True, null=True)  # e.g. the order id once committed
+
+    batch = models.ForeignKey(Batch, related_name='reservations', on_delete=models.CASCADE)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='stock_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reservation {self.quantity} of {self.batch_id} ({self.status})"
+
+
+class ProductSearchDocument(models.Model):
+    """
+    Denormalized text searched by `products.search`, one row per product.
+
+    `body` holds the description, SKU, tag, category, author and manufacturer names. On
+    PostgreSQL the table also carries a generated, GIN-indexed `search_vector` column and a
+    trigram index on `name` (see migration 0004); they are not declared here.
+    """
+    product = models.OneToOneField(Product, primary_key=True, related_name='search_document', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document of {self.product_id}"
+
+
+class ProductCard(models.Model):
+    """
+    Pre-shaped storefront card of a product, one row per live product.
+
+    Copies what a listing renders from `Product` and its type, categories and manufacturer,
+    so the card listing reads a single table. Maintained by `products.services.card_services`.
+    """
+    product = models.OneToOneField(Product, primary_key=True, related_name='card', on_delete=models.CASCADE)
+    name = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255)
+    status = models.CharField(max_length=50)
+    product_type = models.CharField(max_length=50)
+    is_active = models.BooleanField(default=True)
+    unit = models.CharField(max_length=50, blank=True, null=True)
+    image = models.JSONField(default=dict, blank=True, null=True)
+    type_slug = models.CharField(max_length=20, blank=True, null=True)
+    # First of the product's categories in tree order
+    category_slug = models.CharField(max_length=255, blank=True, null=True)
+    category_name = models.CharField(max_length=255, blank=True, null=True)
+    manufacturer_name = models.CharField(max_length=50, blank=True, null=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    sale_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    in_stock = models.BooleanField(default=True)
+    ratings = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    total_reviews = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'is_active', 'created_at'], name='product_card_listing_idx'),
+            models.Index(fields=['type_slug', 'status', 'is_active', 'created_at'], name='product_card_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"Card of {self.name}"
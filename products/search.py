@@ -0,0 +1,181 @@
+import difflib
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from products.models import ProductSearchDocument
+
+SEARCH_INDEX_VERSION_CACHE_KEY = "products:search:version"
+
+# Relative weight of a term found in the product name vs. the rest of the document
+NAME_WEIGHT = 3.0
+BODY_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def product_search_body(product) -> str:
+    """Everything but the name that a product can be found by; relations are expected to be loaded."""
+    parts = [product.description, product.sku]
+    parts += [tag.name for tag in product.tags.all()]
+    parts += [category.name for category in product.categories.all()]
+    parts += [related.name for related in (product.author, product.manufacturer) if related is not None]
+    return " ".join(part for part in parts if part)
+
+
+def search_index_version_get() -> int:
+    version = cache.get(SEARCH_INDEX_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(SEARCH_INDEX_VERSION_CACHE_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(SEARCH_INDEX_VERSION_CACHE_KEY)
+    return version
+
+
+def search_index_invalidate() -> None:
+    """Make in-memory indexes in every process rebuild once the current transaction commits."""
+
+    def bump():
+        try:
+            cache.incr(SEARCH_INDEX_VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(SEARCH_INDEX_VERSION_CACHE_KEY, search_index_version_get() + 1, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+class PostgresSearchBackend:
+    """
+    Ranked full-text search over the generated `search_vector` column.
+
+    Queries use `websearch_to_tsquery` (quoted phrases, `or`, `-term`) and are ranked with
+    `ts_rank_cd`, name matches weighing more. When nothing matches, typos are caught by a
+    trigram word-similarity match on the name.
+    """
+    config = "simple"
+
+    def search(self, *, query: str, limit: int) -> List[Tuple[str, float]]:
+        matches = ProductSearchDocument.objects.filter(
+            RawSQL("search_vector @@ websearch_to_tsquery(%s::regconfig, %s)", (self.config, query),
+                   output_field=BooleanField())
+        ).annotate(
+            rank=RawSQL("ts_rank_cd(search_vector, websearch_to_tsquery(%s::regconfig, %s))", (self.config, query),
+                        output_field=FloatField())
+        ).order_by("-rank", "product_id")
+        results = list(matches.values_list("product_id", "rank")[:limit])
+        if results:
+            return results
+
+        similar = ProductSearchDocument.objects.filter(
+            RawSQL("%s <%% name", (query,), output_field=BooleanField())
+        ).annotate(
+            rank=RawSQL("word_similarity(%s, name)", (query,), output_field=FloatField())
+        ).order_by("-rank", "product_id")
+        return list(similar.values_list("product_id", "rank")[:limit])
+
+
+class InMemorySearchBackend:
+    """
+    Per-process inverted index over `ProductSearchDocument`, for SQLite and tests.
+
+    Terms are scored TF-IDF style with name hits weighted up, and every query term must
+    match. A term missing from the vocabulary is replaced by its closest known terms, so
+    small typos still find products. The index is rebuilt when the shared version moves, or
+    after `LOCAL_CACHE_MAX_AGE` seconds in case the move went to a cache this process does not share.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._built_at = 0.0
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._documents = 0
+        self._lock = threading.Lock()
+
+    def _build(self) -> None:
+        postings = defaultdict(dict)
+        documents = 0
+        for product_id, name, body in ProductSearchDocument.objects.values_list("product_id", "name", "body").iterator():
+            documents += 1
+            for weight, text in ((NAME_WEIGHT, name), (BODY_WEIGHT, body)):
+                for term in tokenize(text):
+                    postings[term][product_id] = postings[term].get(product_id, 0.0) + weight
+        self._postings = dict(postings)
+        self._documents = documents
+
+    def _is_current(self, version: int) -> bool:
+        return self._version == version and time.monotonic() - self._built_at < settings.LOCAL_CACHE_MAX_AGE
+
+    def _ensure_fresh(self) -> None:
+        version = search_index_version_get()
+        if self._is_current(version):
+            return
+        with self._lock:
+            if not self._is_current(version):
+                self._build()
+                self._version = version
+                self._built_at = time.monotonic()
+
+    def _term_postings(self, term: str) -> Dict[str, float]:
+        if term in self._postings:
+            return self._postings[term]
+
+        merged: Dict[str, float] = {}
+        for candidate in difflib.get_close_matches(term, self._postings.keys(), n=3, cutoff=0.75):
+            for product_id, weight in self._postings[candidate].items():
+                merged[product_id] = max(merged.get(product_id, 0.0), weight)
+        return merged
+
+    def search(self, *, query: str, limit: int) -> List[Tuple[str, float]]:
+        self._ensure_fresh()
+
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        documents = self._documents or 1
+        scores: Optional[Dict[str, float]] = None
+        for term in terms:
+            postings = self._term_postings(term)
+            idf = math.log(1 + documents / (len(postings) or 1))
+            term_scores = {product_id: (1 + math.log(weight)) * idf for product_id, weight in postings.items()}
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {product_id: score + term_scores[product_id]
+                          for product_id, score in scores.items() if product_id in term_scores}
+            if not scores:
+                return []
+
+        return sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))[:limit]
+
+
+_backends = {}
+
+
+def get_search_backend():
+    """The configured backend; "auto" uses PostgreSQL full-text search when the database supports it."""
+    backend = getattr(settings, "PRODUCT_SEARCH", {}).get("BACKEND", "auto")
+    if backend == "auto":
+        backend = "postgres" if connection.vendor == "postgresql" else "memory"
+
+    if backend not in _backends:
+        _backends[backend] = PostgresSearchBackend() if backend == "postgres" else InMemorySearchBackend()
+    return _backends[backend]
+
+
+def product_search(*, query: str, limit: int = None) -> List[Tuple[str, float]]:
+    """(product id, score) pairs matching `query`, best first."""
+    limit = limit or getattr(settings, "PRODUCT_SEARCH", {}).get("MAX_RESULTS", 500)
+    return get_search_backend().search(query=query, limit=limit)
@@ -1,11 +1,13 @@
-from typing import Optional
+import uuid
+from typing import Any, Dict, List, Optional
 
-from django.db.models import QuerySet
+from django.db.models import Case, IntegerField, QuerySet, Prefetch, Value, When
 
 from common.utils import get_object
-from products.filters import BaseCategoryFilter, BaseProductFilter
+from products.filters import BaseCategoryFilter, BaseProductFilter, ProductCardFilter
+from products.search import product_search
 from products.models import Type, Tag, Category, Attribute, Manufacturer, Author, Product, AttributeValue, Batch, \
-    ProductVariation
+    ProductCard, ProductVariation
 
 
 def type_list(*, filters=None) -> QuerySet[Type]:
@@ -49,7 +51,7 @@ def tag_get_by_slug(slug) -> Optional[Tag]:
 def category_list(*, filters=None) -> QuerySet[Category]:
     filters = filters or {}
 
-    qs = Category.objects.all()
+    qs = Category.objects.select_related('type')
 
     return BaseCategoryFilter(filters, qs).qs
 
@@ -66,6 +68,27 @@ def category_get(category_id) -> Optional[Category]:
     return category
 
 
+def category_descendant_list(*, category: Category, include_self: bool = True) -> QuerySet[Category]:
+    """Every category below `category`, at any depth, with a single indexed prefix query."""
+    qs = Category.objects.filter(path__startswith=category.path)
+    if not include_self:
+        qs = qs.exclude(pk=category.pk)
+
+    return qs.order_by('path')
+
+
+def category_breadcrumbs(*, category: Category) -> List[Category]:
+    """Ancestors of `category` from the root down, itself included, read from its path."""
+    ancestor_ids = [uuid.UUID(segment) for segment in category.path.split('/') if segment]
+
+    return list(Category.objects.filter(id__in=ancestor_ids).order_by('depth'))
+
+
+def category_product_list(*, category: Category) -> QuerySet[Product]:
+    """Products filed under `category` or any of its descendants."""
+    return Product.objects.filter(categories__path__startswith=category.path).distinct()
+
+
 def attribute_list(*, filters=None) -> QuerySet[Attribute]:
     filters = filters or {}
 
@@ -115,11 +138,29 @@ def author_get_by_slug(slug) -> Optional[Author]:
 
 
 def product_list(*, filters=None) -> QuerySet[Product]:
+    """Products matching `filters`; with a free-text `q` they are limited to search hits, best first."""
+    filters = dict(filters or {})
+    query = filters.pop("q", None)
+
+    qs = BaseProductFilter(filters, Product.objects.all()).qs
+
+    if query:
+        product_ids = [product_id for product_id, _ in product_search(query=query)]
+        qs = qs.filter(id__in=product_ids).order_by(
+            Case(*[When(id=product_id, then=Value(position)) for position, product_id in enumerate(product_ids)],
+                 output_field=IntegerField())
+        )
+
+    return qs
+
+
+def product_card_list(*, filters=None) -> QuerySet[ProductCard]:
+    """Published, active product cards; served by `product_card_listing_idx` / `product_card_type_idx`."""
     filters = filters or {}
 
-    qs = Product.objects.all()
+    qs = ProductCard.objects.filter(status='publish', is_active=True)
 
-    return BaseProductFilter(filters, qs).qs
+    return ProductCardFilter(filters, qs).qs
 
 
 def product_get(tag_id) -> Optional[Product]:
@@ -128,12 +169,49 @@ def product_get(tag_id) -> Optional[Product]:
     return product
 
 
+def product_in_bulk(product_ids) -> Dict[Any, Product]:
+    """Fetch many products with one `IN (...)` query, keyed by id."""
+    return Product.objects.in_bulk(set(product_ids))
+
+
 def product_get_by_slug(slug) -> Optional[Product]:
     product = get_object(Product, slug=slug)
 
     return product
 
 
+def product_detail_get_by_slug(slug) -> Optional[Product]:
+    """
+    Fetch a product with every relation the detail page renders already loaded.
+
+    The lookups mirror `ProductDetailApi.OutputSerializer`: forward FKs are joined,
+    M2Ms and reverse FKs are prefetched once, and the variations prefetch is shared by
+    both `variations` and `variation_options`, so the query count does not grow with
+    the number of variations or batches.
+    """
+    variation_values = Prefetch(
+        'value',
+        queryset=AttributeValue.objects.select_related('attribute').prefetch_related('attribute__values'),
+    )
+    variations = Prefetch(
+        'variations',
+        queryset=ProductVariation.objects.prefetch_related('attribute', variation_values),
+    )
+
+    qs = Product.objects.select_related(
+        'type',
+        'author',
+        'manufacturer',
+    ).prefetch_related(
+        'categories',
+        'tags',
+        'batches',
+        variations,
+    )
+
+    return get_object(qs, slug=slug)
+
+
 def attribute_value_get(attribute_value_id) -> Optional[AttributeValue]:
     attribute_value = get_object(AttributeValue, id=attribute_value_id)
 
@@ -144,3 +222,8 @@ def batch_get(batch_id) -> Optional[Batch]:
     batch = get_object(Batch, id=batch_id)
 
     return batch
+
+
+def batch_in_bulk(batch_ids) -> Dict[Any, Batch]:
+    """Fetch many batches with one `IN (...)` query, keyed by id."""
+    return Batch.objects.in_bulk(set(batch_ids))
@@ -0,0 +1,107 @@
+import datetime
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from products.models import Batch
+
+ALLOCATION_ORDERINGS = {
+    # First-expiry-first-out, batches without an expiry date go last
+    "fefo": (F("expiry_date").asc(nulls_last=True), F("received_date").asc(nulls_last=True), "created_at", "id"),
+    # First-in-first-out by the date the batch was received
+    "fifo": (F("received_date").asc(nulls_last=True), "created_at", "id"),
+}
+
+
+@dataclass
+class AllocationLine:
+    product_id: uuid
+    quantity: Decimal
+    variation_id: Optional[uuid] = None
+
+
+@dataclass
+class BatchAllocation:
+    batch_id: uuid
+    batch_number: str
+    quantity: Decimal
+    expiry_date: Optional[datetime.date] = None
+
+
+@dataclass
+class LineAllocation:
+    line: AllocationLine
+    batches: List[BatchAllocation] = field(default_factory=list)
+    shortfall: Decimal = Decimal(0)
+
+    @property
+    def is_complete(self) -> bool:
+        return self.shortfall <= 0
+
+
+def batch_allocation_plan(*, lines: List[AllocationLine],
+                          strategy: str = "fefo",
+                          ) -> List[LineAllocation]:
+    """
+    Split every line's quantity across the batches of its product (or variation).
+
+    All candidate batches for the whole cart are read with one query, already sorted by
+    the allocation strategy, and then consumed greedily in memory; lines for the same
+    product draw from the same pool. Expired, inactive and empty batches are skipped.
+    The plan does not touch stock, reserve it with `stock_reserve_many`.
+    """
+    if strategy not in ALLOCATION_ORDERINGS:
+        raise ValidationError(f"Unknown batch allocation strategy '{strategy}'.")
+
+    product_ids = {line.product_id for line in lines if not line.variation_id}
+    variation_ids = {line.variation_id for line in lines if line.variation_id}
+
+    pools: Dict[uuid, List[dict]] = defaultdict(list)
+    if product_ids or variation_ids:
+        batches = (
+            Batch.objects.filter(
+                Q(product_id__in=product_ids, product_variation__isnull=True)
+                | Q(product_variation_id__in=variation_ids),
+                is_active=True,
+                quantity__gt=0,
+            )
+            .exclude(expiry_date__lt=timezone.localdate())
+            .order_by(*ALLOCATION_ORDERINGS[strategy])
+            .values("id", "batch_number", "quantity", "expiry_date", "product_id", "product_variation_id")
+        )
+        for batch in batches:
+            pool_key = batch["product_variation_id"] or batch["product_id"]
+            pools[pool_key].append(batch)
+
+    plan = []
+    for line in lines:
+        allocation = LineAllocation(line=line)
+        remaining = Decimal(line.quantity)
+
+        for batch in pools.get(line.variation_id or line.product_id, []):
+            if remaining <= 0:
+                break
+            if batch["quantity"] <= 0:
+                continue
+
+            taken = min(batch["quantity"], remaining)
+            batch["quantity"] -= taken
+            remaining -= taken
+            allocation.batches.append(
+                BatchAllocation(batch_id=batch["id"],
+                                batch_number=batch["batch_number"],
+                                quantity=taken,
+                                expiry_date=batch["expiry_date"],
+                                )
+            )
+
+        allocation.shortfall = remaining
+        plan.append(allocation)
+
+    return plan
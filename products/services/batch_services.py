@@ -1,13 +1,111 @@
 import uuid
+from collections import defaultdict
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 from django.db import transaction
+from django.db.models import Case, DecimalField, F, Max, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan
 
-from products.models import Batch, Product, ProductVariation
+from common.services import model_update
+from products.models import Batch, Product, ProductCard, ProductVariation
 from products.selectors import batch_get
 
 
+def product_quantity_apply_delta(*, product_id: uuid, delta: Decimal) -> None:
+    """
+    Shift `Product.quantity` by `delta` and recompute `in_stock` in the same UPDATE.
+
+    Every batch mutation calls this inside its own transaction, so the product total
+    moves together with its batches instead of being re-aggregated from all of them.
+    """
+    if not product_id or not delta:
+        return
+
+    delta = Decimal(delta)
+    changes = dict(
+        quantity=F('quantity') + delta,
+        # The right-hand side sees the row before the update, i.e. this is "new quantity > 0"
+        in_stock=Case(When(quantity__gt=-delta, then=Value(True)), default=Value(False)),
+    )
+    Product.all_objects.filter(id=product_id).update(**changes)
+    # The storefront card carries the same stock columns
+    ProductCard.objects.filter(product_id=product_id).update(**changes)
+
+
+def _batch_price_range(aggregate) -> Subquery:
+    """`aggregate` (Min/Max) of the effective price of a product's active, priced batches."""
+    effective_price = Case(When(sale_price__gt=0, then=F('sale_price')), default=F('price'))
+    priced = (Batch.objects
+              .filter(Q(product=OuterRef('pk')) | Q(product_variation__product=OuterRef('pk')), is_active=True)
+              .filter(Q(price__gt=0) | Q(sale_price__gt=0))
+              .order_by()
+              .values(owner=Value(1))
+              .annotate(value=aggregate(effective_price))
+              .values('value'))
+    return Subquery(priced[:1])
+
+
+def products_price_range_refresh(*, product_ids: Iterable[uuid]) -> None:
+    """
+    Recompute `min_price`/`max_price` of `product_ids` from their batches in one UPDATE.
+
+    The range spans the active batches with a price (their sale price when set), falling
+    back to the product's own price. The storefront cards are updated to match.
+    """
+    product_ids = [product_id for product_id in set(product_ids) if product_id]
+    if not product_ids:
+        return
+
+    own_price = Coalesce(F('sale_price'), F('price'))
+    Product.all_objects.filter(id__in=product_ids).update(
+        min_price=Coalesce(_batch_price_range(Min), own_price),
+        max_price=Coalesce(_batch_price_range(Max), own_price),
+    )
+
+    products = Product.all_objects.filter(id=OuterRef('product_id'))
+    ProductCard.objects.filter(product_id__in=product_ids).update(
+        min_price=Subquery(products.values('min_price')[:1]),
+        max_price=Subquery(products.values('max_price')[:1]),
+    )
+
+
+def quantity_deltas_case(deltas: Dict[uuid, Decimal], *, key: str = 'id') -> Case:
+    """`CASE key WHEN id THEN delta ... END`, so one UPDATE can shift many rows by different amounts."""
+    return Case(
+        *(When(**{key: row_id}, then=Value(Decimal(delta))) for row_id, delta in deltas.items()),
+        default=Value(Decimal(0)),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def products_quantity_apply_batch_deltas(*, batch_deltas: Dict[uuid, Decimal]) -> None:
+    """
+    Apply `{batch_id: delta}` to the owning products and their cards.
+
+    The deltas are summed per product and written with one UPDATE per table, however many
+    products the batches belong to.
+    """
+    product_deltas: Dict[uuid, Decimal] = defaultdict(Decimal)
+    batch_products = Batch.all_objects.filter(id__in=batch_deltas).values_list('id', 'product_id')
+    for batch_id, product_id in batch_products:
+        if product_id:
+            product_deltas[product_id] += Decimal(batch_deltas[batch_id])
+
+    product_deltas = {product_id: delta for product_id, delta in product_deltas.items() if delta}
+    if not product_deltas:
+        return
+
+    for model, key in ((Product.all_objects, 'id'), (ProductCard.objects, 'product_id')):
+        delta = quantity_deltas_case(product_deltas, key=key)
+        model.filter(**{f'{key}__in': product_deltas}).update(
+            quantity=F('quantity') + delta,
+            # As above, the right-hand side sees the row before the update
+            in_stock=Case(When(GreaterThan(F('quantity') + delta, 0), then=Value(True)), default=Value(False)),
+        )
+
+
 @transaction.atomic
 def batch_create(
         *, product: Product,
@@ -35,34 +133,78 @@ def batch_create(
                                  # wholesale_price=wholesale_price
                                  )
 
+    product_quantity_apply_delta(product_id=batch.product_id, delta=batch.quantity)
+    if batch.price or batch.sale_price:
+        products_price_range_refresh(product_ids=[batch.product_id])
+
+    return batch
+
+
+@transaction.atomic
+def batch_update(*, batch: Batch, data) -> Batch:
+    previous_quantity = batch.quantity
+    previous_prices = (batch.price, batch.sale_price)
+
+    batch, has_updated = model_update(instance=batch, fields=[
+        "quantity", "manufacture_date", "expiry_date", "cost", "price", "sale_price"
+    ], data=data)
+
+    if has_updated:
+        product_quantity_apply_delta(product_id=batch.product_id,
+                                     delta=Decimal(batch.quantity) - previous_quantity)
+        if (batch.price, batch.sale_price) != previous_prices:
+            products_price_range_refresh(product_ids=[batch.product_id])
+
     return batch
 
 
+@transaction.atomic
+def batch_delete(*, batch: Batch) -> None:
+    deleted = Batch.objects.filter(pk=batch.pk).delete()
+    if deleted:
+        product_quantity_apply_delta(product_id=batch.product_id, delta=-batch.quantity)
+        if batch.price or batch.sale_price:
+            products_price_range_refresh(product_ids=[batch.product_id])
+    return None
+
+
 @transaction.atomic
 def batch_quantity_decrement(*, batch_id: uuid,
                              decrement_value: int) -> Optional[Batch]:
+    # Single UPDATE with an F() expression, so concurrent decrements never overwrite each other
+    Batch.objects.filter(id=batch_id).update(quantity=F('quantity') - decrement_value)
     batch = batch_get(batch_id=batch_id)
-    batch.quantity -= decrement_value
-    batch.save()
+    if batch:
+        product_quantity_apply_delta(product_id=batch.product_id, delta=-Decimal(decrement_value))
     return batch
 
 
 @transaction.atomic
 def batch_quantity_increment(*, batch_id: str,
                              decrement_value: int) -> Optional[Batch]:
+    Batch.objects.filter(id=batch_id).update(quantity=F('quantity') + decrement_value)
     batch = batch_get(batch_id=batch_id)
-    batch.quantity += decrement_value
-    batch.save()
+    if batch:
+        product_quantity_apply_delta(product_id=batch.product_id, delta=Decimal(decrement_value))
     return batch
 
 
 @transaction.atomic
 def batch_update_by_grn(*, batch: Batch, data) -> Batch:
+    quantity = Decimal(data.get("quantity") or 0)
+
+    previous_price = batch.price
+
     batch.cost = data.get("cost")
     batch.price = data.get("price")
-    batch.quantity = batch.quantity + data.get("quantity")
+    batch.quantity = F('quantity') + quantity
 
     batch.clean()
     batch.save()
+    batch.refresh_from_db(fields=['quantity'])
+
+    product_quantity_apply_delta(product_id=batch.product_id, delta=quantity)
+    if batch.price != previous_price:
+        products_price_range_refresh(product_ids=[batch.product_id])
 
     return batch
@@ -0,0 +1,79 @@
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from products.models import Category, Product, ProductCard
+
+CARD_FIELDS = [
+    "name", "slug", "status", "product_type", "is_active", "unit", "image", "type_slug", "category_slug",
+    "category_name", "manufacturer_name", "price", "sale_price", "min_price", "max_price", "quantity", "in_stock",
+    "ratings", "total_reviews", "created_at",
+]
+
+
+def _product_card_build(product: Product) -> ProductCard:
+    category = next(iter(product.categories.all()), None)
+
+    return ProductCard(product_id=product.id,
+                       name=product.name,
+                       slug=product.slug,
+                       status=product.status,
+                       product_type=product.product_type,
+                       is_active=product.is_active,
+                       unit=product.unit,
+                       image=product.image,
+                       type_slug=product.type.slug if product.type else None,
+                       category_slug=category.slug if category else None,
+                       category_name=category.name if category else None,
+                       manufacturer_name=product.manufacturer.name if product.manufacturer else None,
+                       price=product.price,
+                       sale_price=product.sale_price,
+                       min_price=product.min_price,
+                       max_price=product.max_price,
+                       quantity=product.quantity,
+                       in_stock=product.in_stock,
+                       ratings=product.ratings,
+                       total_reviews=product.total_reviews,
+                       created_at=product.created_at,
+                       )
+
+
+def _cards_upsert(*, cards: List[ProductCard]) -> int:
+    ProductCard.objects.bulk_create(cards,
+                                    update_conflicts=True,
+                                    unique_fields=["product"],
+                                    update_fields=CARD_FIELDS + ["updated_at"])
+    return len(cards)
+
+
+@transaction.atomic
+def product_cards_refresh(*, product_ids: Optional[Iterable] = None, chunk_size: int = 1000) -> int:
+    """
+    Rebuild the cards of `product_ids`, or of every product when None.
+
+    Cards are upserted `chunk_size` at a time with three queries per chunk; cards of
+    deleted products are dropped.
+    """
+    products = Product.objects.select_related("type", "manufacturer").prefetch_related(
+        Prefetch("categories", queryset=Category.objects.only("id", "name", "slug", "path").order_by("path")),
+    )
+    stale = ProductCard.objects.exclude(product__in=Product.objects.all())
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        products = products.filter(id__in=product_ids)
+        stale = stale.filter(product_id__in=product_ids)
+    stale.delete()
+
+    refreshed = 0
+    cards = []
+    for product in products.order_by().iterator(chunk_size=chunk_size):
+        cards.append(_product_card_build(product))
+        if len(cards) >= chunk_size:
+            refreshed += _cards_upsert(cards=cards)
+            cards = []
+
+    if cards:
+        refreshed += _cards_upsert(cards=cards)
+
+    return refreshed
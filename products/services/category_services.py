@@ -1,12 +1,43 @@
-from typing import List
+from typing import List, Optional
 
+from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 
 from common.services import model_update
 from common.utils import get_object, resolve_foreign_keys
 from products.models import Category, Type
 
 
+def _category_path(*, category_id, parent: Optional[Category]) -> str:
+    return f"{parent.path if parent else ''}{category_id.hex}/"
+
+
+def _category_parent_validate(*, category: Category, parent: Optional[Category]) -> None:
+    if parent is None:
+        return
+    # An empty path would be a prefix of every path, only the category itself can be ruled out then
+    if parent.pk == category.pk or (category.path and parent.path.startswith(category.path)):
+        raise ValidationError("A category cannot be moved under itself or one of its descendants.")
+
+
+def _category_subtree_move(*, category: Category, parent: Optional[Category]) -> None:
+    """Rewrite the path prefix and depth of `category` and all of its descendants in one UPDATE."""
+    old_path = category.path
+    new_path = _category_path(category_id=category.pk, parent=parent)
+
+    if not old_path:
+        # Without a path its descendants cannot be found, and `startswith('')` would match every row
+        Category.all_objects.filter(pk=category.pk).update(path=new_path, depth=new_path.count("/") - 1)
+    else:
+        Category.all_objects.filter(path__startswith=old_path).update(
+            path=Concat(Value(new_path), Substr("path", len(old_path) + 1)),
+            depth=F("depth") + (new_path.count("/") - old_path.count("/")),
+        )
+    category.refresh_from_db(fields=["path", "depth"])
+
+
 @transaction.atomic
 def category_create(*, image: str = None,
                     name: str,
@@ -16,13 +47,16 @@ def category_create(*, image: str = None,
                     type_id: str,
                     parent_id: str = None,
                     ) -> Category:
+    # Category.save derives path and depth from the parent
+    parent = Category.objects.get(pk=parent_id) if parent_id else None
+
     category = Category.objects.create(image=image,
                                        name=name,
                                        slug=slug,
                                        details=details,
                                        icon=icon,
                                        type_id=type_id,
-                                       parent_id=parent_id,
+                                       parent=parent,
                                        )
 
     return category
@@ -52,9 +86,16 @@ def category_update(*, category: Category, data) -> Category:
     # Resolve foreign key fields
     data = resolve_foreign_keys(data, foreign_key_fields)
 
+    old_parent_id = category.parent_id
+    if "parent" in data:
+        _category_parent_validate(category=category, parent=data["parent"])
+
     all_fields = non_side_effect_fields + ["type", "department", "parent"]
     category, has_updated = model_update(instance=category, fields=all_fields, data=data)
 
+    if category.parent_id != old_parent_id:
+        _category_subtree_move(category=category, parent=category.parent)
+
     # Side-effect fields update here (e.g. username is generated based on first & last name)
 
     # ... some additional tasks with the user ...
@@ -0,0 +1,330 @@
+import csv
+import datetime
+import io
+import json
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from common.actor import audit_actor
+from products.models import AttributeValue, Author, Batch, Category, Manufacturer, Product, \
+    ProductVariation, Tag, Type
+from products.facets import product_facets_invalidate
+from products.services.batch_services import products_price_range_refresh
+from products.services.card_services import product_cards_refresh
+from products.services.search_services import product_search_documents_refresh
+
+CATALOG_IMPORT_FORMATS = ("csv", "jsonl")
+
+# CSV cells that hold several slugs/ids
+CSV_LIST_SEPARATOR = "|"
+# CSV cells that hold nested JSON documents
+CSV_JSON_COLUMNS = ("batches", "variations")
+
+PRODUCT_FIELDS = ("description", "sku", "unit", "width", "height", "status", "language")
+PRODUCT_DECIMAL_FIELDS = ("price", "sale_price")
+BATCH_DECIMAL_FIELDS = ("cost", "price", "sale_price")
+BATCH_DATE_FIELDS = ("received_date", "manufacture_date", "expiry_date")
+
+
+@dataclass
+class CatalogImportError:
+    line: int
+    slug: Optional[str]
+    message: str
+
+
+@dataclass
+class CatalogImportResult:
+    products: int = 0
+    batches: int = 0
+    variations: int = 0
+    errors: List[CatalogImportError] = field(default_factory=list)
+
+
+@dataclass
+class _CatalogRow:
+    line: int
+    product: Product
+    category_ids: List[uuid.UUID]
+    tag_ids: List[uuid.UUID]
+    batches: List[Batch]
+    variations: List[Tuple[ProductVariation, List[AttributeValue]]]
+
+
+def catalog_rows_read(*, file: io.TextIOBase, format: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Stream `(line number, row)` pairs from a CSV or JSON Lines file.
+
+    Undecodable lines are yielded as a row holding only an `_error` key, so the importer
+    can report them without stopping.
+    """
+    if format not in CATALOG_IMPORT_FORMATS:
+        raise ValidationError(f"Unsupported catalog format '{format}'.")
+
+    if format == "jsonl":
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = {"_error": f"Invalid JSON: {e}"}
+            if not isinstance(row, dict):
+                row = {"_error": "Each line must be a JSON object."}
+            yield line_number, row
+        return
+
+    reader = csv.DictReader(file)
+    for row in reader:
+        row = {key: value for key, value in row.items() if value not in (None, "")}
+        try:
+            for column in ("categories", "tags"):
+                if column in row:
+                    row[column] = [value.strip() for value in row[column].split(CSV_LIST_SEPARATOR) if value.strip()]
+            for column in CSV_JSON_COLUMNS:
+                if column in row:
+                    row[column] = json.loads(row[column])
+        except ValueError as e:
+            row = {"_error": f"Invalid JSON in column: {e}"}
+        yield reader.line_num, row
+
+
+class CatalogLookups:
+    """In-memory slug/id maps for every reference a catalog row can make."""
+
+    def __init__(self):
+        self.types = self._load(Type.objects.all())
+        self.categories = self._load(Category.objects.all())
+        self.tags = self._load(Tag.objects.all())
+        self.authors = self._load(Author.objects.all())
+        self.manufacturers = self._load(Manufacturer.objects.all())
+
+        self.attribute_values = {}
+        for value in AttributeValue.objects.select_related("attribute"):
+            self.attribute_values[str(value.id)] = value
+            self.attribute_values[f"{value.attribute.slug}:{value.value}"] = value
+
+    @staticmethod
+    def _load(queryset) -> Dict[str, Any]:
+        lookup = {}
+        for instance in queryset.only("id", "slug"):
+            lookup[str(instance.id)] = instance.id
+            if instance.slug:
+                lookup.setdefault(instance.slug, instance.id)
+        return lookup
+
+    @staticmethod
+    def resolve(lookup: Dict[str, Any], key: Any, label: str) -> Optional[uuid.UUID]:
+        if key in (None, ""):
+            return None
+        try:
+            return lookup[str(key)]
+        except KeyError:
+            raise ValidationError(f"Unknown {label} '{key}'.")
+
+
+def _decimal(value: Any, label: str) -> Optional[Decimal]:
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValidationError(f"Invalid {label} '{value}'.")
+
+
+def _date(value: Any, label: str) -> Optional[datetime.date]:
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.date.fromisoformat(str(value))
+    except ValueError:
+        raise ValidationError(f"Invalid {label} '{value}'.")
+
+
+def _catalog_row_build(*, line: int, row: Dict[str, Any], lookups: CatalogLookups) -> _CatalogRow:
+    if "_error" in row:
+        raise ValidationError(row["_error"])
+
+    for required in ("name", "slug", "product_type"):
+        if not row.get(required):
+            raise ValidationError(f"'{required}' is required.")
+    if row["product_type"] not in ("simple", "variable"):
+        raise ValidationError(f"Invalid product_type '{row['product_type']}'.")
+
+    product = Product(name=row["name"],
+                      slug=row["slug"],
+                      product_type=row["product_type"],
+                      type_id=lookups.resolve(lookups.types, row.get("type"), "type"),
+                      author_id=lookups.resolve(lookups.authors, row.get("author"), "author"),
+                      manufacturer_id=lookups.resolve(lookups.manufacturers, row.get("manufacturer"), "manufacturer"),
+                      **{name: row[name] for name in PRODUCT_FIELDS if row.get(name) is not None},
+                      **{name: _decimal(row.get(name), name) for name in PRODUCT_DECIMAL_FIELDS},
+                      )
+
+    category_ids = [lookups.resolve(lookups.categories, key, "category") for key in row.get("categories") or []]
+    tag_ids = [lookups.resolve(lookups.tags, key, "tag") for key in row.get("tags") or []]
+
+    batches = []
+    for batch in row.get("batches") or []:
+        if not batch.get("batch_number"):
+            raise ValidationError("'batch_number' is required for every batch.")
+        batches.append(
+            Batch(product=product,
+                  batch_number=batch["batch_number"],
+                  quantity=_decimal(batch.get("quantity"), "batch quantity") or Decimal(0),
+                  **{name: _decimal(batch.get(name), f"batch {name}") for name in BATCH_DECIMAL_FIELDS},
+                  **{name: _date(batch.get(name), f"batch {name}") for name in BATCH_DATE_FIELDS},
+                  )
+        )
+    if len({batch.batch_number for batch in batches}) != len(batches):
+        raise ValidationError("Batch numbers must be unique per product.")
+
+    # Batches are inserted with the product, so its stock columns can be set up front
+    product.quantity = sum((batch.quantity for batch in batches), Decimal(0))
+    product.in_stock = product.quantity > 0
+
+    variations = []
+    for variation in row.get("variations") or []:
+        if not variation.get("title"):
+            raise ValidationError("'title' is required for every variation.")
+        values = [lookups.resolve(lookups.attribute_values, key, "attribute value")
+                  for key in variation.get("values") or []]
+        variations.append(
+            (ProductVariation(product=product,
+                              title=variation["title"],
+                              cartesian_product_key=variation.get("cartesian_product_key"),
+                              barcode=variation.get("barcode"),
+                              default_quantity=variation.get("default_quantity"),
+                              ),
+             values)
+        )
+
+    return _CatalogRow(line=line, product=product, category_ids=category_ids, tag_ids=tag_ids,
+                       batches=batches, variations=variations)
+
+
+@transaction.atomic
+def _catalog_rows_insert(*, rows: List[_CatalogRow]) -> None:
+    """Insert a chunk of validated rows, one INSERT per table."""
+    Product.objects.bulk_create([row.product for row in rows])
+
+    Product.categories.through.objects.bulk_create([
+        Product.categories.through(product_id=row.product.id, category_id=category_id)
+        for row in rows for category_id in dict.fromkeys(row.category_ids)
+    ])
+    Product.tags.through.objects.bulk_create([
+        Product.tags.through(product_id=row.product.id, tag_id=tag_id)
+        for row in rows for tag_id in dict.fromkeys(row.tag_ids)
+    ])
+
+    Batch.objects.bulk_create([batch for row in rows for batch in row.batches])
+
+    variations = [(variation, values) for row in rows for variation, values in row.variations]
+    ProductVariation.objects.bulk_create([variation for variation, _ in variations])
+    ProductVariation.attribute.through.objects.bulk_create([
+        ProductVariation.attribute.through(productvariation_id=variation.id, attribute_id=attribute_id)
+        for variation, values in variations for attribute_id in dict.fromkeys(value.attribute_id for value in values)
+    ])
+    ProductVariation.value.through.objects.bulk_create([
+        ProductVariation.value.through(productvariation_id=variation.id, attributevalue_id=value.id)
+        for variation, values in variations for value in {value.id: value for value in values}.values()
+    ])
+
+
+def _catalog_chunk_import(*, chunk: List[Tuple[int, Dict[str, Any]]],
+                          lookups: CatalogLookups,
+                          seen_slugs: set,
+                          result: CatalogImportResult,
+                          ) -> None:
+    slugs = [row.get("slug") for _, row in chunk if row.get("slug")]
+    existing_slugs = set(Product.all_objects.filter(slug__in=slugs).values_list("slug", flat=True))
+
+    barcodes = [variation.get("barcode") for _, row in chunk
+                for variation in row.get("variations") or [] if isinstance(variation, dict) and variation.get("barcode")]
+    existing_barcodes = set(ProductVariation.all_objects.filter(barcode__in=barcodes).values_list("barcode", flat=True))
+
+    valid = []
+    for line, row in chunk:
+        slug = row.get("slug")
+        try:
+            if slug in existing_slugs or slug in seen_slugs:
+                raise ValidationError(f"Product with slug '{slug}' already exists.")
+
+            catalog_row = _catalog_row_build(line=line, row=row, lookups=lookups)
+
+            row_barcodes = [variation.barcode for variation, _ in catalog_row.variations if variation.barcode]
+            if existing_barcodes.intersection(row_barcodes) or len(set(row_barcodes)) != len(row_barcodes):
+                raise ValidationError("Variation barcode already exists.")
+        except (ValidationError, AttributeError, TypeError) as e:
+            message = "; ".join(e.messages) if isinstance(e, ValidationError) else f"Malformed row: {e}"
+            result.errors.append(CatalogImportError(line=line, slug=slug, message=message))
+            continue
+
+        seen_slugs.add(slug)
+        existing_barcodes.update(row_barcodes)
+        valid.append(catalog_row)
+
+    if not valid:
+        return
+
+    try:
+        _catalog_rows_insert(rows=valid)
+        inserted = valid
+    except Exception:
+        # Something slipped past validation, retry row by row so one bad row only rejects itself
+        inserted = []
+        for catalog_row in valid:
+            try:
+                _catalog_rows_insert(rows=[catalog_row])
+                inserted.append(catalog_row)
+            except Exception as e:
+                result.errors.append(CatalogImportError(line=catalog_row.line, slug=catalog_row.product.slug,
+                                                        message=f"Failed to import product. Error: {e}"))
+
+    inserted_ids = [catalog_row.product.id for catalog_row in inserted]
+    product_search_documents_refresh(product_ids=inserted_ids)
+    products_price_range_refresh(product_ids=inserted_ids)
+    product_cards_refresh(product_ids=inserted_ids)
+
+    result.products += len(inserted)
+    result.batches += sum(len(catalog_row.batches) for catalog_row in inserted)
+    result.variations += sum(len(catalog_row.variations) for catalog_row in inserted)
+
+
+def catalog_import(*, rows: Iterable[Tuple[int, Dict[str, Any]]],
+                   chunk_size: int = 1000,
+                   ) -> CatalogImportResult:
+    """
+    Import products with their categories, tags, batches and variations in bulk.
+
+    `rows` is consumed lazily (see `catalog_rows_read`) and written `chunk_size` rows at a
+    time: references are resolved against lookup maps loaded once, and each chunk costs a
+    fixed number of queries. Rows that fail validation are reported in the result and
+    skipped, the rest of the file is still imported. Existing slugs are never updated.
+    """
+    lookups = CatalogLookups()
+    result = CatalogImportResult()
+    seen_slugs = set()
+
+    # bulk_create fills created_by, resolve the importing user once for the whole file
+    with audit_actor():
+        chunk = []
+        for line, row in rows:
+            chunk.append((line, row))
+            if len(chunk) >= chunk_size:
+                _catalog_chunk_import(chunk=chunk, lookups=lookups, seen_slugs=seen_slugs, result=result)
+                chunk = []
+
+        if chunk:
+            _catalog_chunk_import(chunk=chunk, lookups=lookups, seen_slugs=seen_slugs, result=result)
+
+    # bulk_create sends no signals
+    if result.products:
+        product_facets_invalidate()
+
+    return result
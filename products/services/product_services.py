@@ -1,13 +1,17 @@
-from typing import List
+from decimal import Decimal
+from typing import Any, Dict, List
 
 from django.db import transaction
+from django.db.models import Case, DecimalField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 
 from common.services import model_update
 from common.utils import get_object
 from products.models import Product, Batch, ProductVariation
 from products.selectors import attribute_value_get
-from products.services.batch_services import batch_create
-from products.utils.product_utils import recalculate_product_total_quantity
+from products.services.batch_services import batch_create, batch_delete, batch_update, products_price_range_refresh
+from products.services.card_services import product_cards_refresh
+from products.services.search_services import product_search_documents_refresh
 
 
 @transaction.atomic
@@ -96,6 +100,9 @@ def product_create(*, name: str,
                              sale_price=batch.get('sale_price'),
                              )
 
+    product_search_documents_refresh(product_ids=[product.id])
+    product_cards_refresh(product_ids=[product.id])
+
     return product
 
 
@@ -127,9 +134,7 @@ def product_update(*, product: Product, data) -> Product:
             batch_instance = Batch.objects.filter(batch_number=batch.get("batch_number"), product=product).first()
             if batch_instance:
                 # Update existing batch
-                model_update(instance=batch_instance, fields=[
-                    "quantity", "manufacture_date", "expiry_date", "cost", "price", "sale_price"
-                ], data=batch)
+                batch_update(batch=batch_instance, data=batch)
             else:
                 # Create new batch
                 batch_create(product=product,
@@ -143,16 +148,24 @@ def product_update(*, product: Product, data) -> Product:
                              )
 
         # Handle delete batches
-        batch_delete = batches.get("delete", [])
-        for batch_id in batch_delete:
-            Batch.objects.filter(pk=batch_id, product=product).delete()
+        batch_delete_ids = batches.get("delete", [])
+        for batch_instance in Batch.objects.filter(pk__in=batch_delete_ids, product=product):
+            batch_delete(batch=batch_instance)
+
+        # Batch services keep quantity/in_stock in step, pick up the values they wrote
+        product.refresh_from_db(fields=["quantity", "in_stock"])
 
     # some additional task
+    # Stock columns are left out, a full save would overwrite concurrent batch deltas
     product.type_id = data.get("type")
-    product.save()
+    product.save(update_fields=["type", "updated_at", "updated_by"])
 
-    # Recalculate Product quantity based of all the Batches it has
-    recalculate_product_total_quantity(product=product)
+    if has_updated:
+        product_search_documents_refresh(product_ids=[product.id])
+        # The product's own price is the fallback range when no batch is priced
+        products_price_range_refresh(product_ids=[product.id])
+        product.refresh_from_db(fields=["min_price", "max_price"])
+    product_cards_refresh(product_ids=[product.id])
 
     return product
 
@@ -161,6 +174,7 @@ def product_update(*, product: Product, data) -> Product:
 def product_delete(*, product_id: str) -> None:
     product = get_object(Product, id=product_id)
     product.delete()
+    product_cards_refresh(product_ids=[product_id])
     return None
 
 
@@ -190,3 +204,59 @@ def product_variation_create(
             product_variation.value.add(attribute_value)
 
     return product_variation
+
+
+def _batch_quantity_total() -> Coalesce:
+    totals = (
+        Batch.objects.filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    return Coalesce(Subquery(totals), Value(Decimal(0)), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def product_quantities_reconcile(*, fix: bool = False,
+                                 chunk_size: int = 1000,
+                                 ) -> List[Dict[str, Any]]:
+    """
+    Compare every product's `quantity`/`in_stock` with the sum of its batches.
+
+    Products are walked in id order, `chunk_size` at a time, with the batch totals computed
+    by a correlated subquery. With `fix=True` drifted rows are repaired by an UPDATE that
+    re-aggregates inside the database, so concurrent batch deltas are not lost. Each chunk
+    is repaired in its own transaction, so locks are never held across the whole table.
+    """
+    drift = []
+    last_id = None
+
+    while True:
+        products = Product.all_objects.order_by('id').annotate(actual_quantity=_batch_quantity_total())
+        if last_id is not None:
+            products = products.filter(id__gt=last_id)
+
+        chunk = list(products.values('id', 'quantity', 'in_stock', 'actual_quantity')[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1]['id']
+
+        drifted = [
+            row for row in chunk
+            if row['quantity'] != row['actual_quantity'] or row['in_stock'] != (row['actual_quantity'] > 0)
+        ]
+        drift.extend(drifted)
+
+        if fix and drifted:
+            drifted_ids = [row['id'] for row in drifted]
+            with transaction.atomic():
+                Product.all_objects.filter(id__in=drifted_ids).update(quantity=_batch_quantity_total())
+                Product.all_objects.filter(id__in=drifted_ids).update(
+                    in_stock=Case(When(quantity__gt=0, then=Value(True)), default=Value(False))
+                )
+                product_cards_refresh(product_ids=drifted_ids)
+
+        if len(chunk) < chunk_size:
+            break
+
+    return drift
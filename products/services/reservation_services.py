@@ -0,0 +1,157 @@
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from products.models import Batch, StockReservation
+from products.services.batch_services import products_quantity_apply_batch_deltas, quantity_deltas_case
+
+
+def _reservation_ttl() -> timedelta:
+    return getattr(settings, "STOCK_RESERVATION_TTL", timedelta(minutes=15))
+
+
+def _batch_quantities_take(*, quantities: Dict[uuid, Decimal]) -> None:
+    """
+    Atomically take `{batch_id: quantity}` from the batches.
+
+    The rows are locked in id order first, so two checkouts touching the same batches never
+    deadlock. A single conditional `UPDATE ... SET quantity = quantity - n WHERE quantity >= n`
+    then never reads a stale value, so concurrent checkouts cannot oversell a batch.
+    """
+    batches = Batch.objects.filter(id__in=quantities)
+    available = dict(batches.select_for_update().order_by("id").values_list("id", "quantity"))
+
+    take = quantity_deltas_case(quantities)
+    updated = batches.filter(GreaterThanOrEqual(F("quantity"), take)).update(quantity=F("quantity") - take)
+    if updated != len(quantities):
+        short = next((batch_id for batch_id in sorted(quantities, key=str)
+                      if available.get(batch_id, 0) < quantities[batch_id]), min(quantities, key=str))
+        raise ValidationError(f"Insufficient stock for batch {short}.")
+
+
+def _batch_quantities_return(*, quantities: Dict[uuid, Decimal]) -> None:
+    Batch.objects.filter(id__in=quantities).update(quantity=F("quantity") + quantity_deltas_case(quantities))
+
+
+@transaction.atomic
+def stock_reserve(*, batch_id: uuid,
+                  quantity: Decimal,
+                  reference: str = None,
+                  ttl: timedelta = None,
+                  ) -> StockReservation:
+    return stock_reserve_many(lines=[(batch_id, quantity)], reference=reference, ttl=ttl)[0]
+
+
+@transaction.atomic
+def stock_reserve_many(*, lines: Iterable[Tuple[uuid, Decimal]],
+                       reference: str = None,
+                       ttl: timedelta = None,
+                       ) -> List[StockReservation]:
+    """
+    Hold stock for `(batch_id, quantity)` lines until the reservations are committed or released.
+
+    Quantities are summed per batch and all batches are decremented in one UPDATE after
+    being locked in id order. If any batch is short the whole reservation is rolled back.
+    """
+    quantities: Dict[uuid, Decimal] = defaultdict(Decimal)
+    for batch_id, quantity in lines:
+        if not quantity or Decimal(quantity) <= 0:
+            raise ValidationError(f"Reserved quantity for batch {batch_id} must be positive.")
+        quantities[batch_id] += Decimal(quantity)
+
+    _batch_quantities_take(quantities=quantities)
+    products_quantity_apply_batch_deltas(
+        batch_deltas={batch_id: -quantity for batch_id, quantity in quantities.items()}
+    )
+
+    expires_at = timezone.now() + (ttl or _reservation_ttl())
+
+    return StockReservation.objects.bulk_create(
+        StockReservation(batch_id=batch_id, quantity=quantity, expires_at=expires_at, reference=reference)
+        for batch_id, quantity in quantities.items()
+    )
+
+
+@transaction.atomic
+def stock_reservation_commit(*, reservations: List[StockReservation],
+                             reference: str = None,
+                             ) -> List[StockReservation]:
+    """Turn pending reservations into a permanent stock decrement."""
+    reservation_ids = [reservation.id for reservation in reservations]
+
+    data = {"status": "committed", "updated_at": timezone.now()}
+    if reference is not None:
+        data["reference"] = reference
+
+    committed = StockReservation.objects.filter(id__in=reservation_ids, status="pending").update(**data)
+
+    # A reservation that expired (and was released) in the meantime no longer holds any stock
+    if committed != len(reservation_ids):
+        raise ValidationError("Stock reservation expired before it could be committed.")
+
+    for reservation in reservations:
+        reservation.status = "committed"
+        reservation.reference = data.get("reference", reservation.reference)
+
+    return reservations
+
+
+@transaction.atomic
+def stock_reservation_release(*, reservation: StockReservation) -> StockReservation:
+    """Give the reserved quantity back to its batch. Releasing twice is a no-op."""
+    released = StockReservation.objects.filter(id=reservation.id, status="pending").update(
+        status="released", updated_at=timezone.now()
+    )
+
+    if released:
+        quantities = {reservation.batch_id: reservation.quantity}
+        _batch_quantities_return(quantities=quantities)
+        products_quantity_apply_batch_deltas(batch_deltas=quantities)
+        reservation.status = "released"
+
+    return reservation
+
+
+@transaction.atomic
+def stock_reservations_release_expired(*, limit: int = 500) -> int:
+    """
+    Release up to `limit` pending reservations whose TTL has passed.
+
+    Rows are claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so several workers can run
+    this concurrently without blocking each other or releasing the same reservation twice.
+    """
+    expired = list(
+        StockReservation.objects.select_for_update(skip_locked=True)
+        .filter(status="pending", expires_at__lte=timezone.now())
+        .order_by("expires_at")[:limit]
+    )
+    if not expired:
+        return 0
+
+    if not connection.features.has_select_for_update_skip_locked:
+        # Without row locks a reservation may be committed after it was read, release one by one
+        for reservation in expired:
+            stock_reservation_release(reservation=reservation)
+        return len(expired)
+
+    StockReservation.objects.filter(id__in=[reservation.id for reservation in expired]).update(
+        status="released", updated_at=timezone.now()
+    )
+
+    quantities: Dict[uuid, Decimal] = defaultdict(Decimal)
+    for reservation in expired:
+        quantities[reservation.batch_id] += reservation.quantity
+
+    _batch_quantities_return(quantities=quantities)
+    products_quantity_apply_batch_deltas(batch_deltas=quantities)
+
+    return len(expired)
@@ -0,0 +1,51 @@
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from products.models import Category, Product, ProductSearchDocument, Tag
+from products.search import product_search_body, search_index_invalidate
+
+
+@transaction.atomic
+def product_search_documents_refresh(*, product_ids: Optional[Iterable] = None, chunk_size: int = 1000) -> int:
+    """
+    Rebuild the search documents of `product_ids`, or of every product when None.
+
+    Documents are upserted `chunk_size` at a time; a full rebuild also drops the documents
+    of deleted products.
+    """
+    products = Product.objects.select_related("author", "manufacturer").only(
+        "id", "name", "description", "sku", "author__name", "manufacturer__name",
+    ).prefetch_related(
+        Prefetch("tags", queryset=Tag.objects.only("id", "name")),
+        Prefetch("categories", queryset=Category.objects.only("id", "name")),
+    )
+    if product_ids is not None:
+        products = products.filter(id__in=list(product_ids))
+    else:
+        ProductSearchDocument.objects.exclude(product__in=Product.objects.all()).delete()
+
+    refreshed = 0
+    documents = []
+    for product in products.order_by().iterator(chunk_size=chunk_size):
+        documents.append(ProductSearchDocument(product_id=product.id,
+                                               name=product.name,
+                                               body=product_search_body(product)))
+        if len(documents) >= chunk_size:
+            refreshed += _documents_upsert(documents=documents)
+            documents = []
+
+    if documents:
+        refreshed += _documents_upsert(documents=documents)
+
+    search_index_invalidate()
+    return refreshed
+
+
+def _documents_upsert(*, documents) -> int:
+    ProductSearchDocument.objects.bulk_create(documents,
+                                              update_conflicts=True,
+                                              unique_fields=["product"],
+                                              update_fields=["name", "body", "updated_at"])
+    return len(documents)
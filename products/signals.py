@@ -0,0 +1,103 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from products.category_tree import category_tree_invalidate
+from products.facets import product_facets_invalidate
+from products.models import Author, Category, Manufacturer, Product, Tag, Type
+from products.services.card_services import product_cards_refresh
+from products.services.search_services import product_search_documents_refresh
+
+_pending = threading.local()
+
+
+def _pending_refresh():
+    search_ids, card_ids = getattr(_pending, "search_ids", set()), getattr(_pending, "card_ids", set())
+    _pending.search_ids, _pending.card_ids = set(), set()
+
+    if search_ids:
+        product_search_documents_refresh(product_ids=search_ids)
+    if card_ids:
+        product_cards_refresh(product_ids=card_ids)
+
+
+def _products_refresh_on_commit(product_ids, *, search: bool = False, cards: bool = False) -> None:
+    """
+    Rebuild the search documents and/or cards of `product_ids` once the transaction commits.
+
+    Ids collected by several saves in one transaction are refreshed together by the first
+    callback to run. Ids left behind by a rolled back transaction are refreshed with the next
+    commit, which is harmless as the rebuild reads whatever is committed.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    if search:
+        _pending.search_ids = getattr(_pending, "search_ids", set()) | product_ids
+    if cards:
+        _pending.card_ids = getattr(_pending, "card_ids", set()) | product_ids
+    transaction.on_commit(_pending_refresh)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Type)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_save, sender=Author)
+def catalog_changed(sender, **kwargs):
+    # Product rows move between facet values, renamed or deleted facet values change labels
+    product_facets_invalidate()
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+@receiver(m2m_changed, sender=Product.tags.through)
+def product_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        product_facets_invalidate()
+
+    # Search documents carry tag and category names, cards the first category
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        product_ids = [instance.pk]
+    elif reverse and action in ("post_add", "post_remove"):
+        product_ids = pk_set
+    elif reverse and action == "pre_clear":
+        relation = "tags" if sender is Product.tags.through else "categories"
+        product_ids = Product.objects.filter(**{relation: instance}).values_list("id", flat=True)
+    else:
+        return
+    _products_refresh_on_commit(product_ids, search=True, cards=sender is Product.categories.through)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_save, sender=Type)
+@receiver(post_save, sender=Category)
+def catalog_label_changed(sender, instance, created, raw=False, **kwargs):
+    # Nothing refers to a new row yet
+    if created or raw:
+        return
+
+    if sender is Category:
+        # A move re-orders the categories of the whole subtree, this still sees the old path
+        products = Product.objects.filter(categories__path__startswith=instance.path) if instance.path \
+            else Product.objects.filter(categories=instance)
+    else:
+        relation = {Tag: "tags", Author: "author", Manufacturer: "manufacturer", Type: "type"}[sender]
+        products = Product.objects.filter(**{relation: instance})
+
+    _products_refresh_on_commit(products.values_list("id", flat=True).distinct(),
+                                search=sender is not Type,
+                                cards=sender in (Type, Category, Manufacturer))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    # Subtree moves update descendants in bulk but always save the moved category itself
+    category_tree_invalidate()
@@ -1,3 +1,504 @@
-from django.test import TestCase
+import io
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from crum import impersonate
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from products.apis.product_apis import ProductDetailApi
+from products.category_tree import category_tree_snapshot_get
+from products.facets import product_facet_counts
+from products.models import Attribute, AttributeValue, Author, Batch, Category, Manufacturer, Product, \
+    ProductCard, ProductSearchDocument, ProductVariation, StockReservation, Tag, Type
+from products.selectors import category_breadcrumbs, category_descendant_list, product_card_list, \
+    product_detail_get_by_slug, product_list
+from products.services.card_services import product_cards_refresh
+from products.services.category_services import category_create, category_update
+from products.services.allocation_services import AllocationLine, batch_allocation_plan
+from products.services.import_services import catalog_import, catalog_rows_read
+from products.services.batch_services import batch_create, batch_delete, batch_quantity_decrement, \
+    products_price_range_refresh
+from products.services.product_services import product_quantities_reconcile, product_update
+from products.services.search_services import product_search_documents_refresh
+from products.services.reservation_services import stock_reservation_commit, stock_reservation_release, \
+    stock_reservations_release_expired, stock_reserve
+from users.models import User
+
+
+class ProductDetailQueryCountTests(TestCase):
+    # product (+type/author/manufacturer joins), categories, tags, batches, variations,
+    # variation attributes, variation values (+attribute join), attribute values
+    EXPECTED_QUERIES = 8
+
+    def setUp(self):
+        self.type = Type.objects.create(name="Grocery", slug="grocery")
+        self.author = Author.objects.create(name="Author", slug="author", languages="en")
+        self.manufacturer = Manufacturer.objects.create(name="Maker", slug="maker")
+        self.color = Attribute.objects.create(name="Color", slug="color")
+        self.size = Attribute.objects.create(name="Size", slug="size")
+
+    def _create_product(self, *, slug, variation_count, batch_count):
+        product = Product.objects.create(
+            name=slug,
+            slug=slug,
+            product_type="variable",
+            type=self.type,
+            author=self.author,
+            manufacturer=self.manufacturer,
+        )
+        product.categories.add(Category.objects.create(name=f"{slug}-category", slug=f"{slug}-category"))
+        product.tags.add(Tag.objects.create(name=f"{slug}-tag", slug=f"{slug}-tag"))
+
+        for index in range(batch_count):
+            Batch.objects.create(product=product, batch_number=f"{slug}-{index}", quantity=Decimal(5))
+
+        for index in range(variation_count):
+            color = AttributeValue.objects.create(attribute=self.color, value=f"color-{slug}-{index}")
+            size = AttributeValue.objects.create(attribute=self.size, value=f"size-{slug}-{index}")
+            variation = ProductVariation.objects.create(product=product, title=f"{slug}-{index}")
+            variation.attribute.add(self.color, self.size)
+            variation.value.add(color, size)
+
+        return product
+
+    def _render(self, slug):
+        product = product_detail_get_by_slug(slug)
+        return ProductDetailApi.OutputSerializer(product).data
+
+    def test_query_count_is_constant(self):
+        self._create_product(slug="small", variation_count=1, batch_count=1)
+        self._create_product(slug="large", variation_count=12, batch_count=20)
+
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            small = self._render("small")
+
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            large = self._render("large")
+
+        self.assertEqual(len(small["variation_options"]), 1)
+        self.assertEqual(len(large["variation_options"]), 12)
+        self.assertEqual(len(large["variations"]), 24)
+        self.assertEqual(len(large["batches"]), 20)
+
+    def test_variations_are_distinct(self):
+        product = self._create_product(slug="shared", variation_count=2, batch_count=0)
+        shared = AttributeValue.objects.filter(attribute=self.color).first()
+        for variation in product.variations.all():
+            variation.value.add(shared)
+
+        data = self._render("shared")
+
+        ids = [value["id"] for value in data["variations"]]
+        self.assertEqual(len(ids), len(set(ids)))
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name="Milk", slug="milk", product_type="simple")
+        self.batch = Batch.objects.create(product=product, batch_number="B1", quantity=Decimal(10))
+
+    def test_reserve_commit_and_release(self):
+        reservation = stock_reserve(batch_id=self.batch.id, quantity=4)
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.quantity, Decimal(6))
+
+        stock_reservation_commit(reservations=[reservation], reference="order-1")
+        stock_reservation_release(reservation=reservation)  # committed stock is not given back
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.quantity, Decimal(6))
+
+        other = stock_reserve(batch_id=self.batch.id, quantity=6)
+        stock_reservation_release(reservation=other)
+        stock_reservation_release(reservation=other)
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.quantity, Decimal(6))
+
+    def test_reserving_more_than_available_fails(self):
+        with self.assertRaises(ValidationError):
+            stock_reserve(batch_id=self.batch.id, quantity=11)
+
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.quantity, Decimal(10))
+
+    def test_expired_reservations_are_released(self):
+        expired = stock_reserve(batch_id=self.batch.id, quantity=3, ttl=timedelta(seconds=-1))
+        stock_reserve(batch_id=self.batch.id, quantity=2)
+
+        self.assertEqual(stock_reservations_release_expired(), 1)
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.quantity, Decimal(8))
+
+        with self.assertRaises(ValidationError):
+            stock_reservation_commit(reservations=[expired])
+
+
+class BatchAllocationPlanTests(TestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        self.product = Product.objects.create(name="Yogurt", slug="yogurt", product_type="simple")
+        self.late = Batch.objects.create(product=self.product, batch_number="LATE", quantity=Decimal(5),
+                                         expiry_date=today + timedelta(days=10), received_date=today - timedelta(days=5))
+        self.early = Batch.objects.create(product=self.product, batch_number="EARLY", quantity=Decimal(3),
+                                          expiry_date=today + timedelta(days=2), received_date=today)
+        Batch.objects.create(product=self.product, batch_number="EXPIRED", quantity=Decimal(9),
+                             expiry_date=today - timedelta(days=1))
+
+    def test_fefo_splits_lines_by_expiry(self):
+        with self.assertNumQueries(1):
+            plan = batch_allocation_plan(lines=[AllocationLine(product_id=self.product.id, quantity=4),
+                                                AllocationLine(product_id=self.product.id, quantity=3)])
+
+        self.assertEqual([(b.batch_number, b.quantity) for b in plan[0].batches], [("EARLY", 3), ("LATE", 1)])
+        self.assertEqual([(b.batch_number, b.quantity) for b in plan[1].batches], [("LATE", 3)])
+        self.assertTrue(all(allocation.is_complete for allocation in plan))
+
+    def test_fifo_and_shortfall(self):
+        plan = batch_allocation_plan(lines=[AllocationLine(product_id=self.product.id, quantity=10)], strategy="fifo")
+
+        self.assertEqual([b.batch_number for b in plan[0].batches], ["LATE", "EARLY"])
+        self.assertEqual(plan[0].shortfall, Decimal(2))
+        self.assertFalse(plan[0].is_complete)
+
+
+class ProductQuantityMaintenanceTests(TestCase):
+    def setUp(self):
+        self.type = Type.objects.create(name="Grocery", slug="grocery")
+        self.product = Product.objects.create(name="Rice", slug="rice", product_type="simple", type=self.type)
+
+    def assertStock(self, quantity, in_stock):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, Decimal(quantity))
+        self.assertEqual(self.product.in_stock, in_stock)
+
+    def test_batch_mutations_apply_deltas(self):
+        batch = batch_create(product=self.product, batch_number="R1", quantity=Decimal(4))
+        self.assertStock(4, True)
+
+        batch_quantity_decrement(batch_id=batch.id, decrement_value=4)
+        self.assertStock(0, False)
+
+        reservation = stock_reserve(batch_id=batch_create(product=self.product, batch_number="R2", quantity=3).id,
+                                    quantity=2)
+        self.assertStock(1, True)
+        stock_reservation_release(reservation=reservation)
+        self.assertStock(3, True)
+
+        product_update(product=self.product, data={
+            "type": self.type.id,
+            "batches": {"upsert": [{"batch_number": "R3", "quantity": Decimal(2)}], "delete": [batch.id]},
+        })
+        self.assertStock(5, True)
+        self.assertEqual(product_quantities_reconcile(), [])
+
+    def test_batch_prices_maintain_the_price_range(self):
+        def assertRange(low, high):
+            self.product.refresh_from_db()
+            self.assertEqual((self.product.min_price, self.product.max_price), (low, high))
+
+        cheap = batch_create(product=self.product, batch_number="R1", quantity=1, price=Decimal(4))
+        dear = batch_create(product=self.product, batch_number="R2", quantity=1, price=Decimal(9),
+                            sale_price=Decimal(7))
+        assertRange(Decimal(4), Decimal(7))
+
+        batch_delete(batch=cheap)
+        assertRange(Decimal(7), Decimal(7))
+
+        batch_delete(batch=dear)
+        assertRange(None, None)
+
+    def test_reconcile_repairs_drift(self):
+        product_cards_refresh(product_ids=[self.product.id])
+        batch_create(product=self.product, batch_number="R1", quantity=Decimal(7))
+        Product.objects.filter(id=self.product.id).update(quantity=Decimal(2), in_stock=False)
+        ProductCard.objects.filter(product=self.product).update(quantity=Decimal(2), in_stock=False)
+
+        drift = product_quantities_reconcile(fix=True, chunk_size=1)
+
+        self.assertEqual([row["id"] for row in drift], [self.product.id])
+        self.assertStock(7, True)
+        card = ProductCard.objects.get(product=self.product)
+        self.assertEqual((card.quantity, card.in_stock), (Decimal(7), True))
+        self.assertEqual(product_quantities_reconcile(), [])
+
+
+class CatalogImportTests(TestCase):
+    def test_import_reports_bad_rows_and_keeps_going(self):
+        Type.objects.create(name="Grocery", slug="grocery")
+        Category.objects.create(name="Dairy", slug="dairy")
+        size = Attribute.objects.create(name="Size", slug="size")
+        AttributeValue.objects.create(attribute=size, value="L")
+        file = io.StringIO(
+            '{"name": "Milk", "slug": "milk", "product_type": "variable", "type": "grocery", "categories": ["dairy"],'
+            ' "batches": [{"batch_number": "M1", "quantity": "4"}], "variations": [{"title": "L", "values": ["size:L"]}]}\n'
+            '{"name": "Cheese", "slug": "cheese", "product_type": "simple", "categories": ["missing"]}\n'
+            'not json\n'
+            '{"name": "Milk again", "slug": "milk", "product_type": "simple"}\n'
+        )
+
+        # 6 lookup maps, 1 slug check, 6 inserts inside one savepoint, then 4 search document queries,
+        # a price range UPDATE of products and cards, and 4 card queries
+        with self.assertNumQueries(29):
+            result = catalog_import(rows=catalog_rows_read(file=file, format="jsonl"))
+
+        self.assertEqual((result.products, result.batches, result.variations), (1, 1, 1))
+        self.assertEqual([error.line for error in result.errors], [2, 3, 4])
+
+        product = Product.objects.get(slug="milk")
+        self.assertEqual(product.quantity, Decimal(4))
+        self.assertEqual(list(product.categories.values_list("slug", flat=True)), ["dairy"])
+        self.assertEqual(product.variations.get().value.get().value, "L")
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.type = Type.objects.create(name="Clothing", slug="clothing")
+        tag = Tag.objects.create(name="Cotton", slug="cotton")
+        self.shirt = Product.objects.create(name="Linen Shirt", slug="linen-shirt", product_type="simple",
+                                            type=self.type, description="Light summer wear")
+        self.dress = Product.objects.create(name="Summer Dress", slug="summer-dress", product_type="simple",
+                                            type=self.type, description="Pairs well with a shirt")
+        self.dress.tags.add(tag)
+        with self.captureOnCommitCallbacks(execute=True):
+            product_search_documents_refresh()
+
+    def search(self, query):
+        return [product.slug for product in product_list(filters={"q": query})]
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search("shirt"), ["linen-shirt", "summer-dress"])
+        self.assertEqual(self.search("summer"), ["summer-dress", "linen-shirt"])
+        self.assertEqual(self.search("cotton summer"), ["summer-dress"])
+
+    def test_typos_still_match(self):
+        self.assertEqual(self.search("sumer dres"), ["summer-dress"])
+
+    def test_deleted_products_are_not_returned(self):
+        self.shirt.delete()
+        self.assertEqual(self.search("linen"), [])
+
+    def test_renamed_and_added_tags_are_searchable(self):
+        tag = Tag.objects.get(slug="cotton")
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = "Bio"
+            tag.save()
+        self.assertEqual(self.search("bio"), ["summer-dress"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.product_set.add(self.shirt)
+        self.assertEqual(self.search("bio"), ["linen-shirt", "summer-dress"])
+
+    def test_index_expires_without_a_version_bump(self):
+        self.assertEqual(self.search("linen"), ["linen-shirt"])
+        # Renamed elsewhere, with the version bump lost to a cache this process does not share
+        ProductSearchDocument.objects.filter(product=self.shirt).update(name="Flax Shirt")
+
+        self.assertEqual(self.search("flax"), [])
+        with override_settings(LOCAL_CACHE_MAX_AGE=0):
+            self.assertEqual(self.search("flax"), ["linen-shirt"])
+
+
+class ProductFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.grocery = Type.objects.create(name="Grocery", slug="grocery")
+        fruits = Category.objects.create(name="Fruits", slug="fruits")
+        dairy = Category.objects.create(name="Dairy", slug="dairy")
+        for slug, price, category, in_stock in (("apple", 5, fruits, True), ("pear", 30, fruits, False),
+                                                 ("milk", 30, dairy, True)):
+            product = Product.objects.create(name=slug, slug=slug, product_type="simple", type=self.grocery,
+                                             price=Decimal(price), in_stock=in_stock)
+            product.categories.add(category)
+            products_price_range_refresh(product_ids=[product.id])
+
+    def counts(self, facets, name):
+        return {row["value"]: row["count"] for row in facets[name]}
+
+    def test_each_facet_ignores_its_own_filter(self):
+        # type, manufacturer, author, categories, tags, in_stock, price
+        with self.assertNumQueries(7):
+            facets = product_facet_counts(filters={"categories": "fruits", "in_stock": True})
+
+        self.assertEqual(self.counts(facets, "categories"), {"fruits": 1, "dairy": 1})
+        self.assertEqual(self.counts(facets, "in_stock"), {True: 1, False: 1})
+        self.assertEqual(self.counts(facets, "type"), {"grocery": 1})
+        self.assertEqual([bucket["count"] for bucket in facets["price"][:3]], [1, 0, 0])
+
+    def test_counts_are_cached_until_the_catalog_changes(self):
+        product_facet_counts(filters={"categories": "dairy,fruits"})
+        with self.assertNumQueries(0):
+            product_facet_counts(filters={"categories": "fruits, dairy"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="kiwi", slug="kiwi", product_type="simple", type=self.grocery)
+
+        facets = product_facet_counts(filters={"categories": "fruits,dairy"})
+        self.assertEqual(self.counts(facets, "type"), {"grocery": 3})
+        self.assertEqual(self.counts(product_facet_counts(), "type"), {"grocery": 4})
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.type = Type.objects.create(name="Grocery", slug="grocery")
+        self.user = User.objects.create(username="editor", email="editor@example.com")
+        # model_update validates created_by/updated_by, so the categories need an author
+        with impersonate(self.user):
+            self.food = category_create(name="Food", slug="food", type_id=self.type.id)
+            self.fruits = category_create(name="Fruits", slug="fruits", type_id=self.type.id, parent_id=self.food.id)
+            self.citrus = category_create(name="Citrus", slug="citrus", type_id=self.type.id,
+                                          parent_id=self.fruits.id)
+            self.drinks = category_create(name="Drinks", slug="drinks", type_id=self.type.id)
+
+    def test_subtree_and_breadcrumbs_take_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([category.slug for category in category_descendant_list(category=self.food)],
+                             ["food", "fruits", "citrus"])
+        with self.assertNumQueries(1):
+            self.assertEqual([category.slug for category in category_breadcrumbs(category=self.citrus)],
+                             ["food", "fruits", "citrus"])
+
+        lemon = Product.objects.create(name="Lemon", slug="lemon", product_type="simple", type=self.type)
+        lemon.categories.add(self.citrus)
+        self.assertEqual([product.slug for product in product_list(filters={"category": "food"})], ["lemon"])
+        self.assertEqual(list(product_list(filters={"category": "drinks"})), [])
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.fruits.updated_by = self.user
+        with impersonate(self.user):
+            category_update(category=self.fruits, data={"parent_id": self.drinks.id})
+
+        self.citrus.refresh_from_db()
+        self.assertEqual(self.citrus.depth, 2)
+        self.assertEqual([category.slug for category in category_breadcrumbs(category=self.citrus)],
+                         ["drinks", "fruits", "citrus"])
+
+        with self.assertRaises(ValidationError):
+            category_update(category=self.drinks, data={"parent_id": self.citrus.id})
+
+    def test_categories_saved_directly_get_a_path(self):
+        lime = Category.objects.create(name="Lime", slug="lime", type=self.type, parent=self.citrus)
+
+        self.assertEqual(lime.depth, 3)
+        self.assertEqual([category.slug for category in category_descendant_list(category=self.citrus)],
+                         ["citrus", "lime"])
+
+    def test_category_without_a_path_moves_alone(self):
+        Category.objects.filter(pk=self.drinks.pk).update(path="")
+        self.drinks.refresh_from_db()
+
+        self.drinks.updated_by = self.user
+        with impersonate(self.user):
+            category_update(category=self.drinks, data={"parent_id": self.food.id})
+
+        self.assertEqual(self.drinks.path, f"{self.food.path}{self.drinks.pk.hex}/")
+        self.assertEqual(self.drinks.depth, 1)
+        self.citrus.refresh_from_db()
+        self.assertEqual(self.citrus.depth, 2)
+
+    def test_tree_snapshot_is_reused(self):
+        snapshot = category_tree_snapshot_get()
+        with self.assertNumQueries(0):
+            self.assertIs(category_tree_snapshot_get(), snapshot)
+        # Rebuilt once old, in case a version bump went to a cache this process does not share
+        with override_settings(LOCAL_CACHE_MAX_AGE=0):
+            self.assertIsNot(category_tree_snapshot_get(), snapshot)
+
+        tree = json.loads(snapshot.body)["data"]
+        self.assertEqual({node["slug"] for node in tree}, {"food", "drinks"})
+        food = next(node for node in tree if node["slug"] == "food")
+        self.assertEqual(food["children"][0]["children"][0]["slug"], "citrus")
+
+
+class ProductCardTests(TestCase):
+    def setUp(self):
+        self.type = Type.objects.create(name="Grocery", slug="grocery")
+        self.manufacturer = Manufacturer.objects.create(name="Farm", slug="farm")
+        self.fruits = Category.objects.create(name="Fruits", slug="fruits", path="a/")
+        self.product = Product.objects.create(name="Apple", slug="apple", product_type="simple", type=self.type,
+                                              manufacturer=self.manufacturer, price=Decimal(3))
+        self.product.categories.add(self.fruits)
+        products_price_range_refresh(product_ids=[self.product.id])
+        product_cards_refresh()
+
+    def test_card_carries_related_columns_and_stock(self):
+        batch_create(product=self.product, batch_number="A1", quantity=Decimal(5))
+
+        with self.assertNumQueries(1):
+            card = product_card_list(filters={"type": "grocery", "in_stock": True}).get()
+
+        self.assertEqual((card.type_slug, card.category_slug, card.manufacturer_name), ("grocery", "fruits", "Farm"))
+        self.assertEqual((card.min_price, card.quantity, card.in_stock), (Decimal(3), Decimal(5), True))
+
+    def test_renamed_relations_update_the_card(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manufacturer.name = "Globex"
+            self.manufacturer.save()
+            self.fruits.name = "Fresh fruits"
+            self.fruits.save()
+
+        card = ProductCard.objects.get()
+        self.assertEqual((card.manufacturer_name, card.category_name), ("Globex", "Fresh fruits"))
+
+    def test_deleted_products_lose_their_card(self):
+        self.product.delete()
+        product_cards_refresh(product_ids=[self.product.id])
+
+        self.assertFalse(ProductCard.objects.exists())
+
+
+class StockReservationConcurrencyTests(TransactionTestCase):
+    STOCK = 25
+    THREADS = 8
+    # SQLite refuses concurrent writers outright ("database table is locked") instead of waiting
+    LOCK_RETRIES = 500
+
+    def test_concurrent_checkouts_never_oversell(self):
+        product = Product.objects.create(name="Flash", slug="flash", product_type="simple")
+        batch = Batch.objects.create(product=product, batch_number="FLASH", quantity=Decimal(self.STOCK))
+
+        reserved = []
+        sold_out = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def checkout():
+            try:
+                start.wait()
+                lock_retries = self.LOCK_RETRIES
+                # Every thread keeps buying until it is told the batch is sold out
+                while True:
+                    try:
+                        reservation = stock_reserve(batch_id=batch.id, quantity=1)
+                    except ValidationError:
+                        with lock:
+                            sold_out.append(True)
+                        return
+                    except OperationalError:
+                        lock_retries -= 1
+                        if lock_retries == 0:
+                            raise
+                        time.sleep(0.001)
+                        continue
+                    with lock:
+                        reserved.append(reservation)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        batch.refresh_from_db()
+        self.assertEqual(len(sold_out), self.THREADS)
+        self.assertEqual(len(reserved), self.STOCK)
+        self.assertEqual(batch.quantity, 0)
+        self.assertEqual(StockReservation.objects.filter(batch=batch).count(), self.STOCK)
@@ -14,6 +14,7 @@ urlpatterns = [
 
     path('categories/', category_apis.CategoryListApi.as_view()),
     path('categories/create', category_apis.CategoryCreateApi.as_view()),
+    path('categories/tree', category_apis.CategoryTreeApi.as_view()),
     path('categories/<slug:slug>', category_apis.CategoryDetailApi.as_view()),
     path('categories/<str:category_id>/update', category_apis.CategoryUpdateApi.as_view()),
     path('categories/<str:category_id>/delete', category_apis.CategoryDeleteApi.as_view()),
@@ -43,6 +44,9 @@ urlpatterns = [
     path('authors/<str:slug>/delete', author_apis.AuthorDeleteApi.as_view()),
 
     path('products/', product_apis.ProductListApi.as_view()),
+    path('products/export', product_apis.ProductExportApi.as_view()),
+    path('products/facets', product_apis.ProductFacetApi.as_view()),
+    path('products/cards', product_apis.ProductCardListApi.as_view()),
     path('products/create', product_apis.ProductCreateApi.as_view()),
     path('products/<str:slug>', product_apis.ProductDetailApi.as_view()),
     path('products/<str:slug>/update', product_apis.ProductUpdateApi.as_view()),
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['expire_at', 'active_from'], name='coupon_active_window_idx'),
+        ),
+    ]
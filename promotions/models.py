@@ -2,7 +2,7 @@ import uuid
 
 from django.db import models
 
-from common.models import BaseModel
+from common.models import BaseModel, NOT_DELETED
 
 
 # Create your models here.
@@ -34,6 +34,12 @@ class Coupon(BaseModel):
     shop_id = models.PositiveIntegerField(blank=True, null=True)  # todo -> check for remove with front-end
     user_id = models.PositiveIntegerField(blank=True, null=True)  # todo -> check for remove with front-end
 
+    class Meta:
+        indexes = [
+            # Coupons running at a given moment; expired ones pile up, so the end of the window leads
+            models.Index(fields=['expire_at', 'active_from'], name='coupon_active_window_idx', condition=NOT_DELETED),
+        ]
+
     def __str__(self):
         return self.code
 
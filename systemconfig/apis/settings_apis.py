@@ -1,11 +1,12 @@
 from django.db import transaction
-from django.http import JsonResponse, Http404
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, Http404
+from django.utils.cache import patch_cache_control
 from rest_framework import serializers
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from systemconfig.models import Settings
+from systemconfig.cache import settings_snapshot_get
 from systemconfig.selectors import settings_get
 from systemconfig.services.settings_services import settings_update
 
@@ -18,14 +19,21 @@ class SettingsDetailApi(APIView):
         options = serializers.JSONField(required=True)
 
     def get(self, request):
-        settings = Settings.objects.first()
+        # Served from a per-process pre-rendered snapshot, see systemconfig.cache
+        snapshot = settings_snapshot_get(serializer_class=self.OutputSerializer)
 
-        if settings is None:
+        if snapshot is None:
             raise Http404
 
-        data = self.OutputSerializer(settings).data
+        if snapshot.etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot.body, content_type="application/json")
 
-        return Response(data)
+        response["ETag"] = snapshot.etag
+        # Clients and CDNs may keep a copy but have to revalidate it with If-None-Match
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        return response
 
 
 class SettingsUpdateApi(APIView):
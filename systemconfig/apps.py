@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SystemconfigConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'systemconfig'
+
+    def ready(self):
+        import systemconfig.signals  # noqa: F401
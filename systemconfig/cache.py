@@ -0,0 +1,84 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from systemconfig.models import Settings
+
+SETTINGS_VERSION_CACHE_KEY = "systemconfig:settings:version"
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    version: int
+    body: bytes
+    etag: str
+    built_at: float
+
+
+_snapshot: Optional[SettingsSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def settings_version_get() -> int:
+    """Current settings version, shared by every process through the cache."""
+    version = cache.get(SETTINGS_VERSION_CACHE_KEY)
+    if version is None:
+        # Seeded from the clock, so a flushed cache never hands out a version an old snapshot still has
+        cache.add(SETTINGS_VERSION_CACHE_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(SETTINGS_VERSION_CACHE_KEY)
+    return version
+
+
+def settings_snapshot_invalidate() -> None:
+    """Bump the shared version once the current transaction commits; every process rebuilds lazily."""
+
+    def bump():
+        try:
+            cache.incr(SETTINGS_VERSION_CACHE_KEY)
+        except ValueError:
+            # Key expired or was never set, any fresh value differs from the cached snapshots
+            cache.set(SETTINGS_VERSION_CACHE_KEY, settings_version_get() + 1, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def _is_current(snapshot: Optional[SettingsSnapshot], version: int) -> bool:
+    # The age bound covers caches that are not shared, where another process's bump is never seen
+    return (snapshot is not None and snapshot.version == version
+            and time.monotonic() - snapshot.built_at < django_settings.LOCAL_CACHE_MAX_AGE)
+
+
+def settings_snapshot_get(*, serializer_class) -> Optional[SettingsSnapshot]:
+    """
+    Pre-rendered JSON of the site settings, rebuilt when the shared version moves.
+
+    A hit costs one cache read and no database query or serialization. Snapshots older than
+    `LOCAL_CACHE_MAX_AGE` are rebuilt too. Returns None when no settings row exists.
+    """
+    global _snapshot
+
+    version = settings_version_get()
+    snapshot = _snapshot
+    if _is_current(snapshot, version):
+        return snapshot
+
+    with _snapshot_lock:
+        if _is_current(_snapshot, version):
+            return _snapshot
+
+        settings = Settings.objects.first()
+        if settings is None:
+            return None
+
+        body = JSONRenderer().render(serializer_class(settings).data)
+        # Content-only, so a version bump or a rebuild in another process keeps clients' copies valid
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        _snapshot = SettingsSnapshot(version=version, body=body, etag=etag, built_at=time.monotonic())
+        return _snapshot
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from systemconfig.cache import settings_snapshot_invalidate
+from systemconfig.models import Settings
+
+
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def settings_changed(sender, **kwargs):
+    # Covers settings_update as well as admin edits
+    settings_snapshot_invalidate()
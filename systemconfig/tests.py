@@ -1,3 +1,53 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from systemconfig.models import Settings
+
+
+class SettingsSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.settings = Settings.objects.create(options={"siteTitle": "Pickbazar"})
+
+    def test_snapshot_is_served_without_queries_and_supports_etag(self):
+        response = self.client.get("/api/settings/")
+        self.assertEqual(response.json()["options"], {"siteTitle": "Pickbazar"})
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            cached = self.client.get("/api/settings/")
+        self.assertEqual(cached.content, response.content)
+
+        not_modified = self.client.get("/api/settings/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], etag)
+
+    def test_save_invalidates_snapshot(self):
+        etag = self.client.get("/api/settings/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # post_save bumps the version, the same path settings_update and the admin go through
+            self.settings.options = {"siteTitle": "Updated"}
+            self.settings.save()
+
+        response = self.client.get("/api/settings/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["options"], {"siteTitle": "Updated"})
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_survives_a_save_that_changes_nothing(self):
+        etag = self.client.get("/api/settings/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings.save()
+
+        self.assertEqual(self.client.get("/api/settings/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_snapshot_expires_without_a_version_bump(self):
+        self.client.get("/api/settings/")
+        # Changed elsewhere, with the bump lost to a cache this process does not share
+        Settings.objects.update(options={"siteTitle": "Elsewhere"})
+
+        self.assertEqual(self.client.get("/api/settings/").json()["options"], {"siteTitle": "Pickbazar"})
+        with override_settings(LOCAL_CACHE_MAX_AGE=0):
+            self.assertEqual(self.client.get("/api/settings/").json()["options"], {"siteTitle": "Elsewhere"})
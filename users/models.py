@@ -5,6 +5,7 @@ from django.db import models
 from django.utils import timezone
 
 from common.models import BaseModel
+from users.roles import user_roles_get
 
 
 # Taken from here:
@@ -74,11 +75,11 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @property
     def is_store_owner(self):
-        return self.groups.filter(name='STORE_OWNER').exists()
+        return 'STORE_OWNER' in user_roles_get(user=self)
 
     @property
     def is_staff_member(self):
-        return self.groups.filter(name='STAFF').exists()
+        return 'STAFF' in user_roles_get(user=self)
 
 
 class Address(BaseModel):
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission
 
+from users.roles import user_has_role
+
 
 class IsSuperAdminPermission(BasePermission):
     """
@@ -7,16 +9,18 @@ class IsSuperAdminPermission(BasePermission):
     """
 
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name="super_admin").exists()
+        return request.user.is_authenticated and user_has_role(user=request.user, roles={"super_admin"},
+                                                               token=request.auth)
 
 
 class IsSuperAdminOrStoreOwner(BasePermission):
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name__in=["super_admin", "store_owner"]).exists()
+        return user_has_role(user=request.user, roles={"super_admin", "store_owner"}, token=request.auth)
 
 
 class IsStaffPermission(BasePermission):
 
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.groups.filter(name="staff").exists()
+        return request.user.is_authenticated and user_has_role(user=request.user, roles={"staff"},
+                                                               token=request.auth)
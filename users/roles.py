@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import FrozenSet, Hashable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from common.utils import cache_is_shared
+
+ROLES_CLAIM = "roles"
+ROLES_VERSION_CLAIM = "roles_version"
+
+GLOBAL_VERSION_CACHE_KEY = "users:roles:version"
+USER_VERSION_CACHE_KEY = "users:roles:version:{user_id}"
+
+
+class _LRUCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, FrozenSet[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[FrozenSet[str]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: FrozenSet[str]) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# Entries expire so a revocation whose version bump never reaches this process (no shared cache) still lands
+_roles_lru = _LRUCache(maxsize=getattr(settings, "USER_ROLE_CACHE_SIZE", 10000),
+                       ttl=getattr(settings, "LOCAL_CACHE_MAX_AGE", 30))
+
+
+def _user_version_key(user_id) -> str:
+    return USER_VERSION_CACHE_KEY.format(user_id=user_id)
+
+
+def user_roles_version(*, user_id) -> str:
+    """
+    Group membership version of a user, shared by every process through the cache.
+
+    It combines a global part (bumped when groups are renamed or deleted, seeded from the
+    clock so a flushed cache never repeats an old value) with a per-user counter.
+    """
+    versions = cache.get_many([GLOBAL_VERSION_CACHE_KEY, _user_version_key(user_id)])
+    global_version = versions.get(GLOBAL_VERSION_CACHE_KEY)
+    if global_version is None:
+        cache.add(GLOBAL_VERSION_CACHE_KEY, time.time_ns() // 1000, timeout=None)
+        global_version = cache.get(GLOBAL_VERSION_CACHE_KEY)
+    return f"{global_version}.{versions.get(_user_version_key(user_id), 0)}"
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if key == GLOBAL_VERSION_CACHE_KEY:
+            cache.set(key, time.time_ns() // 1000, timeout=None)
+        else:
+            cache.set(key, 1, timeout=None)
+
+
+def user_roles_invalidate(*, user_ids=None) -> None:
+    """Invalidate cached roles of `user_ids` (or of everyone) once the transaction commits."""
+    keys = [_user_version_key(user_id) for user_id in user_ids] if user_ids is not None else [GLOBAL_VERSION_CACHE_KEY]
+
+    def bump():
+        for key in keys:
+            _bump(key)
+
+    transaction.on_commit(bump)
+
+
+def user_roles_claims(*, user) -> dict:
+    """Claims embedded in issued JWTs, so permission checks can skip the lookup."""
+    return {
+        ROLES_CLAIM: sorted(_user_roles_load(user=user)),
+        ROLES_VERSION_CLAIM: user_roles_version(user_id=user.pk),
+    }
+
+
+def _user_roles_load(*, user) -> FrozenSet[str]:
+    return frozenset(user.groups.values_list("name", flat=True))
+
+
+def user_roles_get(*, user, token=None) -> FrozenSet[str]:
+    """
+    Names of the groups `user` belongs to.
+
+    Served, in order, from the signed `roles` claim of `token` when its version is still
+    current, from the per-process LRU keyed by user id and membership version, and
+    finally from the database. The claim is only trusted with a shared cache, where a
+    revocation on any worker moves the version everywhere.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    version = user_roles_version(user_id=user.pk)
+
+    if (token is not None and token.get(ROLES_VERSION_CLAIM) == version and ROLES_CLAIM in token
+            and cache_is_shared()):
+        return frozenset(token[ROLES_CLAIM])
+
+    key: Tuple[str, str] = (str(user.pk), version)
+    roles = _roles_lru.get(key)
+    if roles is None:
+        roles = _user_roles_load(user=user)
+        _roles_lru.set(key, roles)
+    return roles
+
+
+def user_has_role(*, user, roles, token=None) -> bool:
+    return not user_roles_get(user=user, token=token).isdisjoint(roles)
@@ -0,0 +1,28 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+from users.roles import user_roles_invalidate
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        user_roles_invalidate(user_ids=[instance.pk])
+    elif pk_set:
+        user_roles_invalidate(user_ids=pk_set)
+    else:
+        # group.user_set.clear() does not say which users were affected
+        user_roles_invalidate()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, created=False, **kwargs):
+    # A new group has no members yet, renames and deletes change everyone's roles
+    if not created:
+        user_roles_invalidate()
@@ -1,3 +1,64 @@
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from authentication.serializers import CustomTokenObtainPairSerializer
+from users.models import User
+from users.roles import _roles_lru, user_has_role, user_roles_get
+
+
+class UserRoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store_owner = Group.objects.create(name="store_owner")
+        self.user = User.objects.create(username="owner", email="owner@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.store_owner)
+
+    def test_roles_are_cached_per_membership_version(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(user_has_role(user=self.user, roles={"super_admin", "store_owner"}))
+        with self.assertNumQueries(0):
+            self.assertTrue(user_has_role(user=self.user, roles={"super_admin", "store_owner"}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.store_owner)
+
+        self.assertFalse(user_has_role(user=self.user, roles={"super_admin", "store_owner"}))
+
+    def test_reverse_membership_changes_invalidate(self):
+        staff = Group.objects.create(name="STAFF")
+        self.assertFalse(self.user.is_staff_member)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            staff.user_set.add(self.user)
+
+        self.assertTrue(self.user.is_staff_member)
+
+    def test_cached_roles_expire(self):
+        with mock.patch.object(_roles_lru, "ttl", 0):
+            self.assertEqual(user_roles_get(user=self.user), {"store_owner"})
+            # Revoked on another worker, whose version bump this process's local cache never sees
+            self.user.groups.through.objects.filter(user=self.user).delete()
+
+            self.assertEqual(user_roles_get(user=self.user), set())
+
+    def test_token_claim_needs_a_shared_cache(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user_roles_get(user=self.user, token=token), {"store_owner"})
+
+    @mock.patch("users.roles.cache_is_shared", return_value=True)
+    def test_token_claim_is_used_while_version_holds(self, cache_is_shared):
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user_roles_get(user=self.user, token=token), {"store_owner"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.clear()
+
+        self.assertEqual(user_roles_get(user=self.user, token=token), set())
@@ -12,6 +12,8 @@ from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
 # Module imports
+from common.instrumentation import timer
+from common.pagination import get_count_strategy
 
 
 class Cursor:
@@ -56,12 +58,13 @@ class Cursor:
 
 
 class CursorResult(Sequence):
-    def __init__(self, results, next, prev, hits=None, max_hits=None):
+    def __init__(self, results, next, prev, hits=None, max_hits=None, hits_approximate=False):
         self.results = results
         self.next = next
         self.prev = prev
         self.hits = hits
         self.max_hits = max_hits
+        self.hits_approximate = hits_approximate
 
     def __len__(self):
         # Return the length of the results
@@ -102,6 +105,7 @@ class OffsetPaginator:
         max_limit=MAX_LIMIT,
         max_offset=None,
         on_results=None,
+        count_strategy=None,
     ):
         # Key tuple and remove `-` if descending order by
         self.key = (
@@ -115,6 +119,7 @@ class OffsetPaginator:
         self.max_limit = max_limit
         self.max_offset = max_offset
         self.on_results = on_results
+        self.count_strategy = get_count_strategy(count_strategy)
 
     def get_result(self, limit=1000, cursor=None):
         # offset is page #
@@ -151,8 +156,11 @@ class OffsetPaginator:
         if cursor.value != limit:
             results = results[-(limit + 1) :]
 
+        # Fetch the page (plus one lookahead row) once instead of counting it separately
+        results = list(results)
+
         # Adjust cursors based on the results for pagination
-        next_cursor = Cursor(limit, page + 1, False, results.count() > limit)
+        next_cursor = Cursor(limit, page + 1, False, len(results) > limit)
         # If the page is greater than 0, then set the previous cursor
         prev_cursor = Cursor(limit, page - 1, True, page > 0)
 
@@ -164,7 +172,7 @@ class OffsetPaginator:
             results = self.on_results(results)
 
         # Count the queryset
-        count = queryset.count()
+        count, count_is_approximate = self.count_strategy.count(queryset)
 
         # Optionally, calculate the total count and max_hits if needed
         max_hits = math.ceil(count / limit)
@@ -176,6 +184,7 @@ class OffsetPaginator:
             prev=prev_cursor,
             hits=count,
             max_hits=max_hits,
+            hits_approximate=count_is_approximate,
         )
 
     def process_results(self, results):
@@ -727,7 +736,8 @@ class BasePaginator:
             raise ParseError(detail="Error in parsing")
 
         if on_results:
-            results = on_results(cursor_result.results)
+            with timer("serialize"):
+                results = on_results(cursor_result.results)
         else:
             results = cursor_result.results
 
@@ -753,6 +763,7 @@ class BasePaginator:
                 "count": cursor_result.__len__(),
                 "total_pages": cursor_result.max_hits,
                 "total_results": cursor_result.hits,
+                "total_is_approximate": cursor_result.hits_approximate,
                 "extra_stats": extra_stats,
                 "results": results,
             }